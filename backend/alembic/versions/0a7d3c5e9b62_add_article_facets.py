@@ -0,0 +1,101 @@
+"""add_article_facets
+
+Revision ID: 0a7d3c5e9b62
+Revises: f2c6a8e4d3b1
+Create Date: 2026-10-19 16:02:18.774391
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0a7d3c5e9b62'
+down_revision: Union[str, Sequence[str], None] = 'f2c6a8e4d3b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'article_facets',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('kind', sa.String(length=16), nullable=False),
+        sa.Column('value', sa.String(length=200), nullable=False),
+        sa.Column('count', sa.Integer(), server_default='0', nullable=False),
+        sa.PrimaryKeyConstraint('day', 'kind', 'value')
+    )
+
+    # Trigger udržuje počty při každé změně článku (kopie models.FACET_TRIGGER_DDL)
+    op.execute("""
+    CREATE OR REPLACE FUNCTION article_facets_apply(p_cats jsonb, p_day date, p_delta integer)
+    RETURNS void AS $$
+    BEGIN
+        IF p_cats IS NULL OR p_day IS NULL THEN
+            RETURN;
+        END IF;
+        INSERT INTO article_facets (day, kind, value, count)
+        SELECT DISTINCT p_day, k.kind, left(v.value, 200), p_delta
+        FROM (VALUES ('country', 'countries'), ('person', 'people')) AS k(kind, key),
+             jsonb_array_elements_text(
+                 CASE WHEN jsonb_typeof(p_cats -> k.key) = 'array' THEN p_cats -> k.key ELSE '[]'::jsonb END
+             ) AS v(value)
+        WHERE v.value <> ''
+        ON CONFLICT (day, kind, value) DO UPDATE SET count = article_facets.count + EXCLUDED.count;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+    CREATE OR REPLACE FUNCTION articles_facets_trigger()
+    RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            PERFORM article_facets_apply(OLD.categories, COALESCE(OLD.published_date, OLD.created_at)::date, -1);
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            PERFORM article_facets_apply(NEW.categories, COALESCE(NEW.published_date, NEW.created_at)::date, 1);
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+    CREATE TRIGGER articles_facets_insert_delete
+    AFTER INSERT OR DELETE ON articles
+    FOR EACH ROW EXECUTE FUNCTION articles_facets_trigger();
+    """)
+    op.execute("""
+    CREATE TRIGGER articles_facets_update
+    AFTER UPDATE OF categories, published_date, created_at ON articles
+    FOR EACH ROW
+    WHEN (OLD.categories IS DISTINCT FROM NEW.categories
+          OR COALESCE(OLD.published_date, OLD.created_at)::date
+             IS DISTINCT FROM COALESCE(NEW.published_date, NEW.created_at)::date)
+    EXECUTE FUNCTION articles_facets_trigger();
+    """)
+
+    # Naplnění počtů z existujících článků
+    op.execute("""
+    INSERT INTO article_facets (day, kind, value, count)
+    SELECT COALESCE(a.published_date, a.created_at)::date, k.kind, left(v.value, 200), count(DISTINCT a.id)
+    FROM articles AS a,
+         (VALUES ('country', 'countries'), ('person', 'people')) AS k(kind, key),
+         jsonb_array_elements_text(
+             CASE WHEN jsonb_typeof(a.categories -> k.key) = 'array' THEN a.categories -> k.key ELSE '[]'::jsonb END
+         ) AS v(value)
+    WHERE COALESCE(a.published_date, a.created_at) IS NOT NULL
+    AND v.value <> ''
+    GROUP BY 1, 2, 3
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS articles_facets_update ON articles")
+    op.execute("DROP TRIGGER IF EXISTS articles_facets_insert_delete ON articles")
+    op.execute("DROP FUNCTION IF EXISTS articles_facets_trigger()")
+    op.execute("DROP FUNCTION IF EXISTS article_facets_apply(jsonb, date, integer)")
+    op.drop_table('article_facets')
@@ -0,0 +1,59 @@
+"""add_article_search_vector
+
+Revision ID: 1b9e4f7a2c83
+Revises: 0a7d3c5e9b62
+Create Date: 2026-10-19 17:20:51.106433
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1b9e4f7a2c83'
+down_revision: Union[str, Sequence[str], None] = '0a7d3c5e9b62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Postgres nemá český stemmer, takže konfigurace = simple + odstranění diakritiky
+    # (hledání "zeleznice" najde "železnice"); tvary slov řeší prefixové hledání
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent SCHEMA public")
+    op.execute("CREATE TEXT SEARCH CONFIGURATION cs_unaccent (COPY = simple)")
+    op.execute(
+        "ALTER TEXT SEARCH CONFIGURATION cs_unaccent "
+        "ALTER MAPPING FOR hword, hword_part, word WITH unaccent, simple"
+    )
+
+    # Generovaný sloupec přepočítá Postgres při každém INSERT/UPDATE
+    # (content_crawler, generate_summary), jen přidání sloupce přepíše tabulku
+    op.add_column('articles', sa.Column(
+        'search_vector',
+        postgresql.TSVECTOR(),
+        sa.Computed(
+            "setweight(to_tsvector('cs_unaccent'::regconfig, coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('cs_unaccent'::regconfig, coalesce(summary_simple, '')), 'B') || "
+            "setweight(to_tsvector('cs_unaccent'::regconfig, coalesce(content, '')), 'C')",
+            persisted=True,
+        ),
+        nullable=True,
+    ))
+    op.create_index(
+        'ix_articles_search_vector',
+        'articles',
+        ['search_vector'],
+        unique=False,
+        postgresql_using='gin',
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_articles_search_vector', table_name='articles')
+    op.drop_column('articles', 'search_vector')
+    op.execute("DROP TEXT SEARCH CONFIGURATION IF EXISTS cs_unaccent")
@@ -0,0 +1,35 @@
+"""add_llm_quota_windows
+
+Revision ID: 2c4a7e1f9d05
+Revises: 1b9e4f7a2c83
+Create Date: 2026-10-19 18:41:07.215938
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2c4a7e1f9d05'
+down_revision: Union[str, Sequence[str], None] = '1b9e4f7a2c83'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'llm_quota_windows',
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('window_start', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('requests', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('tokens', sa.Integer(), server_default='0', nullable=False),
+        sa.PrimaryKeyConstraint('name', 'window_start')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('llm_quota_windows')
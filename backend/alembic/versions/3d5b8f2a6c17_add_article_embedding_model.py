@@ -0,0 +1,48 @@
+"""add_article_embedding_model
+
+Revision ID: 3d5b8f2a6c17
+Revises: 2c4a7e1f9d05
+Create Date: 2026-10-19 20:12:48.604113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3d5b8f2a6c17'
+down_revision: Union[str, Sequence[str], None] = '2c4a7e1f9d05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+GEMINI_MODEL_ID = 'gemini:text-embedding-004'
+# Stejné jméno jako embeddings.vector_index_name(GEMINI_MODEL_ID)
+GEMINI_INDEX = 'ix_articles_embedding_gemini_text_embedding_004_7c4fd470'
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('articles', sa.Column('embedding_model', sa.String(length=100), nullable=True))
+    # Všechny dosavadní vektory jsou z Gemini text-embedding-004
+    op.execute(f"UPDATE articles SET embedding_model = '{GEMINI_MODEL_ID}' WHERE embedding IS NOT NULL")
+
+    # Sloupec bez pevné dimenze (modely mají různé dimenze), index pro každý model zvlášť
+    op.execute('DROP INDEX IF EXISTS articles_embedding_idx')
+    op.execute('ALTER TABLE articles ALTER COLUMN embedding TYPE vector')
+    op.execute(
+        f"CREATE INDEX {GEMINI_INDEX} ON articles "
+        f"USING hnsw ((embedding::vector(768)) vector_cosine_ops) "
+        f"WHERE embedding_model = '{GEMINI_MODEL_ID}'"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(f'DROP INDEX IF EXISTS {GEMINI_INDEX}')
+    # Vektory jiných modelů se do vector(768) nevejdou
+    op.execute(f"UPDATE articles SET embedding = NULL WHERE embedding_model IS DISTINCT FROM '{GEMINI_MODEL_ID}'")
+    op.execute('ALTER TABLE articles ALTER COLUMN embedding TYPE vector(768)')
+    op.execute('CREATE INDEX articles_embedding_idx ON articles USING ivfflat (embedding vector_cosine_ops) WITH (lists = 100)')
+    op.drop_column('articles', 'embedding_model')
@@ -0,0 +1,43 @@
+"""halfvec_embedding_index
+
+Revision ID: 4e7a1c9b3f28
+Revises: 3d5b8f2a6c17
+Create Date: 2026-10-19 21:03:26.417730
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4e7a1c9b3f28'
+down_revision: Union[str, Sequence[str], None] = '3d5b8f2a6c17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+GEMINI_MODEL_ID = 'gemini:text-embedding-004'
+# embeddings.vector_index_name(GEMINI_MODEL_ID, "vector" / "halfvec" / "bit")
+VECTOR_INDEX = 'ix_articles_embedding_gemini_text_embedding_004_7c4fd470'
+HALFVEC_INDEX = 'ix_articles_embedding_gemini_text_embedding_004_halfve_cf6e66bb'
+BIT_INDEX = 'ix_articles_embedding_gemini_text_embedding_004_bit_89aa2931'
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Schéma zůstává s plným indexem (EMBEDDING_INDEX=vector). Zmenšený index
+    # (halfvec / bit) podle konfigurace nasazení zakládá generate_embeddings
+    # (ensure_vector_index), ne migrace. Obnoví index i tam, kde ho dřívější
+    # podoba této revize nahradila halfvec indexem.
+    op.execute(
+        f"CREATE INDEX IF NOT EXISTS {VECTOR_INDEX} ON articles "
+        f"USING hnsw (((embedding)::vector(768)) vector_cosine_ops) "
+        f"WHERE embedding_model = '{GEMINI_MODEL_ID}'"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Indexy založené podle EMBEDDING_INDEX starší revize nezná
+    op.execute(f'DROP INDEX IF EXISTS {HALFVEC_INDEX}')
+    op.execute(f'DROP INDEX IF EXISTS {BIT_INDEX}')
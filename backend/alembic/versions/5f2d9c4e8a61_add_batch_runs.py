@@ -0,0 +1,56 @@
+"""add_batch_runs
+
+Revision ID: 5f2d9c4e8a61
+Revises: 4e7a1c9b3f28
+Create Date: 2026-10-19 22:17:54.930482
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f2d9c4e8a61'
+down_revision: Union[str, Sequence[str], None] = '4e7a1c9b3f28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'batch_runs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('job', sa.String(length=50), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('cursor', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('stats', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('started_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_batch_runs_job'), 'batch_runs', ['job'], unique=False)
+    op.create_table(
+        'batch_run_items',
+        sa.Column('job', sa.String(length=50), nullable=False),
+        sa.Column('item_id', sa.Integer(), nullable=False),
+        sa.Column('run_id', sa.Integer(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('next_attempt_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['run_id'], ['batch_runs.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('job', 'item_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('batch_run_items')
+    op.drop_index(op.f('ix_batch_runs_job'), table_name='batch_runs')
+    op.drop_table('batch_runs')
@@ -0,0 +1,47 @@
+"""add_article_scores
+
+Revision ID: b7e41c2d9a10
+Revises: 5a8c9d3e1f2b
+Create Date: 2026-10-19 09:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e41c2d9a10'
+down_revision: Union[str, Sequence[str], None] = '5a8c9d3e1f2b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Čas vložení článku - existující řádky dostanou čas migrace
+    op.add_column('articles', sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True))
+
+    # Uložená hodnocení relevance (jedno na článek a verzi profilu)
+    op.create_table(
+        'article_scores',
+        sa.Column('article_id', sa.Integer(), nullable=False),
+        sa.Column('profile_version', sa.String(length=64), nullable=False),
+        sa.Column('relevance', sa.String(length=50), nullable=True),
+        sa.Column('news_value_score', sa.Integer(), nullable=True),
+        sa.Column('news_values', sa.Text(), nullable=True),
+        sa.Column('reasoning', sa.Text(), nullable=True),
+        sa.Column('country', sa.String(length=100), nullable=True),
+        sa.Column('person', sa.String(length=200), nullable=True),
+        sa.Column('topic', sa.String(length=100), nullable=True),
+        sa.Column('scored_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['article_id'], ['articles.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('article_id', 'profile_version')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('article_scores')
+    op.drop_column('articles', 'created_at')
@@ -0,0 +1,31 @@
+"""add_article_date_indexes
+
+Revision ID: c3d8f0a61e27
+Revises: b7e41c2d9a10
+Create Date: 2026-10-19 11:04:12.552917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3d8f0a61e27'
+down_revision: Union[str, Sequence[str], None] = 'b7e41c2d9a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Indexy pro výběr kandidátů přehledu podle časového okna
+    op.create_index(op.f('ix_articles_published_date'), 'articles', ['published_date'], unique=False)
+    op.create_index(op.f('ix_articles_created_at'), 'articles', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_articles_created_at'), table_name='articles')
+    op.drop_index(op.f('ix_articles_published_date'), table_name='articles')
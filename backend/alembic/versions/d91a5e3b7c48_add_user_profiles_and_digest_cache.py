@@ -0,0 +1,81 @@
+"""add_user_profiles_and_digest_cache
+
+Revision ID: d91a5e3b7c48
+Revises: c3d8f0a61e27
+Create Date: 2026-10-19 13:27:05.104388
+
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd91a5e3b7c48'
+down_revision: Union[str, Sequence[str], None] = 'c3d8f0a61e27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+DEFAULT_PROFILE_DESCRIPTION = """
+Uživatel je čech, žije v Praze.
+Zajímá ho politika, technologie, ekonomie a veřejné dění.
+Rád by měl přehled o tom, co hýbe společností.
+"""
+
+DEFAULT_PROFILE_PREFERENCES = {
+    "topics": {"politika": 1.2, "technologie": 1.2, "ekonomika": 1.2, "bezpečnost": 1.0, "kultura": 0.8},
+    "countries": {"Česko": 1.2},
+    "people": {},
+    "default_weight": 0.8,
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Hodnocení teď nezávisí na profilu - stará (profilová) hodnocení zahodíme
+    op.execute("DELETE FROM article_scores")
+    op.drop_column('article_scores', 'relevance')
+    op.alter_column('article_scores', 'profile_version', new_column_name='features_version')
+
+    op.create_table(
+        'digest_generations',
+        sa.Column('selection_key', sa.String(length=64), nullable=False),
+        sa.Column('article_ids', sa.Text(), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('selection_key')
+    )
+
+    user_profiles = op.create_table(
+        'user_profiles',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('preferences', sa.Text(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), server_default='true', nullable=False),
+        # Poslední přehled profilu drží tabulka digests (e4b27a9d0f15), ne sloupec profilu
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+    )
+    op.create_index(op.f('ix_user_profiles_id'), 'user_profiles', ['id'], unique=False)
+
+    # Výchozí profil = dosavadní natvrdo zadaný USER_PROFILE
+    op.bulk_insert(user_profiles, [{
+        'name': 'default',
+        'description': DEFAULT_PROFILE_DESCRIPTION,
+        'preferences': json.dumps(DEFAULT_PROFILE_PREFERENCES, ensure_ascii=False),
+        'is_active': True,
+    }])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_user_profiles_id'), table_name='user_profiles')
+    op.drop_table('user_profiles')
+    op.drop_table('digest_generations')
+    op.execute("DELETE FROM article_scores")
+    op.alter_column('article_scores', 'features_version', new_column_name='profile_version')
+    op.add_column('article_scores', sa.Column('relevance', sa.String(length=50), nullable=True))
@@ -0,0 +1,64 @@
+"""add_digests_table
+
+Revision ID: e4b27a9d0f15
+Revises: d91a5e3b7c48
+Create Date: 2026-10-19 14:51:33.620117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b27a9d0f15'
+down_revision: Union[str, Sequence[str], None] = 'd91a5e3b7c48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'digests',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('profile_id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(length=500), nullable=True),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('article_ids', sa.Text(), nullable=False),
+        sa.Column('selection_key', sa.String(length=64), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['profile_id'], ['user_profiles.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['selection_key'], ['digest_generations.selection_key']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('profile_id', 'version', name='uq_digests_profile_version')
+    )
+    op.create_index(op.f('ix_digests_id'), 'digests', ['id'], unique=False)
+
+    # Přesuneme dosavadní přehled (řádek url='DIGEST' v articles) do historie výchozího profilu
+    op.execute("""
+        INSERT INTO digests (profile_id, version, title, content, article_ids, created_at)
+        SELECT p.id, 1, a.title, a.content, '[]', COALESCE(a.published_date, now())
+        FROM articles a
+        JOIN user_profiles p ON p.name = 'default'
+        WHERE a.url = 'DIGEST' AND a.content IS NOT NULL
+    """)
+    op.execute("DELETE FROM articles WHERE url = 'DIGEST'")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Vrátíme poslední přehled výchozího profilu zpět do articles
+    op.execute("""
+        INSERT INTO articles (url, title, content, summary_simple, published_date)
+        SELECT 'DIGEST', d.title, d.content, d.content, d.created_at
+        FROM digests d
+        JOIN user_profiles p ON p.id = d.profile_id AND p.name = 'default'
+        ORDER BY d.version DESC
+        LIMIT 1
+    """)
+
+    op.drop_index(op.f('ix_digests_id'), table_name='digests')
+    op.drop_table('digests')
@@ -0,0 +1,56 @@
+"""categories_to_jsonb
+
+Revision ID: f2c6a8e4d3b1
+Revises: e4b27a9d0f15
+Create Date: 2026-10-19 15:12:40.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c6a8e4d3b1'
+down_revision: Union[str, Sequence[str], None] = 'e4b27a9d0f15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Kategorie ukládal crawler jako json.dumps(...) do TEXT sloupce.
+    # Převod přepíše tabulku, prázdné řetězce bereme jako NULL.
+    op.alter_column(
+        'articles',
+        'categories',
+        type_=postgresql.JSONB(),
+        existing_type=sa.Text(),
+        existing_nullable=True,
+        postgresql_using="NULLIF(btrim(categories), '')::jsonb",
+    )
+    # jsonb_path_ops index je menší než výchozí jsonb_ops a stačí pro @>
+    # (filtry country= a person= v GET /articles/)
+    op.create_index(
+        'ix_articles_categories',
+        'articles',
+        ['categories'],
+        unique=False,
+        postgresql_using='gin',
+        postgresql_ops={'categories': 'jsonb_path_ops'},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_articles_categories', table_name='articles')
+    op.alter_column(
+        'articles',
+        'categories',
+        type_=sa.Text(),
+        existing_type=postgresql.JSONB(),
+        existing_nullable=True,
+        postgresql_using='categories::text',
+    )
@@ -0,0 +1,104 @@
+"""
+Benchmark zápisu výsledků batch skriptů: commit po každém článku vs. BatchWriter.
+
+Naplní dočasné schéma články bez obsahu a zapíše jim obsah a datum
+vydání tak, jak to dělá content crawler (včetně evidence běhu):
+
+- per_row: nastavení atributů ORM objektu + commit po každém článku
+  (po commitu se další článek načítá znovu - expire_on_commit),
+- batch_N: BatchWriter, hromadný UPDATE ... FROM (VALUES ...) po N řádcích.
+
+Vypíše propustnost (řádky/s), počet commitů a zrychlení proti per_row.
+
+Spuštění (z adresáře backend/, potřebuje DATABASE_URL):
+    python -m benchmarks.batch_writer --rows 5000 --batch-sizes 10,50,200
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime
+
+from sqlalchemy import text
+
+from benchmarks.common import scratch_session
+from src.batch_writer import BatchWriter
+from src.models import Article
+from src.run_ledger import RunLedger
+
+SEED_SQL = text("""
+    INSERT INTO articles (title, url, created_at)
+    SELECT 'Článek ' || g, 'https://www.novinky.cz/clanek-' || g, now() - g * interval '1 minute'
+    FROM generate_series(1, :rows) AS g
+""")
+
+
+def reset(db):
+    db.execute(text("UPDATE articles SET content = NULL, published_date = NULL"))
+    db.execute(text("TRUNCATE batch_runs, batch_run_items"))
+    db.commit()
+    db.expire_all()
+
+
+def run_per_row(db, content: str) -> dict:
+    db.expire_on_commit = True
+    ledger = RunLedger(db, "bench").start()
+    articles = ledger.pending(db.query(Article), Article.id).all()
+    start = time.perf_counter()
+    for article in articles:
+        # Skript čte titulek (výpis průběhu) - po commitu to znamená nový SELECT
+        _ = article.title
+        article.content = content
+        article.published_date = datetime.now()
+        ledger.record(article.id)
+        db.commit()
+    wall = time.perf_counter() - start
+    ledger.finish("completed")
+    return {"rows": len(articles), "wall_s": round(wall, 3), "commits": len(articles)}
+
+
+def run_batched(db, content: str, batch_size: int) -> dict:
+    ledger = RunLedger(db, "bench").start()
+    articles = ledger.pending(db.query(Article), Article.id).all()
+    db.commit()
+    start = time.perf_counter()
+    with BatchWriter(db, "bench", ledger=ledger, max_rows=batch_size, max_seconds=float("inf")) as writer:
+        for article in articles:
+            _ = article.title
+            writer.update(article, content=content, published_date=datetime.now())
+    wall = time.perf_counter() - start
+    ledger.finish("completed")
+    return {"rows": len(articles), "wall_s": round(wall, 3), "commits": writer.flushes}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Commit po řádku vs. hromadný zápis (BatchWriter)")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--batch-sizes", default="10,50,200")
+    parser.add_argument("--content-chars", type=int, default=4000, help="Délka zapisovaného obsahu")
+    args = parser.parse_args()
+
+    content = ("Obsah článku se zprávou dne. " * (args.content_chars // 29 + 1))[:args.content_chars]
+    results = {}
+    with scratch_session("bench_batch_writer") as db:
+        db.execute(SEED_SQL, {"rows": args.rows})
+        db.commit()
+
+        runs = [("per_row", lambda: run_per_row(db, content))]
+        for size in (int(s) for s in args.batch_sizes.split(",") if s.strip()):
+            runs.append((f"batch_{size}", lambda size=size: run_batched(db, content, size)))
+
+        for name, run in runs:
+            reset(db)
+            result = run()
+            result["rows_per_s"] = round(result["rows"] / result["wall_s"], 1) if result["wall_s"] else None
+            results[name] = result
+
+    baseline = results["per_row"]["wall_s"]
+    for name, result in results.items():
+        result["speedup"] = round(baseline / result["wall_s"], 2) if result["wall_s"] else None
+    print(json.dumps({"rows": args.rows, **results}, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
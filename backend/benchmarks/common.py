@@ -0,0 +1,58 @@
+"""
+Společné pomůcky pro benchmarky nad databází.
+
+Benchmarky běží v dočasném schématu (search_path), takže nesahají
+na produkční tabulky a po doběhnutí po sobě uklidí.
+
+Modul nesmí importovat src.* při načtení: src.database si při importu
+vytvoří engine z DATABASE_URL a benchmarky, které ho přesměrovávají
+(pipeline), by jinak zapisovaly do skutečné databáze.
+"""
+
+import statistics
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+
+@contextmanager
+def scratch_session(schema: str, keep: bool = False):
+    """
+    Vytvoří dočasné schéma se všemi tabulkami aplikace a vrátí session,
+    jejíž search_path ukazuje na toto schéma (a public kvůli pgvectoru).
+    """
+    from src import models  # noqa: F401 - registrace modelů v Base.metadata
+    from src.database import DATABASE_URL, Base
+
+    engine = create_engine(DATABASE_URL, poolclass=NullPool)
+    with engine.connect() as conn:
+        conn.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS vector")
+        conn.exec_driver_sql(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+        conn.exec_driver_sql(f"CREATE SCHEMA {schema}")
+        conn.exec_driver_sql(f"SET search_path TO {schema}, public")
+        Base.metadata.create_all(bind=conn)
+        conn.commit()
+
+        session = Session(bind=conn)
+        try:
+            yield session
+        finally:
+            session.close()
+            conn.rollback()
+            if not keep:
+                conn.exec_driver_sql(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+                conn.commit()
+    engine.dispose()
+
+
+def latency_summary(samples: list[float]) -> dict:
+    """p50/p99/průměr v milisekundách."""
+    ordered = sorted(samples)
+    return {
+        "runs": len(ordered),
+        "p50_ms": statistics.median(ordered) * 1000,
+        "p99_ms": ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))] * 1000,
+        "mean_ms": statistics.fmean(ordered) * 1000,
+    }
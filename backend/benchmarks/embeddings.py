@@ -0,0 +1,90 @@
+"""
+Benchmark poskytovatelů embeddingů (bez databáze).
+
+- gemini_single: text po textu přes API (dřívější chování),
+- gemini_batch: dávky po --batch-size textech jedním voláním,
+- local: lokální model na CPU (sentence-transformers, ONNX int8 / torch).
+
+Gemini nahrazuje falešné API s latencí --api-latency-ms na volání
+(fakes.FakeGenAI), lokální model běží doopravdy - při prvním spuštění
+se stáhne z Hugging Face. Bez balíčku sentence-transformers se režim
+local přeskočí.
+
+Spuštění (z adresáře backend/):
+    python -m benchmarks.embeddings --texts 500 --batch-size 64
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import time
+
+from benchmarks import fakes
+
+
+def make_texts(count: int) -> list:
+    return [
+        f"Zpráva číslo {i}: {fakes.COUNTRIES[i % len(fakes.COUNTRIES)]}, {fakes.TOPICS[i % len(fakes.TOPICS)]}\n\n"
+        + fakes.SAMPLE_SENTENCE * (2 + i % 4)
+        for i in range(count)
+    ]
+
+
+def run(provider, texts: list, batch_size: int) -> dict:
+    from src.instrumentation import USAGE
+
+    USAGE.reset()
+    # Zahřátí (načtení modelu, první volání) se nepočítá
+    with contextlib.redirect_stdout(io.StringIO()):
+        provider.embed_documents(texts[:1])
+    USAGE.reset()
+
+    start = time.perf_counter()
+    vectors = []
+    for i in range(0, len(texts), batch_size):
+        vectors.extend(provider.embed_documents(texts[i:i + batch_size]))
+    wall = time.perf_counter() - start
+
+    usage = USAGE.report().get("embedding", {})
+    return {
+        "model": provider.model_id,
+        "dimensions": len(vectors[0]),
+        "wall_s": round(wall, 3),
+        "texts_per_s": round(len(texts) / wall, 1),
+        "calls": usage.get("calls", 0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embeddingy: API text po textu vs. dávky vs. lokální model")
+    parser.add_argument("--texts", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--api-latency-ms", type=float, default=120, help="Latence jednoho volání embedding API")
+    parser.add_argument("--local-backend", choices=("onnx", "torch"), default="onnx")
+    args = parser.parse_args()
+
+    # Databáze se nepoužívá, engine se ale vytváří při importu src.database
+    os.environ.setdefault("DATABASE_URL", "postgresql://benchmark@localhost/unused")
+    os.environ["LLM_QUOTA_BACKEND"] = "local"
+    os.environ.setdefault("EMBEDDING_RPM", "0")
+    fakes.install(fakes.Latency(0), fakes.Latency(args.api_latency_ms))
+    from src.embeddings import GeminiEmbeddings, LocalEmbeddings
+
+    texts = make_texts(args.texts)
+    results = {
+        "gemini_single": run(GeminiEmbeddings(), texts, 1),
+        "gemini_batch": run(GeminiEmbeddings(), texts, args.batch_size),
+    }
+    if importlib.util.find_spec("sentence_transformers") is None:
+        results["local"] = "přeskočeno - chybí sentence-transformers"
+    else:
+        results["local"] = run(LocalEmbeddings(backend=args.local_backend), texts, args.batch_size)
+
+    print(json.dumps({"texts": args.texts, "cpu_count": os.cpu_count(), **results}, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark facet (GET /facets) nad 1M článků.
+
+Naplní dočasné schéma syntetickými články přes rok - trigger přitom průběžně
+plní article_facets, takže doba plnění ukazuje i režii triggeru na zápis.
+Pak porovná dotaz nad předpočítanou tabulkou s naivní agregací přes
+articles (jsonb_array_elements) pro stejné časové okno a ověří, že dávají
+stejné počty.
+
+Spuštění (z adresáře backend/, potřebuje DATABASE_URL):
+    python -m benchmarks.facets --rows 1000000 --days 7 --runs 50
+"""
+
+import argparse
+import json
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import text
+
+from benchmarks.common import latency_summary, scratch_session
+from src.facets import FACET_KINDS, facet_counts
+
+SEED_SQL = text("""
+    INSERT INTO articles (title, url, categories, published_date, created_at)
+    SELECT
+        'Článek ' || g,
+        'https://www.novinky.cz/clanek-' || g,
+        jsonb_build_object(
+            'countries', jsonb_build_array(
+                (ARRAY['Česko', 'USA', 'Rusko', 'Ukrajina', 'Německo', 'Francie', 'Čína', 'Izrael'])[1 + g % 8]
+            ),
+            'people', jsonb_build_array('Osoba ' || (g % 2000), 'Osoba ' || (g % 37))
+        ),
+        CASE WHEN g % 20 = 0 THEN NULL ELSE now() - random() * interval '365 days' END,
+        now() - random() * interval '365 days'
+    FROM generate_series(1, :rows) AS g
+""")
+
+# Co by dělal endpoint bez předpočítané tabulky
+NAIVE_SQL = text("""
+    SELECT kind, value, total
+    FROM (
+        SELECT k.kind, v.value, count(DISTINCT a.id) AS total,
+               row_number() OVER (PARTITION BY k.kind ORDER BY count(DISTINCT a.id) DESC, v.value) AS rank
+        FROM articles AS a,
+             (VALUES ('country', 'countries'), ('person', 'people')) AS k(kind, key),
+             jsonb_array_elements_text(a.categories -> k.key) AS v(value)
+        WHERE COALESCE(a.published_date, a.created_at)::date >= :since
+        GROUP BY k.kind, v.value
+    ) AS ranked
+    WHERE rank <= :limit
+    ORDER BY kind, total DESC, value
+""")
+
+
+def naive_counts(db, since: date, limit: int) -> dict:
+    result = {name: [] for name in FACET_KINDS.values()}
+    for row in db.execute(NAIVE_SQL, {"since": since, "limit": limit}):
+        result[FACET_KINDS[row.kind]].append({"value": row.value, "count": int(row.total)})
+    return result
+
+
+def measure(func, runs: int, *args) -> tuple[dict, object]:
+    samples = []
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func(*args)
+        samples.append(time.perf_counter() - start)
+    return latency_summary(samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark předpočítaných facet")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    since = date.today() - timedelta(days=args.days - 1)
+
+    with scratch_session("bench_facets") as db:
+        start = time.perf_counter()
+        db.execute(SEED_SQL, {"rows": args.rows})
+        db.commit()
+        seed_s = time.perf_counter() - start
+        db.execute(text("ANALYZE articles"))
+        db.execute(text("ANALYZE article_facets"))
+        facet_rows = db.execute(text("SELECT count(*) FROM article_facets")).scalar()
+
+        facets_latency, facets = measure(facet_counts, args.runs, db, since, args.limit)
+        # Naivní agregace čte celé articles, stačí pár běhů
+        naive_latency, naive = measure(naive_counts, max(1, args.runs // 10), db, since, args.limit)
+
+    print(json.dumps({
+        "rows": args.rows,
+        "seed_with_trigger_s": seed_s,
+        "facet_rows": facet_rows,
+        "window_days": args.days,
+        "counter_table": facets_latency,
+        "naive_aggregate": naive_latency,
+        "results_match": facets == naive,
+    }, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
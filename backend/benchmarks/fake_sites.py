@@ -0,0 +1,77 @@
+"""
+Lokální HTTP server s uloženými HTML fixtures (titulní strana + článek).
+
+Crawler a content crawler tak v benchmarku stahují stránky z localhostu
+místo živých zpravodajských webů:
+    /                 -> fixtures/homepage.html
+    /clanek/<slug>    -> fixtures/article.html s titulkem z titulní strany
+                         a datem vydání "před hodinou" (vejde se do okna přehledu)
+"""
+
+import html
+import re
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+
+ARTICLE_LINK_RE = re.compile(r'<a href="(/clanek/[^"]+)">([^<]+)</a>')
+
+
+def homepage_html() -> str:
+    return (FIXTURES_DIR / "homepage.html").read_text(encoding="utf-8")
+
+
+def article_links() -> List[Tuple[str, str]]:
+    """Odkazy na články z titulní strany jako (cesta, titulek)."""
+    return [(path, html.unescape(title)) for path, title in ARTICLE_LINK_RE.findall(homepage_html())]
+
+
+def _make_handler(titles: Dict[str, str], homepage: bytes, article_template: str):
+    class FixtureHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split("?", 1)[0]
+            if path == "/":
+                self._send(homepage)
+            elif path in titles:
+                published = (datetime.now() - timedelta(hours=1)).replace(microsecond=0).isoformat()
+                body = article_template.replace("{title}", html.escape(titles[path])).replace("{published}", published)
+                self._send(body.encode("utf-8"))
+            else:
+                self.send_error(404)
+
+        def _send(self, body: bytes):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # Bez výpisu každého requestu
+            pass
+
+    return FixtureHandler
+
+
+@contextmanager
+def serve_fixtures() -> Iterator[str]:
+    """Spustí server na volném portu a vrátí jeho základní URL."""
+    titles = dict(article_links())
+    handler = _make_handler(
+        titles,
+        homepage_html().encode("utf-8"),
+        (FIXTURES_DIR / "article.html").read_text(encoding="utf-8"),
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}"
+    finally:
+        server.shutdown()
+        server.server_close()
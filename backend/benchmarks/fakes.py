@@ -0,0 +1,302 @@
+"""
+Falešní AI provideři pro offline benchmarky.
+
+FakeChatModel napodobuje rozhraní ChatGoogleGenerativeAI, které aplikace
+používá (invoke / ainvoke / astream / with_structured_output), a FakeGenAI
+napodobuje genai.embed_content. Odpovědi jsou deterministické a volání
+trvají nastavenou dobu, takže benchmark měří naši režii, ne Gemini.
+
+install() musí proběhnout před importem modulů, které si model vytváří
+při importu (crawler, generate_summary).
+"""
+
+import asyncio
+import hashlib
+import math
+import random
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+SAMPLE_SENTENCE = (
+    "Vláda dnes rozhodla o změně, která se dotkne statisíců lidí, "
+    "a opozice ohlásila, že se proti ní bude bránit. "
+)
+
+COUNTRIES = ["Česko", "USA", "Rusko", "Ukrajina", "Německo", "EU"]
+TOPICS = ["politika", "ekonomika", "bezpečnost", "technologie", "kultura"]
+
+
+def _tokens(text: str) -> int:
+    # Hrubý odhad jako v agentovi: ~4 znaky na token
+    return len(text) // 4 + 1
+
+
+class Latency:
+    """
+    Doba volání v ms s volitelným rozptylem (deterministický seed).
+    per_output_token_ms přidá čas úměrný délce odpovědi - u skutečného
+    LLM dominuje generování výstupu.
+    """
+
+    def __init__(self, ms: float, jitter_ms: float = 0, seed: int = 42, per_output_token_ms: float = 0):
+        self.ms = ms
+        self.jitter_ms = jitter_ms
+        self.per_output_token_ms = per_output_token_ms
+        self.random = random.Random(seed)
+
+    def seconds(self, output_tokens: int = 0) -> float:
+        jitter = self.random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0
+        return max(self.ms + jitter + self.per_output_token_ms * output_tokens, 0) / 1000
+
+    def sleep(self, output_tokens: int = 0):
+        time.sleep(self.seconds(output_tokens))
+
+    async def asleep(self, output_tokens: int = 0):
+        await asyncio.sleep(self.seconds(output_tokens))
+
+
+class ResourceExhausted(Exception):
+    """Stejné jméno jako google.api_core.exceptions.ResourceExhausted (HTTP 429)."""
+
+
+class RateLimit:
+    """
+    Limity providera: požadavky a tokeny v klouzavém okně (jako RPM/TPM
+    Gemini). Při překročení volání hned selže s ResourceExhausted.
+    Okno lze zkrátit (window_s), ať benchmark netrvá minuty.
+    """
+
+    def __init__(self, rpm: int = 0, tpm: int = 0, window_s: float = 60):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.window_s = window_s
+        self.accepted = 0
+        self.rejected = 0
+        self._events: deque = deque()
+        self._lock = threading.Lock()
+
+    def check(self, tokens: int):
+        with self._lock:
+            now = time.monotonic()
+            while self._events and self._events[0][0] <= now - self.window_s:
+                self._events.popleft()
+            requests = len(self._events)
+            used = sum(e[1] for e in self._events)
+            if (self.rpm and requests + 1 > self.rpm) or (self.tpm and used + tokens > self.tpm):
+                self.rejected += 1
+                raise ResourceExhausted("429 RESOURCE_EXHAUSTED: quota exceeded (fake)")
+            self._events.append((now, tokens))
+            self.accepted += 1
+
+
+# --- Strukturované odpovědi podle schématu ---
+
+def _article_selection(schema, prompt: str):
+    """Crawler: vybere každý řádek seznamu, který vypadá jako zpráva (dlouhý titulek)."""
+    items = []
+    for index, title in re.findall(r"^(\d+)\. (.+)$", prompt, flags=re.MULTILINE):
+        if len(title) < 40:
+            continue
+        items.append({
+            "index": int(index),
+            "what_happened": title[:200],
+            "impact_on": "obyvatelé Česka",
+            "countries": [COUNTRIES[int(index) % len(COUNTRIES)]],
+            "people": [f"Osoba {int(index) % 7}"],
+        })
+    return schema.model_validate({"articles": items})
+
+
+def _article_features(schema, prompt: str):
+    """Agent přehledu: hodnocení pro každé id článku v promptu."""
+    items = []
+    for article_id in re.findall(r'"id": (\d+)', prompt):
+        article_id = int(article_id)
+        items.append({
+            "article_id": article_id,
+            "news_value_score": 3 + article_id % 7,
+            "news_values": ["Dopad", "Aktuálnost"],
+            "reasoning": "Syntetické hodnocení pro benchmark.",
+            "country": COUNTRIES[article_id % len(COUNTRIES)],
+            "person": "",
+            "topic": TOPICS[article_id % len(TOPICS)],
+        })
+    return schema.model_validate({"articles": items})
+
+
+def _article_summaries(schema, prompt: str):
+    """Sumarizace: každý požadovaný styl (pole schématu) dostane text."""
+    return schema.model_validate({field: SAMPLE_SENTENCE * 5 for field in schema.model_fields})
+
+
+STRUCTURED_BUILDERS: Dict[str, Callable[[Any, str], Any]] = {
+    "ArticleSelection": _article_selection,
+    "ArticleFeaturesList": _article_features,
+    "ArticleSummaries": _article_summaries,
+}
+
+
+def _prompt_text(prompt: Any) -> str:
+    if isinstance(prompt, str):
+        return prompt
+    if isinstance(prompt, list):
+        return "\n".join(str(getattr(m, "content", m)) for m in prompt)
+    return str(getattr(prompt, "content", prompt))
+
+
+class FakeStructuredModel:
+    """
+    Structured output podle schématu. empty_rate = pravděpodobnost, že
+    nepovinné textové pole přijde prázdné (simulace částečného selhání).
+    """
+
+    def __init__(self, schema, latency: Latency, include_raw: bool = False, empty_rate: float = 0,
+                 rng: random.Random = None, rate_limit: Optional[RateLimit] = None):
+        if schema.__name__ not in STRUCTURED_BUILDERS:
+            raise NotImplementedError(f"Fake pro schéma {schema.__name__} neexistuje")
+        self.schema = schema
+        self.latency = latency
+        self.include_raw = include_raw
+        self.empty_rate = empty_rate
+        self.random = rng or random.Random(7)
+        self.rate_limit = rate_limit
+
+    def _parsed(self, prompt: Any):
+        parsed = STRUCTURED_BUILDERS[self.schema.__name__](self.schema, _prompt_text(prompt))
+        if self.empty_rate:
+            for name, field in self.schema.model_fields.items():
+                value = getattr(parsed, name)
+                if isinstance(value, str) and not field.is_required() and self.random.random() < self.empty_rate:
+                    setattr(parsed, name, "")
+        return parsed
+
+    def _result(self, prompt: Any, parsed):
+        text = _prompt_text(prompt)
+        if not self.include_raw:
+            return parsed
+        raw = AIMessage(
+            content=parsed.model_dump_json(),
+            usage_metadata={
+                "input_tokens": _tokens(text),
+                "output_tokens": _tokens(parsed.model_dump_json()),
+                "total_tokens": _tokens(text) + _tokens(parsed.model_dump_json()),
+            },
+        )
+        return {"raw": raw, "parsed": parsed, "parsing_error": None}
+
+    def invoke(self, prompt: Any, *args, **kwargs):
+        if self.rate_limit:
+            self.rate_limit.check(_tokens(_prompt_text(prompt)))
+        parsed = self._parsed(prompt)
+        self.latency.sleep(_tokens(parsed.model_dump_json()))
+        return self._result(prompt, parsed)
+
+    async def ainvoke(self, prompt: Any, *args, **kwargs):
+        if self.rate_limit:
+            self.rate_limit.check(_tokens(_prompt_text(prompt)))
+        parsed = self._parsed(prompt)
+        await self.latency.asleep(_tokens(parsed.model_dump_json()))
+        return self._result(prompt, parsed)
+
+
+class FakeChatModel:
+    """Náhrada ChatGoogleGenerativeAI s deterministickými odpověďmi."""
+
+    def __init__(self, latency: Latency, output_sentences: int = 5, stream_chunks: int = 8, empty_rate: float = 0,
+                 rate_limit: Optional[RateLimit] = None):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.output_sentences = output_sentences
+        self.stream_chunks = stream_chunks
+        self.empty_rate = empty_rate
+        # Sdílený generátor - každé volání with_structured_output vynechá jiná pole
+        self.random = random.Random(7)
+
+    def _message(self, prompt: Any, content: str) -> AIMessage:
+        input_tokens = _tokens(_prompt_text(prompt))
+        output_tokens = _tokens(content)
+        return AIMessage(content=content, usage_metadata={
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        })
+
+    def _content(self) -> str:
+        return (SAMPLE_SENTENCE * self.output_sentences).strip()
+
+    def _check_limit(self, prompt: Any):
+        if self.rate_limit:
+            self.rate_limit.check(_tokens(_prompt_text(prompt)))
+
+    def invoke(self, prompt: Any, *args, **kwargs) -> AIMessage:
+        self._check_limit(prompt)
+        content = self._content()
+        self.latency.sleep(_tokens(content))
+        return self._message(prompt, content)
+
+    async def ainvoke(self, prompt: Any, *args, **kwargs) -> AIMessage:
+        self._check_limit(prompt)
+        content = self._content()
+        await self.latency.asleep(_tokens(content))
+        return self._message(prompt, content)
+
+    async def astream(self, prompt: Any, *args, **kwargs):
+        """Rozdělí odpověď na chunky; latence se rozloží mezi ně (čas do prvního tokenu ~ 1/n)."""
+        self._check_limit(prompt)
+        content = self._content()
+        size = math.ceil(len(content) / self.stream_chunks)
+        pause = self.latency.seconds(_tokens(content)) / self.stream_chunks
+        for start in range(0, len(content), size):
+            await asyncio.sleep(pause)
+            yield AIMessageChunk(content=content[start:start + size])
+        yield AIMessageChunk(content="", usage_metadata={
+            "input_tokens": _tokens(_prompt_text(prompt)),
+            "output_tokens": _tokens(content),
+            "total_tokens": _tokens(_prompt_text(prompt)) + _tokens(content),
+        })
+
+    def with_structured_output(self, schema, include_raw: bool = False, **kwargs):
+        return FakeStructuredModel(schema, self.latency, include_raw=include_raw, empty_rate=self.empty_rate,
+                                   rng=self.random, rate_limit=self.rate_limit)
+
+
+class FakeGenAI:
+    """Náhrada modulu google.generativeai (jen embed_content)."""
+
+    def __init__(self, latency: Latency, dimensions: int = 768):
+        self.latency = latency
+        self.dimensions = dimensions
+
+    def embed_content(self, model: str, content, task_type: str = None, **kwargs) -> dict:
+        self.latency.sleep()
+        if isinstance(content, list):
+            return {"embedding": [self._vector(text) for text in content]}
+        return {"embedding": self._vector(content)}
+
+    def _vector(self, text: str) -> list:
+        # Deterministický jednotkový vektor z hashe textu
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+        rnd = random.Random(seed)
+        values = [rnd.gauss(0, 1) for _ in range(self.dimensions)]
+        norm = math.sqrt(sum(v * v for v in values)) or 1.0
+        return [v / norm for v in values]
+
+
+def install(llm_latency: Latency, embed_latency: Latency, empty_rate: float = 0) -> Dict[str, Any]:
+    """
+    Podvrhne falešné providery do src.providers. Vrací použité instance
+    (pro kontrolu v benchmarku).
+    """
+    from src import providers
+
+    chat_model = FakeChatModel(llm_latency, empty_rate=empty_rate)
+    genai = FakeGenAI(embed_latency)
+    providers.get_chat_model = lambda *args, **kwargs: chat_model
+    providers.get_genai = lambda: genai
+    return {"chat_model": chat_model, "genai": genai}
+
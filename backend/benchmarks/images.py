@@ -0,0 +1,76 @@
+"""
+Benchmark velikosti obrázků na jedno zobrazení článku.
+
+Vygeneruje syntetický obrázek (nebo použije zadaný soubor), uloží ho přes
+images.store_image do dočasného adresáře a porovná velikost původního
+souboru s variantami, které prohlížeč stáhne podle srcset (šířka 640 px
+pro mobil/desktop, 1280 px pro retina).
+
+Spuštění (z adresáře backend/):
+    python -m benchmarks.images
+    python -m benchmarks.images --source cesta/k/obrazku.png
+"""
+
+import argparse
+import io
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+
+def synthetic_png(width: int, height: int) -> bytes:
+    """Obrázek s přechody a šumem - podobně špatně se komprimuje jako ilustrace z generátoru."""
+    from PIL import Image
+
+    noise = Image.effect_noise((width, height), 64).convert("L")
+    gradient = Image.linear_gradient("L").resize((width, height))
+    image = Image.merge("RGB", (gradient, noise, gradient.transpose(Image.FLIP_LEFT_RIGHT)))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark variant obrázků")
+    parser.add_argument("--source", type=Path, default=None)
+    parser.add_argument("--width", type=int, default=1792)
+    parser.add_argument("--height", type=int, default=1024)
+    args = parser.parse_args()
+
+    data = args.source.read_bytes() if args.source else synthetic_png(args.width, args.height)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # IMAGES_DIR se čte při importu modulu
+        os.environ["IMAGES_DIR"] = tmp
+        from src import images
+
+        start = time.perf_counter()
+        filename = images.store_image(data)
+        store_s = time.perf_counter() - start
+
+        sizes = {path.name: path.stat().st_size for path in sorted(Path(tmp).iterdir())}
+
+    stem = filename.rsplit(".", 1)[0]
+    per_view = {}
+    for width in (640, 1280):
+        for fmt in ("avif", "webp"):
+            name = f"{stem}-{width}.{fmt}"
+            if name in sizes:
+                per_view[f"{width}_{fmt}"] = {
+                    "bytes": sizes[name],
+                    "reduction": round(len(data) / sizes[name], 1),
+                }
+
+    print(json.dumps({
+        "original_bytes": len(data),
+        "full_size_webp_bytes": sizes[filename],
+        "store_s": store_s,
+        "files": sizes,
+        "per_view": per_view,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
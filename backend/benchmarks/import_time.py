@@ -0,0 +1,102 @@
+"""
+Benchmark startu API workeru.
+
+Měří, jak dlouho trvá `import src.main` a průchod lifespan startem aplikace
+v čistém procesu (tak, jak to dělá gunicorn worker při bootu).
+S parametrem --baseline <git revize> změří totéž i pro starší verzi
+backendu a vypíše srovnání. Stará verze při importu volá create_all,
+takže DATABASE_URL musí ukazovat na běžící databázi.
+
+Spuštění (z adresáře backend/):
+    python -m benchmarks.import_time --runs 10 --baseline d320f58
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Kód, který běží v čistém interpretu - import aplikace a start lifespanu
+BOOT_SNIPPET = """
+import asyncio, json, time
+t0 = time.perf_counter()
+from src.main import app
+t1 = time.perf_counter()
+
+async def _startup():
+    ctx = app.router.lifespan_context(app)
+    await ctx.__aenter__()
+    return ctx
+
+asyncio.run(_startup())
+t2 = time.perf_counter()
+print(json.dumps({"import_s": t1 - t0, "startup_s": t2 - t1, "boot_s": t2 - t0}))
+"""
+
+
+def measure(backend_dir: Path, runs: int) -> dict:
+    """Spustí boot workeru `runs`-krát a vrátí mediány a p90 časů."""
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", BOOT_SNIPPET],
+            cwd=backend_dir,
+            env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        samples.append(json.loads(result.stdout.strip().splitlines()[-1]))
+
+    report = {"runs": runs}
+    for key in ("import_s", "startup_s", "boot_s"):
+        values = sorted(s[key] for s in samples)
+        report[key] = {
+            "p50": statistics.median(values),
+            "p90": values[int(0.9 * (len(values) - 1))],
+        }
+    return report
+
+
+def export_revision(revision: str, target: Path) -> Path:
+    """Vyexportuje backend z dané git revize do dočasného adresáře."""
+    archive = target / "backend.tar"
+    subprocess.run(
+        ["git", "archive", "-o", str(archive), f"{revision}:./"],
+        cwd=BACKEND_DIR,
+        check=True,
+    )
+    with tarfile.open(archive) as tar:
+        tar.extractall(target / "backend")
+    return target / "backend"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark startu API workeru")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--baseline", help="git revize pro srovnání (např. baseline commit)")
+    args = parser.parse_args()
+
+    results = {"current": measure(BACKEND_DIR, args.runs)}
+    if args.baseline:
+        with tempfile.TemporaryDirectory() as tmp:
+            baseline_dir = export_revision(args.baseline, Path(tmp))
+            results["baseline"] = measure(baseline_dir, args.runs)
+
+    print(json.dumps(results, indent=2))
+
+    if "baseline" in results:
+        before = results["baseline"]["boot_s"]["p50"]
+        after = results["current"]["boot_s"]["p50"]
+        print(f"\n⏱️  Boot workeru (p50): {before * 1000:.0f} ms -> {after * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
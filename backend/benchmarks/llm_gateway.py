@@ -0,0 +1,172 @@
+"""
+Benchmark LLM gateway proti falešnému provideru s limity RPM/TPM.
+
+Souběžně běží tři druhy práce jako při současném spuštění skriptů:
+dohánění starých článků (BACKFILL), nové články (FRESH) a přehled
+(DIGEST, přijde později a několik profilů posílá stejný prompt).
+
+- direct: každý pracovník volá providera sám a po 429 čeká pevnou dobu
+  (dřívější chování - vlastní max_retries v každém klientovi),
+- gateway: všechna volání jdou přes jednu LLMGateway s LocalQuota.
+
+Vypíše p50/p99 doby dokončení podle priority, počet odmítnutí 429,
+volání providera (slučování) a neúspěšné požadavky. Okno kvóty je
+zkrácené (--window-s), ať benchmark netrvá minuty.
+
+Režim gateway se zároveň ověří (check_gateway) - bez odmítnutí 429
+a neúspěchů, DIGEST před BACKFILL, stejné prompty přehledu sloučené;
+při porušení skončí nenulovým kódem (lze pustit v CI).
+
+Spuštění (z adresáře backend/, databáze není potřeba):
+    python -m benchmarks.llm_gateway --rpm 20 --window-s 2
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+from benchmarks import fakes
+
+
+def workload(args):
+    """(priorita, krok, prompt, zpoždění startu) pro každý požadavek."""
+    filler = "Obsah článku pro sumarizaci. " * args.prompt_sentences
+    jobs = []
+    for worker in range(args.backfill_workers):
+        for i in range(args.backfill_requests):
+            jobs.append(("BACKFILL", f"backfill-{worker}", f"Starý článek {worker}/{i}. {filler}", 0.0))
+    for worker in range(args.fresh_workers):
+        for i in range(args.fresh_requests):
+            jobs.append(("FRESH", f"fresh-{worker}", f"Nový článek {worker}/{i}. {filler}", 0.0))
+    # Přehled přijde, když je fronta plná; profily se stejným výběrem posílají stejný prompt
+    for i in range(args.digest_requests):
+        jobs.append(("DIGEST", "digest", f"Přehled {i // args.profiles_per_digest}. {filler}", args.window_s / 2))
+    return jobs
+
+
+def run(mode: str, args) -> dict:
+    from src.llm_gateway import LLMGateway, LocalQuota, Priority
+
+    rate_limit = fakes.RateLimit(rpm=args.rpm, tpm=args.tpm, window_s=args.window_s)
+    model = fakes.FakeChatModel(fakes.Latency(args.llm_latency_ms), rate_limit=rate_limit)
+    gateway = LLMGateway(
+        "bench",
+        # Provider zapisuje volání až chvíli po rezervaci - okno s malou rezervou
+        LocalQuota(args.rpm, args.tpm, window_s=args.window_s + args.quota_margin_s),
+        max_concurrency=args.concurrency,
+        max_retries=args.retries,
+    )
+
+    # Pracovník = krok se sekvenčními požadavky; přehled každého profilu běží zvlášť
+    queues = defaultdict(list)
+    for index, job in enumerate(workload(args)):
+        queues[job[1] if job[0] != "DIGEST" else f"digest-{index}"].append(job)
+
+    latencies = defaultdict(list)
+    failures = defaultdict(int)
+    lock = threading.Lock()
+
+    def direct(prompt: str):
+        for attempt in range(args.retries + 1):
+            try:
+                return model.invoke(prompt)
+            except fakes.ResourceExhausted:
+                if attempt == args.retries:
+                    raise
+                time.sleep(args.direct_retry_s)
+
+    def worker(jobs):
+        for priority, stage, prompt, delay in jobs:
+            time.sleep(delay)
+            start = time.perf_counter()
+            try:
+                if mode == "gateway":
+                    gateway.call(lambda: model.invoke(prompt), stage=stage, priority=Priority[priority], prompt=prompt)
+                else:
+                    direct(prompt)
+            except fakes.ResourceExhausted:
+                with lock:
+                    failures[priority] += 1
+                continue
+            with lock:
+                latencies[priority].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=worker, args=(jobs,)) for jobs in queues.values()]
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    from benchmarks.common import latency_summary
+
+    return {
+        "wall_s": round(wall, 2),
+        "requests": sum(len(jobs) for jobs in queues.values()),
+        "provider_calls": rate_limit.accepted,
+        "rejected_429": rate_limit.rejected,
+        "failed": dict(failures),
+        "latency": {
+            priority: latency_summary(samples)
+            for priority, samples in sorted(latencies.items())
+        },
+    }
+
+
+def check_gateway(result: dict, args) -> list:
+    """Chování gateway vůči falešnému provideru; vrátí seznam porušení."""
+    problems = []
+    if result["rejected_429"]:
+        problems.append(f"provider odmítl {result['rejected_429']} volání (429), gateway má držet kvótu")
+    if result["failed"]:
+        problems.append(f"neúspěšné požadavky: {result['failed']}")
+    latency = result["latency"]
+    if "DIGEST" in latency and "BACKFILL" in latency and latency["DIGEST"]["p50_ms"] >= latency["BACKFILL"]["p50_ms"]:
+        problems.append(
+            f"DIGEST p50 {latency['DIGEST']['p50_ms']:.0f} ms není před BACKFILL {latency['BACKFILL']['p50_ms']:.0f} ms"
+        )
+    if args.profiles_per_digest > 1 and args.digest_requests > 1 and result["provider_calls"] >= result["requests"]:
+        problems.append("stejné prompty přehledu se nesloučily (volání providera = počet požadavků)")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM gateway vs. přímá volání proti limitům RPM/TPM")
+    parser.add_argument("--rpm", type=int, default=20, help="Požadavků za okno")
+    parser.add_argument("--tpm", type=int, default=0, help="Tokenů za okno (0 = bez limitu)")
+    parser.add_argument("--window-s", type=float, default=2.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--retries", type=int, default=6)
+    parser.add_argument("--direct-retry-s", type=float, default=0.5, help="Pevná pauza po 429 v režimu direct")
+    parser.add_argument("--backfill-workers", type=int, default=4)
+    parser.add_argument("--backfill-requests", type=int, default=15)
+    parser.add_argument("--fresh-workers", type=int, default=2)
+    parser.add_argument("--fresh-requests", type=int, default=10)
+    parser.add_argument("--digest-requests", type=int, default=6)
+    parser.add_argument("--profiles-per-digest", type=int, default=3, help="Kolik profilů sdílí stejný prompt")
+    parser.add_argument("--prompt-sentences", type=int, default=50)
+    parser.add_argument("--quota-margin-s", type=float, default=0.05, help="Rezerva okna kvóty gateway")
+    args = parser.parse_args()
+
+    # Databáze se nepoužívá, engine se ale vytváří při importu src.database
+    os.environ.setdefault("DATABASE_URL", "postgresql://benchmark@localhost/unused")
+
+    results = {mode: run(mode, args) for mode in ("direct", "gateway")}
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+    problems = check_gateway(results["gateway"], args)
+    for problem in problems:
+        print(f"❌ {problem}")
+    if problems:
+        raise SystemExit(1)
+    print("✅ Gateway: bez 429 a neúspěchů, DIGEST před BACKFILL, stejné prompty sloučené")
+
+
+if __name__ == "__main__":
+    main()
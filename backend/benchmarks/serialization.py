@@ -0,0 +1,101 @@
+"""
+Benchmark serializace detailu článku.
+
+Porovná cestu, kterou FastAPI používá ve výchozím stavu (jsonable_encoder
++ stdlib json), se serializací přes orjson a vypíše velikost odpovědi
+bez komprese, s gzipem a s brotli.
+
+Spuštění (z adresáře backend/):
+    python -m benchmarks.serialization --iterations 2000
+"""
+
+import argparse
+import gzip
+import json
+import time
+from datetime import datetime
+
+import brotli
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+from src.schemas import ArticleDetail
+
+PARAGRAPH = (
+    "Vláda na svém dnešním jednání schválila návrh zákona, který mění pravidla "
+    "pro financování obcí a krajů. Podle ministra financí se tím sníží rozdíly "
+    "mezi regiony a obce získají víc peněz na investice do infrastruktury. "
+    "Opozice návrh kritizuje a upozorňuje, že změna přinese nejistotu do rozpočtů. "
+)
+
+
+def typical_detail() -> ArticleDetail:
+    """Sestaví detail článku velikostí odpovídající běžnému článku (~10 kB textu)."""
+    content = "\n\n".join(f"## Odstavec {i}\n\n{PARAGRAPH * 2}" for i in range(15))
+    return ArticleDetail(
+        id=12345,
+        title="Vláda schválila novelu rozpočtového určení daní, obce dostanou víc peněz",
+        url="https://www.novinky.cz/clanek/domaci-vlada-schvalila-novelu-40500000",
+        categories={
+            "what_happened": "Vláda schválila novelu rozpočtového určení daní.",
+            "impact_on": "obce a kraje",
+            "countries": ["Česko"],
+            "people": ["ministr financí"],
+        },
+        content=content,
+        published_date=datetime(2025, 12, 1, 8, 30),
+        summary_simple=PARAGRAPH,
+        summary_funny=PARAGRAPH,
+        summary_storytelling=PARAGRAPH * 2,
+        retold_content=PARAGRAPH * 6,
+        image_filename="3f2a9c1b7d.webp",
+    )
+
+
+def stdlib_json(detail: ArticleDetail) -> bytes:
+    # Stejné volání jako fastapi.responses.JSONResponse.render
+    return json.dumps(
+        jsonable_encoder(detail),
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def orjson_dump(detail: ArticleDetail) -> bytes:
+    return orjson.dumps(detail.model_dump())
+
+
+def timeit(fn, detail, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(detail)
+    return (time.perf_counter() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark serializace detailu článku")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    detail = typical_detail()
+    body = orjson_dump(detail)
+
+    report = {
+        "serialization_us": {
+            "stdlib_json": timeit(stdlib_json, detail, args.iterations) * 1e6,
+            "orjson": timeit(orjson_dump, detail, args.iterations) * 1e6,
+        },
+        "bytes_on_wire": {
+            "identity": len(body),
+            # Výchozí nastavení GZipMiddleware / BrotliMiddleware
+            "gzip": len(gzip.compress(body, compresslevel=9)),
+            "brotli": len(brotli.compress(body, quality=4)),
+        },
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark sumarizace ve více stylech: jedno structured volání na článek
+(SUMMARY_MODE=combined) vs. samostatné volání pro každý styl (per_style).
+
+Běží offline s falešným LLM (fakes.py): usage_metadata odhaduje tokeny
+z délky promptu a odpovědi a latence roste s počtem výstupních tokenů,
+takže rozdíl je hlavně v opakovaném posílání obsahu článku a v režii
+volání. --empty-rate simuluje prázdná pole v combined odpovědi (ta se
+dogenerují samostatně).
+
+Spuštění (z adresáře backend/, databáze není potřeba):
+    python -m benchmarks.summary_styles --articles 50 --empty-rate 0.05
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import time
+
+from benchmarks import fakes
+
+PARAGRAPH = (
+    "Vláda na svém dnešním jednání schválila návrh zákona, který mění pravidla "
+    "pro financování obcí a krajů. Podle ministra financí se tím sníží rozdíly "
+    "mezi regiony a obce získají víc peněz na investice do infrastruktury. "
+)
+
+
+def run_mode(generate_summary, articles, styles, mode: str) -> dict:
+    from src.instrumentation import USAGE
+
+    USAGE.reset()
+    samples = []
+    missing = 0
+    start = time.perf_counter()
+    for article in articles:
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = generate_summary.summarize_article(article, styles, mode=mode)
+        samples.append(time.perf_counter() - t0)
+        missing += len(styles) - len(results)
+    wall = time.perf_counter() - start
+
+    usage = USAGE.report()["summary"]
+    return {
+        "wall_s": round(wall, 3),
+        "ms_per_article": round(wall / len(articles) * 1000, 1),
+        "calls_per_article": round(usage["calls"] / len(articles), 2),
+        "input_tokens_per_article": usage["input_tokens_per_item"],
+        "output_tokens_per_article": usage["output_tokens_per_item"],
+        "cost_usd_per_1000_articles": round(usage["cost_usd_per_item"] * 1000, 4),
+        "missing_styles": missing,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sumarizace: jedno volání na článek vs. volání na styl")
+    parser.add_argument("--articles", type=int, default=50)
+    parser.add_argument("--styles", default="simple,funny,storytelling,retold")
+    parser.add_argument("--content-paragraphs", type=int, default=20, help="Délka obsahu článku")
+    parser.add_argument("--llm-latency-ms", type=float, default=300, help="Pevná režie volání")
+    parser.add_argument("--per-token-ms", type=float, default=8, help="Čas generování na výstupní token")
+    parser.add_argument("--empty-rate", type=float, default=0.0, help="Podíl prázdných polí v combined odpovědi")
+    args = parser.parse_args()
+
+    # Databáze se nepoužívá, engine se ale vytváří při importu src.database
+    os.environ.setdefault("DATABASE_URL", "postgresql://benchmark@localhost/unused")
+    os.environ["LLM_QUOTA_BACKEND"] = "local"
+    os.environ.setdefault("LLM_RPM", "0")
+    os.environ.setdefault("LLM_TPM", "0")
+    fakes.install(
+        fakes.Latency(args.llm_latency_ms, per_output_token_ms=args.per_token_ms),
+        fakes.Latency(0),
+        empty_rate=args.empty_rate,
+    )
+    from src import generate_summary
+    from src.models import Article
+
+    styles = [s.strip() for s in args.styles.split(",") if s.strip()]
+    content = "\n\n".join(PARAGRAPH * 2 for _ in range(args.content_paragraphs))
+    articles = [
+        Article(id=i, title=f"Vláda schválila novelu zákona č. {i}", content=content)
+        for i in range(1, args.articles + 1)
+    ]
+
+    results = {mode: run_mode(generate_summary, articles, styles, mode) for mode in ("per_style", "combined")}
+    per_style, combined = results["per_style"], results["combined"]
+    results["combined_vs_per_style"] = {
+        "input_tokens": round(combined["input_tokens_per_article"] / per_style["input_tokens_per_article"], 3),
+        "wall_time": round(combined["wall_s"] / per_style["wall_s"], 3),
+        "cost": round(combined["cost_usd_per_1000_articles"] / per_style["cost_usd_per_1000_articles"], 3),
+    }
+    print(json.dumps({"styles": styles, "articles": args.articles, **results}, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Benchmark ANN indexu embeddingů: plné vektory vs. halfvec vs. binární kvantizace.
+
+Naplní dočasné schéma syntetickými jednotkovými vektory (shluky kolem
+náhodných center, jako témata zpráv) a pro každý typ indexu
+(EMBEDDING_INDEX) změří dobu stavby a velikost indexu a pro dotazové
+vektory mimo tabulku latenci a recall@k proti přesnému výsledku
+(numpy, plné vektory). Kvantované indexy se měří bez re-rankingu
+(faktor 1) i s ním (--rerank-factor): kandidáty z indexu přesně seřadí
+plné vektory v tabulce, stejným dotazem jako /articles/{id}/related.
+
+Spuštění (z adresáře backend/, potřebuje DATABASE_URL a pgvector >= 0.7):
+    python -m benchmarks.vector_index --rows 50000 --queries 200
+"""
+
+import argparse
+import io
+import json
+import time
+
+import numpy as np
+from sqlalchemy import text
+
+from benchmarks.common import latency_summary, scratch_session
+from src.embeddings import nearest_sql, set_search_breadth, vector_index_ddl, vector_index_name
+
+MODEL_ID = "bench:synthetic"
+
+
+def synthetic_vectors(rows: int, dims: int, clusters: int, noise: float, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dims)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, rows)] + noise * rng.standard_normal((rows, dims)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def vector_literal(vector: np.ndarray) -> str:
+    return "[" + ",".join(f"{value:.6f}" for value in vector) + "]"
+
+
+def seed(db, vectors: np.ndarray, batch: int = 5000):
+    """COPY je řádově rychlejší než INSERT s tisíci floaty v parametrech."""
+    cursor = db.connection().connection.cursor()
+    for start in range(0, len(vectors), batch):
+        buffer = io.StringIO()
+        for i, vector in enumerate(vectors[start:start + batch], start + 1):
+            buffer.write(f"Článek {i}\thttps://bench.local/{i}\t{vector_literal(vector)}\t{MODEL_ID}\n")
+        buffer.seek(0)
+        cursor.copy_expert("COPY articles (title, url, embedding, embedding_model) FROM STDIN", buffer)
+    db.commit()
+
+
+def exact_neighbours(vectors: np.ndarray, queries: np.ndarray, k: int) -> list:
+    # Jednotkové vektory: nejmenší kosinová vzdálenost = největší skalární součin
+    scores = queries @ vectors.T
+    top = np.argpartition(-scores, k, axis=1)[:, :k]
+    # id v tabulce = pořadí řádku + 1
+    return [set((row + 1).tolist()) for row in top]
+
+
+def measure(db, index: str, dims: int, queries: np.ndarray, truth: list, k: int, factor: int) -> dict:
+    query = text(nearest_sql(dims, "CAST(:query AS vector)", "a.id", index=index))
+    candidates = k * factor
+    samples = []
+    recalls = []
+    for vector, expected in zip(queries, truth):
+        params = {"query": vector_literal(vector), "model": MODEL_ID, "candidates": candidates, "limit": k}
+        set_search_breadth(db, candidates)
+        start = time.perf_counter()
+        found = {row.id for row in db.execute(query, params)}
+        samples.append(time.perf_counter() - start)
+        recalls.append(len(found & expected) / k)
+    db.rollback()
+
+    set_search_breadth(db, candidates)
+    plan = "\n".join(row[0] for row in db.execute(
+        text(f"EXPLAIN {query.text}"),
+        {"query": vector_literal(queries[0]), "model": MODEL_ID, "candidates": candidates, "limit": k},
+    ))
+    db.rollback()
+    return {
+        "rerank_factor": factor,
+        "candidates": candidates,
+        f"recall@{k}": round(float(np.mean(recalls)), 4),
+        "uses_index": vector_index_name(MODEL_ID, index) in plan,
+        "latency": latency_summary(samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ANN index embeddingů: vector vs. halfvec vs. bit")
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--dims", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--clusters", type=int, default=200, help="Počet shluků (témat) v datech")
+    parser.add_argument("--noise", type=float, default=0.6, help="Rozptyl kolem centra shluku")
+    parser.add_argument("--rerank-factor", type=int, default=4)
+    parser.add_argument("--indexes", default="vector,halfvec,bit")
+    parser.add_argument("--maintenance-work-mem", default="1GB", help="Paměť pro stavbu indexu")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    data = synthetic_vectors(args.rows + args.queries, args.dims, args.clusters, args.noise, args.seed)
+    vectors, queries = data[:args.rows], data[args.rows:]
+    truth = exact_neighbours(vectors, queries, args.k)
+
+    results = {}
+    with scratch_session("bench_vectors") as db:
+        start = time.perf_counter()
+        seed(db, vectors)
+        seed_s = time.perf_counter() - start
+        db.execute(text("ANALYZE articles"))
+        heap_mb = db.execute(text("SELECT pg_total_relation_size('articles') / 1048576.0")).scalar()
+        db.commit()
+
+        for index in [name.strip() for name in args.indexes.split(",") if name.strip()]:
+            db.execute(text(f"SET maintenance_work_mem = '{args.maintenance_work_mem}'"))
+            start = time.perf_counter()
+            db.execute(text(vector_index_ddl(MODEL_ID, args.dims, index)))
+            db.commit()
+            build_s = time.perf_counter() - start
+            name = vector_index_name(MODEL_ID, index)
+            size = db.execute(text("SELECT pg_relation_size(CAST(:name AS regclass))"), {"name": name}).scalar()
+            db.commit()
+
+            factors = [1] if index == "vector" else sorted({1, args.rerank_factor})
+            results[index] = {
+                "build_s": round(build_s, 2),
+                "index_mb": round(size / 1048576, 1),
+                "index_bytes_per_row": round(size / args.rows, 1),
+                "queries": [measure(db, index, args.dims, queries, truth, args.k, factor) for factor in factors],
+            }
+            db.execute(text(f"DROP INDEX {name}"))
+            db.commit()
+
+    print(json.dumps({
+        "rows": args.rows,
+        "dims": args.dims,
+        "seed_s": round(seed_s, 2),
+        "table_mb": round(float(heap_mb), 1),
+        **results,
+    }, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Dávkový zápis výsledků batch skriptů (content crawler, sumarizace, embeddingy).
+
+Místo commitu po každém článku (round trip + flush WAL, a po commitu
+expirace všech načtených ORM objektů) se výsledky sbírají a zapíšou
+jedním `UPDATE ... FROM (VALUES ...)` v jedné transakci, jakmile je jich
+BATCH_WRITE_ROWS nebo od první nezapsané položky uplynulo
+BATCH_WRITE_SECONDS. Ve stejné transakci se zapíší i výsledky do
+evidence běhu (run_ledger), takže po pádu se přijde nejvýš o jednu
+dávku hotové práce - a ta se při navázání udělá znovu.
+
+Writer session přepne na expire_on_commit=False a nové hodnoty nastaví
+i do ORM objektů (bez označení ke změně), takže načtené články se po
+commitu nemusí znovu načítat po jednom.
+
+Použití:
+    with BatchWriter(db, "summary", ledger=ledger) as writer:
+        for article in articles:
+            writer.update(article, summary_simple=text)   # nebo writer.fail(article.id, str(e))
+"""
+
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import bindparam, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from .instrumentation import record_stage_error
+from .models import Article
+from .run_ledger import RunLedger
+
+load_dotenv()
+
+BATCH_WRITE_ROWS = int(os.getenv("BATCH_WRITE_ROWS", "50"))
+BATCH_WRITE_SECONDS = float(os.getenv("BATCH_WRITE_SECONDS", "5"))
+
+
+class BatchWriter:
+    def __init__(self, db: Session, stage: str, ledger: Optional[RunLedger] = None, model=Article,
+                 max_rows: int = BATCH_WRITE_ROWS, max_seconds: float = BATCH_WRITE_SECONDS):
+        self.db = db
+        # Commit dávky nesmí vyexpirovat články, které skript ještě zpracovává
+        self.db.expire_on_commit = False
+        self.stage = stage
+        self.ledger = ledger
+        self.table = model.__table__
+        self.max_rows = max(1, max_rows)
+        self.max_seconds = max_seconds
+        # Zápisy: id -> hodnoty sloupců; výsledky do evidence běhu: (id, chyba)
+        self.rows: Dict[int, Dict[str, Any]] = {}
+        self.outcomes: List[Tuple[int, Optional[str]]] = []
+        self.first_pending: Optional[float] = None
+        self.flushes = 0
+        self.failed_writes = 0
+
+    def __enter__(self) -> "BatchWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+            return False
+        # Hotovou práci uložíme i při přerušení (Ctrl+C) nebo chybě; původní výjimku nepřebíjíme
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"   ⚠️ Rozpracovanou dávku se nepodařilo uložit: {e}")
+        return False
+
+    def __len__(self) -> int:
+        return len(self.outcomes)
+
+    def update(self, obj, **values: Any):
+        """Naplánuje zápis hodnot do řádku obj a úspěch položky v evidenci běhu."""
+        for key, value in values.items():
+            set_committed_value(obj, key, value)
+        self.rows.setdefault(obj.id, {}).update(values)
+        self._add(obj.id, None)
+
+    def fail(self, item_id: int, error: str):
+        """Naplánuje neúspěch položky v evidenci běhu (bez zápisu do tabulky)."""
+        self._add(item_id, error)
+
+    def _add(self, item_id: int, error: Optional[str]):
+        self.outcomes.append((item_id, error))
+        if self.first_pending is None:
+            self.first_pending = time.monotonic()
+        if len(self.outcomes) >= self.max_rows or time.monotonic() - self.first_pending >= self.max_seconds:
+            self.flush()
+
+    def _update_statement(self, rows: Dict[int, Dict[str, Any]], columns: Tuple[str, ...]):
+        """UPDATE ... FROM (VALUES ...) pro řádky se stejnou sadou sloupců."""
+        names = ("id",) + columns
+        params = []
+        values_sql = []
+        for i, (row_id, values) in enumerate(rows.items()):
+            placeholders = []
+            for name in names:
+                column = self.table.c[name]
+                param = f"{name}_{i}"
+                params.append(bindparam(param, row_id if name == "id" else values[name], type_=column.type))
+                # Typ v CAST - NULL ani vektor by Postgres v VALUES neodvodil
+                placeholders.append(f"CAST(:{param} AS {column.type.compile(dialect=postgresql.dialect())})")
+            values_sql.append(f"({', '.join(placeholders)})")
+        assignments = ", ".join(f"{name} = v.{name}" for name in columns)
+        return text(
+            f"UPDATE {self.table.name} AS t SET {assignments} "
+            f"FROM (VALUES {', '.join(values_sql)}) AS v({', '.join(names)}) "
+            f"WHERE t.id = v.id"
+        ).bindparams(*params)
+
+    def _write(self, rows: Dict[int, Dict[str, Any]], outcomes: List[Tuple[int, Optional[str]]]):
+        groups: Dict[Tuple[str, ...], Dict[int, Dict[str, Any]]] = {}
+        for row_id, values in rows.items():
+            groups.setdefault(tuple(sorted(values)), {})[row_id] = values
+        for columns, group in groups.items():
+            self.db.execute(self._update_statement(group, columns))
+        if self.ledger is not None:
+            self.ledger.record_many(outcomes)
+        self.db.commit()
+
+    def flush(self):
+        """Zapíše nasbírané výsledky jednou transakcí."""
+        if not self.outcomes:
+            return
+        rows, outcomes = self.rows, self.outcomes
+        self.rows, self.outcomes, self.first_pending = {}, [], None
+        self.flushes += 1
+        try:
+            self._write(rows, outcomes)
+        except Exception as e:
+            # Jeden vadný řádek nesmí shodit celou dávku - zkusíme je po jednom
+            print(f"   ⚠️ Dávkový zápis selhal ({e}), zapisuji po jednom")
+            self.db.rollback()
+            for item_id, error in outcomes:
+                row = {item_id: rows[item_id]} if error is None and item_id in rows else {}
+                try:
+                    self._write(row, [(item_id, error)])
+                except Exception as row_error:
+                    print(f"   ❌ Chyba při ukládání {item_id}: {row_error}")
+                    record_stage_error(self.stage, row_error)
+                    self.db.rollback()
+                    self.failed_writes += 1
+                    if self.ledger is not None:
+                        self.ledger.record(item_id, error=str(row_error))
+                        self.db.commit()
@@ -4,8 +4,11 @@ from typing import Optional
 import trafilatura
 from sqlalchemy.orm import Session
 
-from .database import SessionLocal
+from .batch_writer import BatchWriter
+from .database import WorkerSessionLocal
+from .instrumentation import push_metrics, record_fetch, record_stage_error, span, track_stage
 from .models import Article as DBArticle
+from .run_ledger import run_ledger
 
 
 def fetch_article_content(url: str) -> tuple[Optional[str], Optional[datetime]]:
@@ -17,19 +20,22 @@ def fetch_article_content(url: str) -> tuple[Optional[str], Optional[datetime]]:
         print(f"📰 Stahuji článek: {url}")
         
         # Stažení HTML
-        downloaded = trafilatura.fetch_url(url)
+        with span("fetch", url=url):
+            downloaded = trafilatura.fetch_url(url)
         if not downloaded:
             print(f"   ❌ Nepodařilo se stáhnout URL")
             return None, None
+        record_fetch("content", len(downloaded.encode("utf-8")))
         
         # Extrakce obsahu s metadaty
-        metadata = trafilatura.extract_metadata(downloaded)
-        content = trafilatura.extract(
-            downloaded,
-            output_format='markdown',
-            include_comments=False,
-            include_tables=True
-        )
+        with span("extract", url=url):
+            metadata = trafilatura.extract_metadata(downloaded)
+            content = trafilatura.extract(
+                downloaded,
+                output_format='markdown',
+                include_comments=False,
+                include_tables=True
+            )
         
         if not content or len(content.strip()) < 100:
             print(f"   ⚠️ Příliš málo obsahu ({len(content) if content else 0} znaků)")
@@ -48,6 +54,7 @@ def fetch_article_content(url: str) -> tuple[Optional[str], Optional[datetime]]:
         
     except Exception as e:
         print(f"   ❌ Chyba při stahování článku {url}: {e}")
+        record_stage_error("content", e)
         return None, None
 
 
@@ -55,41 +62,45 @@ def process_articles(db: Session) -> dict:
     """
     Projde všechny články v databázi a doplní jejich obsah.
     Pokud článek už obsah má, přepíše ho.
+    Přerušený běh pokračuje od posledního uloženého článku, články,
+    které se nepodařilo stáhnout, se zkusí znovu až po pauze (run_ledger).
     """
-    articles = db.query(DBArticle).all()
-    
     stats = {
-        "total": len(articles),
+        "total": 0,
         "success": 0,
         "failed": 0,
         "skipped": 0
     }
-    
-    print(f"\n🔄 Zpracovávám {stats['total']} článků...")
-    
-    for i, article in enumerate(articles, 1):
-        print(f"\n[{i}/{stats['total']}] {article.title[:60]}...")
-        
-        # Fetch obsahu
-        content, published_date = fetch_article_content(article.url)
-        
-        if content:
-            # Uložení do databáze (přepíše existující obsah)
-            article.content = content
-            article.published_date = published_date
-            stats["success"] += 1
-        else:
-            stats["failed"] += 1
-        
-        # Commit po každém článku (aby se neztratila data při pádu)
-        try:
-            db.commit()
-        except Exception as e:
-            print(f"   ❌ Chyba při ukládání: {e}")
-            db.rollback()
-            stats["failed"] += 1
-            stats["success"] -= 1
-    
+
+    with run_ledger(db, "content", stats) as ledger, BatchWriter(db, "content", ledger=ledger) as writer:
+        articles = ledger.pending(db.query(DBArticle), DBArticle.id).all()
+        # Během stahování nedržíme otevřenou transakci, dávky zapisuje writer
+        db.commit()
+        stats["total"] = len(articles)
+
+        print(f"\n🔄 Zpracovávám {stats['total']} článků...")
+
+        for i, article in enumerate(articles, 1):
+            print(f"\n[{i}/{stats['total']}] {article.title[:60]}...")
+
+            with track_stage("content", article_id=article.id) as item:
+                # Fetch obsahu
+                content, published_date = fetch_article_content(article.url)
+
+                if content:
+                    # Uložení do databáze po dávkách i s kurzorem běhu (přepíše existující obsah)
+                    writer.update(article, content=content, published_date=published_date)
+                    stats["success"] += 1
+                else:
+                    writer.fail(article.id, "Obsah se nepodařilo stáhnout")
+                    stats["failed"] += 1
+                    item.status = "failed"
+
+        writer.flush()
+        # Články, které se nepodařilo uložit
+        stats["failed"] += writer.failed_writes
+        stats["success"] -= writer.failed_writes
+
     return stats
 
 
@@ -101,7 +112,7 @@ async def main():
     print("🚀 Content Crawler Worker")
     print("="*60)
     
-    db = SessionLocal()
+    db = WorkerSessionLocal()
     try:
         stats = process_articles(db)
         
@@ -114,6 +125,7 @@ async def main():
         
     finally:
         db.close()
+        push_metrics("content_crawler")
 
 
 if __name__ == "__main__":
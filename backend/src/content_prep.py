@@ -0,0 +1,167 @@
+"""
+Příprava obsahu článku pro LLM.
+
+Trafilatura vrací markdown i s balastem (obrázky, odkazy "Čtěte také",
+popisky fotek, oddělovače tabulek). clean_markdown ho odstraní
+a select_passages z dlouhého článku vybere nejdůležitější odstavce
+v rozpočtu tokenů - místo prostého useknutí, při kterém se ztrácí závěr.
+
+Důležitost odstavce (salience) = podobnost s titulkem (TF-IDF, kosinová
+podobnost) + pozice v článku (perex a úvod nesou nejvíc, závěr dostane
+malý bonus). Vybrané odstavce zůstávají v původním pořadí.
+"""
+
+import math
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, List
+
+from .tokens import estimate_tokens, truncate_to_tokens
+
+# Váhy složek skóre odstavce
+SIMILARITY_WEIGHT = 0.6
+POSITION_WEIGHT = 0.4
+# Minimální poziční váha posledního odstavce (závěr článku)
+CONCLUSION_WEIGHT = 0.5
+# Odstavce kratší než tohle (bez nadpisů) mají poloviční skóre
+SHORT_PARAGRAPH_CHARS = 60
+
+# Pro porovnání slov stačí prvních pár znaků bez diakritiky (hrubý stemming češtiny)
+STEM_CHARS = 5
+STOPWORDS = {
+    "ale", "ani", "aby", "byl", "byla", "bylo", "byli", "bude", "budou", "jako", "jak",
+    "jeho", "jeji", "jejich", "jen", "jiz", "jsem", "jsme", "jsou", "kdy", "kde", "ktera",
+    "ktere", "ktery", "kteri", "nebo", "neni", "pak", "pod", "pro", "pri", "proto", "pred",
+    "podle", "take", "tak", "tento", "tato", "tyto", "uz", "ve", "za", "ze", "the", "and",
+}
+
+# Krátké řádky, které s obsahem článku nesouvisí
+BOILERPLATE_RE = re.compile(
+    r"^(čtěte (také|též|více)|přečtěte si( také)?|související( články)?|foto|video|zdroj|autor|reklama"
+    r"|sdílet|sledujte nás|diskuse|komentáře|tagy|témata)\b",
+    re.IGNORECASE,
+)
+IMAGE_RE = re.compile(r"!\[[^\]]*\]\([^)]*\)")
+LINK_RE = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+TABLE_SEPARATOR_RE = re.compile(r"^\|?[\s:|-]+\|?$")
+WORD_RE = re.compile(r"\w+")
+
+
+def clean_markdown(content: str) -> str:
+    """Odstraní z markdownu z trafilatury obrázky, odkazy, popisky a opakované odstavce."""
+    paragraphs = []
+    seen = set()
+    for block in re.split(r"\n\s*\n", content):
+        lines = []
+        for line in block.splitlines():
+            line = IMAGE_RE.sub("", line)
+            line = LINK_RE.sub(r"\1", line).strip()
+            if not line or TABLE_SEPARATOR_RE.match(line):
+                continue
+            plain = line.lstrip("#>*-| ").strip()
+            if not plain or (len(plain) < 120 and BOILERPLATE_RE.match(plain)):
+                continue
+            if line.startswith("|"):
+                # Řádek tabulky - stačí hodnoty oddělené středníkem
+                line = "; ".join(cell.strip() for cell in line.strip("|").split("|") if cell.strip())
+            lines.append(line)
+        paragraph = "\n".join(lines).strip()
+        if paragraph and paragraph not in seen:
+            seen.add(paragraph)
+            paragraphs.append(paragraph)
+    return "\n\n".join(paragraphs)
+
+
+def split_paragraphs(text: str) -> List[str]:
+    return [p.strip() for p in re.split(r"\n\s*\n", text) if p.strip()]
+
+
+def _terms(text: str) -> List[str]:
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return [
+        word[:STEM_CHARS]
+        for word in WORD_RE.findall(text)
+        if len(word) > 2 and word not in STOPWORDS and not word.isdigit()
+    ]
+
+
+def _tfidf(terms: List[str], idf: Dict[str, float]) -> Dict[str, float]:
+    counts = Counter(terms)
+    vector = {term: (1 + math.log(count)) * idf.get(term, 0) for term, count in counts.items()}
+    norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+    return {term: v / norm for term, v in vector.items()}
+
+
+def rank_paragraphs(title: str, paragraphs: List[str]) -> List[float]:
+    """Skóre důležitosti pro každý odstavec (ve stejném pořadí)."""
+    if not paragraphs:
+        return []
+    docs = [_terms(p) for p in paragraphs]
+    title_terms = _terms(title)
+    # IDF z odstavců článku - slova, která jsou všude, titulek nerozliší
+    df = Counter(term for doc in docs + [title_terms] for term in set(doc))
+    total = len(docs) + 1
+    idf = {term: math.log((total + 1) / (count + 1)) + 1 for term, count in df.items()}
+    title_vector = _tfidf(title_terms, idf)
+
+    scores = []
+    last = len(paragraphs) - 1
+    for index, (paragraph, doc) in enumerate(zip(paragraphs, docs)):
+        vector = _tfidf(doc, idf)
+        similarity = sum(weight * vector.get(term, 0) for term, weight in title_vector.items())
+        position = 1 / math.sqrt(1 + index)
+        if index == last:
+            position = max(position, CONCLUSION_WEIGHT)
+        score = SIMILARITY_WEIGHT * similarity + POSITION_WEIGHT * position
+        if len(paragraph) < SHORT_PARAGRAPH_CHARS and not paragraph.startswith("#"):
+            score /= 2
+        scores.append(score)
+    return scores
+
+
+def select_passages(title: str, text: str, max_tokens: int) -> str:
+    """
+    Vybere nejdůležitější odstavce, které se vejdou do max_tokens, a vrátí
+    je v původním pořadí. Vynechaná místa označí "[…]". První odstavec
+    (perex) je vždy ve výběru.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    paragraphs = split_paragraphs(text)
+    scores = rank_paragraphs(title, paragraphs)
+    costs = [estimate_tokens(p) + 1 for p in paragraphs]
+
+    chosen = {0}
+    budget = max_tokens - costs[0]
+    for index in sorted(range(1, len(paragraphs)), key=lambda i: scores[i], reverse=True):
+        if costs[index] <= budget:
+            chosen.add(index)
+            budget -= costs[index]
+
+    parts = []
+    for index in sorted(chosen):
+        if parts and index - 1 not in chosen:
+            parts.append("[…]")
+        parts.append(paragraphs[index])
+    # Perex delší než celý rozpočet se musí zkrátit
+    return truncate_to_tokens("\n\n".join(parts), max_tokens)
+
+
+def chunk_paragraphs(text: str, max_tokens: int) -> List[str]:
+    """Rozdělí text na po sobě jdoucí části do max_tokens (po odstavcích) pro map-reduce."""
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for paragraph in split_paragraphs(text):
+        paragraph = truncate_to_tokens(paragraph, max_tokens)
+        tokens = estimate_tokens(paragraph) + 1
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append("\n\n".join(current))
+            current, current_tokens = [], 0
+        current.append(paragraph)
+        current_tokens += tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
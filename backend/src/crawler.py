@@ -1,23 +1,27 @@
 import asyncio
 import os
-import json
 from typing import List, Optional
 from dotenv import load_dotenv
 
 from playwright.async_api import async_playwright
-from langchain_google_genai import ChatGoogleGenerativeAI
 from pydantic import BaseModel, Field
 
-from .database import SessionLocal
+from .database import WorkerSessionLocal
+from .instrumentation import push_metrics, record_fetch, record_stage_error, span, track_llm, track_stage
+from .llm_gateway import Priority, get_gateway
 from .models import Article as DBArticle
+from .providers import GEMINI_MODEL, get_chat_model
+from .tokens import estimate_tokens
 
 # 1. Načtení API klíče a konfigurace
 load_dotenv()
 
 NEWS_SOURCES = os.getenv("NEWS_SOURCES", "https://www.novinky.cz/").split(",")
 MAX_ARTICLES = int(os.getenv("MAX_ARTICLES", "100"))
-CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "20"))
-GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash-lite")
+# Chunky pro AI: rozpočet na seznam nadpisů v tokenech (bez instrukcí)
+# a horní mez počtu odkazů v jednom chunku
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "800"))
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "40"))
 
 # 2. Definice datových modelů (Vstup a Výstup pro AI)
 class LinkItem(BaseModel):
@@ -67,13 +71,35 @@ class ArticleSelection(BaseModel):
     )
 
 # 3. Nastavení AI (Gemini)
-llm = ChatGoogleGenerativeAI(
-    model=GEMINI_MODEL,
-    temperature=0,
-)
+llm = get_chat_model(temperature=0)
+
+# Připojíme schéma výstupu k modelu (include_raw kvůli počtu tokenů z usage_metadata)
+ai_selector = llm.with_structured_output(ArticleSelection, include_raw=True)
 
-# Připojíme schéma výstupu k modelu
-ai_selector = llm.with_structured_output(ArticleSelection)
+# Instrukce jsou pro všechny chunky stejné a stojí před proměnlivým seznamem,
+# aby se daly cachovat; platí se ale za ně v každém chunku, proto se chunky
+# dělí podle rozpočtu tokenů (CHUNK_TOKENS) a ne jen podle počtu odkazů.
+SELECTION_INSTRUCTIONS = (
+    "You are an editorial robot. Your task is to review an indexed list of headlines from a news website's main page "
+    "and select ONLY those that are **news with informational value**.\n\n"
+    "CRITERIA FOR SELECTING NEWS:\n"
+    "A news item must meet BOTH of the following criteria:\n"
+    "1. Something NEW happened or we learned something that was not previously known\n"
+    "2. The reported event has an IMPACT on someone (individual, group, organization, state)\n\n"
+    "WHAT TO EXCLUDE:\n"
+    "- Navigation links (Home, Sports, Weather, Authors, Archive)\n"
+    "- Footer, advertisements, login, and technical pages\n"
+    "- General articles without a specific event (tips, guides, product reviews)\n"
+    "- Comments, analyses and opinion pieces without a new event (prefixes like 'komentář', 'point of view', or similar)\n"
+    "- Sports results and entertainment news (unless they have broader social impact)\n"
+    "- Jokes and artistic content (in Czech: 'vtip', 'umění') - these may look like articles but are entertainment/art content\n\n"
+    "FOR EACH SELECTED NEWS ITEM, DETERMINE:\n"
+    "1. **what_happened**: In a short sentence, summarize what happened - what was not there before and is now\n"
+    "2. **impact_on**: Who is affected by the event (e.g., 'citizens of Czech Republic', 'employees of company X', 'patients', 'Donald Trump')\n"
+    "3. **countries**: List of countries the news relates to (Czech Republic, Germany, USA, EU, etc.)\n"
+    "4. **people**: List of public figures (name or position) the news relates to\n\n"
+    "Return the indices of selected news items (0-based) along with complete categorization.\n\n"
+)
 
 async def get_page_links(url: str) -> List[LinkItem]:
     """
@@ -85,15 +111,19 @@ async def get_page_links(url: str) -> List[LinkItem]:
         page = await browser.new_page()
         
         try:
-            await page.goto(url, wait_until="domcontentloaded")
+            with span("fetch", url=url):
+                response = await page.goto(url, wait_until="domcontentloaded")
+                if response is not None:
+                    record_fetch("crawler", len(await response.body()))
             
             # JavaScript v prohlížeči pro rychlou extrakci
-            raw_data = await page.evaluate("""() => {
-                return Array.from(document.querySelectorAll('a')).map(a => ({
-                    text: a.innerText.replace(/[\\n\\t]/g, ' ').trim(), // Odstranění odřádkování
-                    url: a.href
-                }));
-            }""")
+            with span("extract.links", url=url):
+                raw_data = await page.evaluate("""() => {
+                    return Array.from(document.querySelectorAll('a')).map(a => ({
+                        text: a.innerText.replace(/[\\n\\t]/g, ' ').trim(), // Odstranění odřádkování
+                        url: a.href
+                    }));
+                }""")
             
         finally:
             await browser.close()
@@ -142,43 +172,51 @@ async def analyze_chunk_with_ai(links: List[LinkItem], chunk_offset: int = 0) ->
     
     # Vytvoříme indexovaný seznam nadpisů (s lokálními indexy)
     indexed_titles = "\n".join([f"{i}. {link.text}" for i, link in enumerate(links)])
-    
-    prompt_text = (
-        "You are an editorial robot. Your task is to review an indexed list of headlines from a news website's main page "
-        "and select ONLY those that are **news with informational value**.\n\n"
-        "CRITERIA FOR SELECTING NEWS:\n"
-        "A news item must meet BOTH of the following criteria:\n"
-        "1. Something NEW happened or we learned something that was not previously known\n"
-        "2. The reported event has an IMPACT on someone (individual, group, organization, state)\n\n"
-        "WHAT TO EXCLUDE:\n"
-        "- Navigation links (Home, Sports, Weather, Authors, Archive)\n"
-        "- Footer, advertisements, login, and technical pages\n"
-        "- General articles without a specific event (tips, guides, product reviews)\n"
-        "- Comments and analyses without a new event (look for prefixes like 'komentář', 'point of view', or similar)\n"
-        "- Sports results and entertainment news (unless they have broader social impact)\n"
-        "- Jokes and artistic content (in Czech: 'vtip', 'umění') - these may look like articles but are entertainment/art content\n"
-        "- Opinion pieces and commentaries - some commentators write their findings but it's not news (recognizable by 'komentář', 'point of view', or similar prefixes)\n\n"
-        "FOR EACH SELECTED NEWS ITEM, DETERMINE:\n"
-        "1. **what_happened**: In a short sentence, summarize what happened - what was not there before and is now\n"
-        "2. **impact_on**: Who is affected by the event (e.g., 'citizens of Czech Republic', 'employees of company X', 'patients', 'Donald Trump')\n"
-        "3. **countries**: List of countries the news relates to (Czech Republic, Germany, USA, EU, etc.)\n"
-        "4. **people**: List of public figures (name or position) the news relates to\n\n"
-        "Return the indices of selected news items (0-based) along with complete categorization.\n\n"
-        f"List of headlines:\n{indexed_titles}"
-    )
-    
+    prompt_text = f"{SELECTION_INSTRUCTIONS}List of headlines:\n{indexed_titles}"
+
+    async def select():
+        with track_llm("crawler.select", GEMINI_MODEL, items=len(links)) as call:
+            response = await ai_selector.ainvoke(prompt_text)
+            call.parsed(response)
+        return response
+
     try:
-        result = await ai_selector.ainvoke(prompt_text)
+        # Titulní strana = nové články, mají přednost před doháněním starých
+        result = (await get_gateway().acall(
+            select, stage="crawler", priority=Priority.FRESH, prompt=prompt_text,
+            model=GEMINI_MODEL, params={"schema": ArticleSelection.__name__},
+        ))["parsed"]
         # Přičteme offset k indexům pro správné mapování
         for article in result.articles:
             article.index += chunk_offset
         return result.articles
     except Exception as e:
         print(f"❌ Chyba při komunikaci s AI: {e}")
+        record_stage_error("crawler", e)
         return []
 
 
-async def analyze_with_ai_in_chunks(links: List[LinkItem], chunk_size: int = CHUNK_SIZE) -> List[ArticleItem]:
+def split_into_chunks(links: List[LinkItem], max_tokens: int = CHUNK_TOKENS, max_links: int = CHUNK_SIZE) -> List[List[LinkItem]]:
+    """
+    Rozdělí odkazy na chunky podle odhadu tokenů seznamu nadpisů
+    (a nejvýš max_links odkazů, ať model nevynechává položky).
+    """
+    chunks: List[List[LinkItem]] = []
+    current: List[LinkItem] = []
+    current_tokens = 0
+    for link in links:
+        link_tokens = estimate_tokens(f"{len(current)}. {link.text}\n")
+        if current and (current_tokens + link_tokens > max_tokens or len(current) >= max_links):
+            chunks.append(current)
+            current, current_tokens = [], 0
+        current.append(link)
+        current_tokens += link_tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+async def analyze_with_ai_in_chunks(links: List[LinkItem]) -> List[ArticleItem]:
     """
     Rozdělí odkazy na menší chunky a zpracuje je postupně.
     Vrátí agregovaný seznam všech vybraných článků.
@@ -187,17 +225,19 @@ async def analyze_with_ai_in_chunks(links: List[LinkItem], chunk_size: int = CHU
         return []
     
     all_articles = []
-    total_chunks = (len(links) + chunk_size - 1) // chunk_size
+    chunks = split_into_chunks(links)
+    instruction_tokens = estimate_tokens(SELECTION_INSTRUCTIONS)
     
-    print(f"\n📦 Zpracovávám {len(links)} odkazů v {total_chunks} chuncích po {chunk_size}...")
+    print(f"\n📦 Zpracovávám {len(links)} odkazů v {len(chunks)} chuncích "
+          f"(instrukce ~{instruction_tokens} tokenů na chunk)...")
     
-    for i in range(0, len(links), chunk_size):
-        chunk = links[i:i + chunk_size]
-        chunk_num = i // chunk_size + 1
-        print(f"\n--- Chunk {chunk_num}/{total_chunks} ---")
+    offset = 0
+    for chunk_num, chunk in enumerate(chunks, 1):
+        print(f"\n--- Chunk {chunk_num}/{len(chunks)} ({len(chunk)} odkazů) ---")
         
-        articles = await analyze_chunk_with_ai(chunk, chunk_offset=i)
+        articles = await analyze_chunk_with_ai(chunk, chunk_offset=offset)
         all_articles.extend(articles)
+        offset += len(chunk)
         
         print(f"   ✓ Nalezeno {len(articles)} zpráv v tomto chunku")
     
@@ -209,7 +249,7 @@ def save_to_database(articles: List[ArticleItem], links: List[LinkItem], source_
     """
     Uloží nové zprávy do databáze (bez mazání starých).
     """
-    db = SessionLocal()
+    db = WorkerSessionLocal()
     try:
         print(f"\n💾 Ukládám nové zprávy z {source_url} do databáze...")
         saved_count = 0
@@ -225,7 +265,7 @@ def save_to_database(articles: List[ArticleItem], links: List[LinkItem], source_
                     skipped_count += 1
                     continue
                 
-                # Vytvoření kategorizace jako JSON string
+                # Kategorizace se ukládá jako JSONB (filtry podle zemí a osob)
                 categories_data = {
                     "what_happened": article.what_happened,
                     "impact_on": article.impact_on,
@@ -236,12 +276,13 @@ def save_to_database(articles: List[ArticleItem], links: List[LinkItem], source_
                 db_article = DBArticle(
                     title=link.text,
                     url=link.url,
-                    categories=json.dumps(categories_data, ensure_ascii=False)
+                    categories=categories_data
                 )
                 db.add(db_article)
                 saved_count += 1
         
-        db.commit()
+        with span("db.save_articles", source=source_url, count=saved_count):
+            db.commit()
         print(f"   ✅ Uloženo: {saved_count} nových zpráv")
         if skipped_count > 0:
             print(f"   ⏭️  Přeskočeno: {skipped_count} již existujících zpráv")
@@ -274,7 +315,7 @@ async def process_source(source_url: str) -> tuple[int, int]:
     print(f"\n📊 Zpracovávám {len(top_candidates)} kandidátů (MAX_ARTICLES={MAX_ARTICLES})")
     
     # 3. Krok: Analýza AI po chuncích
-    articles = await analyze_with_ai_in_chunks(top_candidates, chunk_size=CHUNK_SIZE)
+    articles = await analyze_with_ai_in_chunks(top_candidates)
 
     # 4. Krok: Uložení do databáze
     save_to_database(articles, top_candidates, source_url)
@@ -310,7 +351,7 @@ async def main():
     print("="*80)
     print(f"Zdroje: {', '.join(NEWS_SOURCES)}")
     print(f"Max článků na zdroj: {MAX_ARTICLES}")
-    print(f"Velikost chunku: {CHUNK_SIZE}")
+    print(f"Velikost chunku: {CHUNK_TOKENS} tokenů, max {CHUNK_SIZE} odkazů")
     
     total_articles = 0
     total_candidates = 0
@@ -321,7 +362,9 @@ async def main():
             continue
         
         try:
-            articles_count, candidates_count = await process_source(source)
+            # Jedna položka kroku "crawler" = jeden zdroj (stažení, AI výběr, uložení)
+            with track_stage("crawler", source=source):
+                articles_count, candidates_count = await process_source(source)
             total_articles += articles_count
             total_candidates += candidates_count
         except Exception as e:
@@ -331,6 +374,7 @@ async def main():
     print("\n" + "="*80)
     print(f"🎉 HOTOVO! Celkem nalezeno {total_articles} zpráv z {total_candidates} kandidátů")
     print("="*80)
+    push_metrics("crawler")
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -1,8 +1,13 @@
 import os
+import time
+from functools import lru_cache
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from .instrumentation import POOL_CHECKOUT_WAIT, POOL_CHECKED_OUT, POOL_SATURATION, instrument_engine
 
 # Načteme .env soubor
 load_dotenv()
@@ -10,12 +15,157 @@ load_dotenv()
 # Načteme URL z proměnné prostředí (z .env -> docker-compose)
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# Role procesu, pro kterou se vytváří výchozí engine (api / worker)
+DB_ROLE = os.getenv("DB_ROLE", "api")
+
+# Režim kompatibilní s pgbouncerem v transaction pooling módu
+DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "0") == "1"
+
+# Předvolby poolu podle role procesu.
+# API běží ve 4 gunicorn workerech, takže 4 * (pool_size + max_overflow)
+# musí zůstat pod max_connections Postgresu (nebo pgbounceru).
+# Batch skripty zpracovávají články sekvenčně a víc než 2 spojení nepotřebují.
+ROLE_PRESETS = {
+    "api": {
+        "pool_size": 5,
+        "max_overflow": 5,
+        "pool_timeout": 10,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+        "statement_timeout_ms": 5000,
+    },
+    "worker": {
+        "pool_size": 2,
+        "max_overflow": 0,
+        "pool_timeout": 60,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+        "statement_timeout_ms": 120000,
+    },
+}
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    return value == "1" if value not in (None, "") else default
+
+
+def pool_settings(role: str) -> dict:
+    """
+    Vrátí nastavení poolu pro danou roli.
+    Hodnoty z předvolby lze přepsat proměnnými prostředí dané role,
+    např. DB_API_POOL_SIZE nebo DB_WORKER_STATEMENT_TIMEOUT_MS.
+    """
+    if role not in ROLE_PRESETS:
+        raise ValueError(f"Neznámá role databázového poolu: {role}")
+    preset = ROLE_PRESETS[role]
+    prefix = f"DB_{role.upper()}_"
+    return {
+        "pool_size": _env_int(prefix + "POOL_SIZE", preset["pool_size"]),
+        "max_overflow": _env_int(prefix + "MAX_OVERFLOW", preset["max_overflow"]),
+        "pool_timeout": _env_int(prefix + "POOL_TIMEOUT", preset["pool_timeout"]),
+        "pool_recycle": _env_int(prefix + "POOL_RECYCLE", preset["pool_recycle"]),
+        "pool_pre_ping": _env_bool(prefix + "POOL_PRE_PING", preset["pool_pre_ping"]),
+        "statement_timeout_ms": _env_int(prefix + "STATEMENT_TIMEOUT_MS", preset["statement_timeout_ms"]),
+    }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool, který měří, jak dlouho se čeká na volné spojení."""
+
+    role = "api"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_CHECKOUT_WAIT.labels(role=self.role).observe(time.perf_counter() - start)
+
+
+@lru_cache(maxsize=None)
+def _pool_class(role: str) -> type:
+    """
+    Podtřída poolu s rolí v atributu třídy. dispose() i recreate() vytváří
+    nový pool přes self.__class__, takže role (a štítek metrik) zůstane.
+    """
+    return type(f"InstrumentedQueuePool_{role}", (InstrumentedQueuePool,), {"role": role})
+
+
+def _driver_connect_args(url: str, statement_timeout_ms: int) -> dict:
+    """
+    Parametry spojení podle použitého DB driveru.
+
+    V pgbouncer režimu se nesmí posílat startup parametry (options) a nesmí
+    se používat server-side prepared statements, protože po skončení
+    transakce může další dotaz dostat jiné serverové spojení.
+    """
+    connect_args = {}
+    if url.startswith("postgresql+psycopg://"):
+        # psycopg 3 připravuje opakované dotazy na serveru
+        if DB_PGBOUNCER:
+            connect_args["prepare_threshold"] = None
+    elif url.startswith("postgresql+asyncpg://"):
+        if DB_PGBOUNCER:
+            connect_args["statement_cache_size"] = 0
+            connect_args["prepared_statement_cache_size"] = 0
+    # psycopg2 prepared statements nepoužívá, nic vypínat nemusíme
+
+    if not DB_PGBOUNCER and statement_timeout_ms > 0:
+        connect_args["options"] = f"-c statement_timeout={statement_timeout_ms}"
+    return connect_args
+
+
+def create_db_engine(role: str = DB_ROLE, url: str = DATABASE_URL):
+    """
+    Vytvoří engine s nastavením poolu pro danou roli (api / worker).
+    """
+    settings = pool_settings(role)
+    statement_timeout_ms = settings.pop("statement_timeout_ms")
+
+    db_engine = create_engine(
+        url,
+        poolclass=_pool_class(role),
+        connect_args=_driver_connect_args(url, statement_timeout_ms),
+        **settings,
+    )
+    capacity = settings["pool_size"] + settings["max_overflow"]
+
+    def _update_pool_metrics(*args):
+        checked_out = db_engine.pool.checkedout()
+        POOL_CHECKED_OUT.labels(role=role).set(checked_out)
+        POOL_SATURATION.labels(role=role).set(checked_out / capacity if capacity else 0)
+
+    event.listen(db_engine, "checkout", _update_pool_metrics)
+    event.listen(db_engine, "checkin", _update_pool_metrics)
+    instrument_engine(db_engine, role)
+
+    if DB_PGBOUNCER and statement_timeout_ms > 0:
+        # Session-level SET by v transaction poolingu "utekl" do cizího spojení,
+        # proto nastavujeme timeout jen pro aktuální transakci.
+        @event.listens_for(db_engine, "begin")
+        def _set_statement_timeout(conn):
+            conn.exec_driver_sql(f"SET LOCAL statement_timeout = {statement_timeout_ms}")
+
+    return db_engine
+
+
 # Vytvoření "engine" - hlavního připojovacího bodu
-engine = create_engine(DATABASE_URL)
+engine = create_db_engine(DB_ROLE)
 
 # Vytvoření "SessionLocal" - továrny na databázové session
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Engine a session pro batch skripty (crawler, sumarizace, embeddingy, agent).
+# Engine se připojí až při prvním dotazu, v API workerech tedy nic nestojí.
+worker_engine = engine if DB_ROLE == "worker" else create_db_engine("worker")
+WorkerSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=worker_engine)
+
 # Vytvoření "Base" - základní třídy pro všechny tvé ORM modely
 Base = declarative_base()
 
@@ -25,4 +175,4 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
@@ -0,0 +1,254 @@
+"""
+Poskytovatelé embeddingů (EMBEDDING_PROVIDER).
+
+- gemini: text-embedding-004 přes API (dávky jedním voláním, kvóta
+  a 429 přes llm_gateway),
+- local: sentence-transformers na CPU bez sítě - ONNX model kvantovaný
+  na int8 (LOCAL_EMBEDDING_BACKEND=onnx), dávky přes všechna jádra
+  (ONNX Runtime i torch standardně používají všechna fyzická jádra).
+
+Každý vektor se ukládá s identifikátorem modelu (articles.embedding_model)
+a porovnávají se jen vektory stejného modelu - sloupec embedding nemá
+pevnou dimenzi a pro každý model existuje vlastní částečný index
+nad výrazem embedding::<typ>(<dimenze>), viz vector_index_ddl. Index
+může držet zmenšené kopie vektorů (halfvec, binární kvantizace) -
+kandidáty z něj pak přesně seřadí plné vektory v tabulce (nearest_sql).
+
+Lokální backend potřebuje balíček sentence-transformers (s extra [onnx]
+pro ONNX); importuje se až při prvním použití.
+"""
+
+import hashlib
+import os
+import re
+from functools import lru_cache
+from typing import List
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+from . import providers
+from .instrumentation import track_llm
+from .llm_gateway import Priority, get_gateway
+from .tokens import estimate_tokens
+
+load_dotenv()
+
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "gemini")
+# Kolik textů jde najednou do modelu / do jednoho volání API
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+
+GEMINI_EMBEDDING_MODEL = os.getenv("GEMINI_EMBEDDING_MODEL", "models/text-embedding-004")
+GEMINI_EMBEDDING_DIMENSIONS = int(os.getenv("GEMINI_EMBEDDING_DIMENSIONS", "768"))
+# batchEmbedContents přijme max. 100 textů
+GEMINI_MAX_BATCH = 100
+
+# Vícejazyčný model (čeština) s hotovými ONNX variantami v repozitáři modelu
+LOCAL_EMBEDDING_MODEL = os.getenv(
+    "LOCAL_EMBEDDING_MODEL", "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+)
+LOCAL_EMBEDDING_DIMENSIONS = int(os.getenv("LOCAL_EMBEDDING_DIMENSIONS", "384"))
+# onnx = kvantovaný int8 model (LOCAL_EMBEDDING_ONNX_FILE), torch = původní fp32
+LOCAL_EMBEDDING_BACKEND = os.getenv("LOCAL_EMBEDDING_BACKEND", "onnx")
+LOCAL_EMBEDDING_ONNX_FILE = os.getenv("LOCAL_EMBEDDING_ONNX_FILE", "onnx/model_qint8_avx512.onnx")
+
+# Co drží ANN index (tabulka má vždy plné float32 vektory):
+# vector = plná přesnost, halfvec = float16 (poloviční index),
+# bit = binárně kvantované (1 bit na dimenzi, 32x menší index).
+# U halfvec a bit se z indexu vezme EMBEDDING_RERANK_FACTOR x víc kandidátů
+# a seřadí se přesně podle plných vektorů. halfvec a bit potřebují pgvector >= 0.7.
+EMBEDDING_INDEX = os.getenv("EMBEDDING_INDEX", "vector")
+EMBEDDING_RERANK_FACTOR = int(os.getenv("EMBEDDING_RERANK_FACTOR", "4"))
+# Operátorová třída indexu a operátor vzdálenosti
+INDEX_TYPES = {
+    "vector": ("vector_cosine_ops", "<=>"),
+    "halfvec": ("halfvec_cosine_ops", "<=>"),
+    "bit": ("bit_hamming_ops", "<~>"),
+}
+
+if EMBEDDING_PROVIDER not in ("gemini", "local"):
+    raise ValueError(f"Neznámý poskytovatel embeddingů: {EMBEDDING_PROVIDER}")
+if LOCAL_EMBEDDING_BACKEND not in ("onnx", "torch"):
+    raise ValueError(f"Neznámý backend lokálních embeddingů: {LOCAL_EMBEDDING_BACKEND}")
+if EMBEDDING_INDEX not in INDEX_TYPES:
+    raise ValueError(f"Neznámý typ indexu embeddingů: {EMBEDDING_INDEX}")
+
+
+class EmbeddingProvider:
+    """Rozhraní poskytovatele: dávka textů -> normalizované vektory."""
+
+    # Identifikátor uložený u každého vektoru; vektory různých modelů se nemíchají
+    model_id: str
+    dimensions: int
+
+    def embed_documents(self, texts: List[str], priority: Priority = Priority.BACKFILL) -> List[List[float]]:
+        raise NotImplementedError
+
+    def embed_query(self, text: str) -> List[float]:
+        raise NotImplementedError
+
+
+class GeminiEmbeddings(EmbeddingProvider):
+    def __init__(self, model: str = GEMINI_EMBEDDING_MODEL, dimensions: int = GEMINI_EMBEDDING_DIMENSIONS):
+        self.model = model
+        self.model_id = f"gemini:{model.removeprefix('models/')}"
+        self.dimensions = dimensions
+
+    def _embed(self, texts: List[str], task_type: str, priority: Priority) -> List[List[float]]:
+        def embed():
+            with track_llm("embedding", self.model, items=len(texts), task_type=task_type):
+                return providers.get_genai().embed_content(
+                    model=self.model,
+                    content=texts,
+                    task_type=task_type
+                )
+
+        result = get_gateway("embedding").call(
+            embed,
+            stage="embedding",
+            priority=priority,
+            prompt="\n\n".join(texts),
+            tokens=sum(estimate_tokens(text) for text in texts),
+            # Dotaz a dokument se stejným textem mají jiné vektory; počet textů odliší dávky
+            model=self.model,
+            params={"task_type": task_type, "texts": len(texts)},
+        )
+        return [_as_list(vector) for vector in result["embedding"]]
+
+    def embed_documents(self, texts: List[str], priority: Priority = Priority.BACKFILL) -> List[List[float]]:
+        vectors: List[List[float]] = []
+        for start in range(0, len(texts), GEMINI_MAX_BATCH):
+            vectors.extend(self._embed(texts[start:start + GEMINI_MAX_BATCH], "retrieval_document", priority))
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text], "retrieval_query", Priority.DIGEST)[0]
+
+
+class LocalEmbeddings(EmbeddingProvider):
+    def __init__(self, model: str = LOCAL_EMBEDDING_MODEL, dimensions: int = LOCAL_EMBEDDING_DIMENSIONS,
+                 backend: str = LOCAL_EMBEDDING_BACKEND):
+        self.model = model
+        self.backend = backend
+        # Kvantovaný model dává (mírně) jiné vektory než fp32 - jiný identifikátor
+        self.model_id = f"local:{model.rsplit('/', 1)[-1]}:{'int8' if backend == 'onnx' else 'fp32'}"
+        self.dimensions = dimensions
+
+    @property
+    def encoder(self):
+        return _load_local_model(self.model, self.backend)
+
+    def _encode(self, texts: List[str], items: int) -> List[List[float]]:
+        with track_llm("embedding", self.model_id, items=items, backend=self.backend):
+            vectors = self.encoder.encode(
+                texts,
+                batch_size=EMBEDDING_BATCH_SIZE,
+                normalize_embeddings=True,
+                convert_to_numpy=True,
+            )
+        return vectors.tolist()
+
+    def embed_documents(self, texts: List[str], priority: Priority = Priority.BACKFILL) -> List[List[float]]:
+        return self._encode(texts, len(texts)) if texts else []
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode([text], 1)[0]
+
+
+@lru_cache(maxsize=None)
+def _load_local_model(model: str, backend: str):
+    from sentence_transformers import SentenceTransformer
+
+    kwargs = {"backend": "onnx", "model_kwargs": {"file_name": LOCAL_EMBEDDING_ONNX_FILE}} if backend == "onnx" else {}
+    encoder = SentenceTransformer(model, device="cpu", **kwargs)
+    dimensions = encoder.get_sentence_embedding_dimension()
+    if dimensions != LOCAL_EMBEDDING_DIMENSIONS:
+        raise ValueError(
+            f"Model {model} má {dimensions} dimenzí, LOCAL_EMBEDDING_DIMENSIONS je {LOCAL_EMBEDDING_DIMENSIONS}"
+        )
+    return encoder
+
+
+def _as_list(vector) -> List[float]:
+    # genai může vrátit numpy array
+    return vector.tolist() if hasattr(vector, "tolist") else list(vector)
+
+
+@lru_cache(maxsize=None)
+def get_embedding_provider(name: str = EMBEDDING_PROVIDER) -> EmbeddingProvider:
+    """Sdílená instance poskytovatele (lokální model se načte až při prvním embeddingu)."""
+    return LocalEmbeddings() if name == "local" else GeminiEmbeddings()
+
+
+# --- Ukládání a vyhledávání ---
+
+def _cast(expression: str, dimensions: int, index: str) -> str:
+    """Převede vektor na typ indexu (sloupec embedding nemá pevnou dimenzi)."""
+    dimensions = int(dimensions)
+    if index == "halfvec":
+        return f"({expression})::halfvec({dimensions})"
+    if index == "bit":
+        return f"binary_quantize(({expression})::vector({dimensions}))::bit({dimensions})"
+    return f"({expression})::vector({dimensions})"
+
+
+def index_expression(dimensions: int, index: str = EMBEDDING_INDEX) -> str:
+    """Výraz, nad kterým je index modelu - dotaz ho musí použít beze změny."""
+    return f"({_cast('embedding', dimensions, index)})"
+
+
+def vector_index_name(model_id: str, index: str = EMBEDDING_INDEX) -> str:
+    key = model_id if index == "vector" else f"{model_id}:{index}"
+    slug = re.sub(r"[^a-z0-9]+", "_", key.lower()).strip("_")
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:8]
+    # Postgres zkracuje jména na 63 znaků - hash drží jména různých modelů odlišná
+    return f"ix_articles_embedding_{slug[:32]}_{digest}"
+
+
+def vector_index_ddl(model_id: str, dimensions: int, index: str = EMBEDDING_INDEX) -> str:
+    """
+    Částečný HNSW index pro vektory jednoho modelu. HNSW (ne ivfflat) proto,
+    že index nového modelu vzniká nad prázdnou částí tabulky - ivfflat by
+    počítal centroidy z dat, která ještě nejsou.
+    """
+    literal = model_id.replace("'", "''")
+    return (
+        f"CREATE INDEX IF NOT EXISTS {vector_index_name(model_id, index)} ON articles "
+        f"USING hnsw ({index_expression(dimensions, index)} {INDEX_TYPES[index][0]}) "
+        f"WHERE embedding_model = '{literal}'"
+    )
+
+
+def candidate_count(limit: int, index: str = EMBEDDING_INDEX) -> int:
+    """Kolik kandidátů vzít z indexu, aby po přesném seřazení zbylo limit nejlepších."""
+    return limit if index == "vector" else limit * EMBEDDING_RERANK_FACTOR
+
+
+def nearest_sql(dimensions: int, query_vector: str, columns: str, where: str = "TRUE",
+                index: str = EMBEDDING_INDEX) -> str:
+    """
+    Dotaz na nejbližší články k query_vector (SQL výraz s plným vektorem,
+    např. src.embedding). Kandidáti se hledají přes index modelu, výsledek
+    se řadí přesnou kosinovou vzdáleností plných vektorů.
+    Parametry: :model, :candidates (viz candidate_count), :limit.
+    """
+    exact = f"{_cast('c.embedding', dimensions, 'vector')} <=> {_cast(query_vector, dimensions, 'vector')}"
+    return f"""
+        SELECT c.*, {exact} AS distance
+        FROM (
+            SELECT {columns}, a.embedding
+            FROM articles AS a
+            WHERE a.embedding_model = :model AND {where}
+            ORDER BY {_cast('a.embedding', dimensions, index)} {INDEX_TYPES[index][1]} {_cast(query_vector, dimensions, index)}
+            LIMIT :candidates
+        ) AS c
+        ORDER BY distance
+        LIMIT :limit"""
+
+
+def set_search_breadth(db, candidates: int):
+    """HNSW vrátí nejvýš hnsw.ef_search kandidátů (výchozí 40) - pro re-ranking víc."""
+    db.execute(
+        text("SELECT set_config('hnsw.ef_search', :value, true)"),
+        {"value": str(min(max(40, candidates), 1000))},
+    )
@@ -0,0 +1,42 @@
+"""
+Facety (země, osoby) pro procházení článků.
+
+Počty se nečtou z articles, ale z tabulky article_facets, kterou udržuje
+trigger při vložení / změně / smazání článku (viz models.FACET_TRIGGER_DDL).
+Dotaz tak sčítá jen řádky (den, hodnota) v okně - cena závisí na počtu
+facet a dnů, ne na počtu článků.
+"""
+
+from datetime import date
+from typing import Dict, List
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# Názvy v odpovědi podle druhu facetu v tabulce
+FACET_KINDS = {"country": "countries", "person": "people"}
+
+FACETS_QUERY = text("""
+    SELECT kind, value, total
+    FROM (
+        SELECT kind, value, SUM(count) AS total,
+               row_number() OVER (PARTITION BY kind ORDER BY SUM(count) DESC, value) AS rank
+        FROM article_facets
+        WHERE day >= :since
+        GROUP BY kind, value
+        HAVING SUM(count) > 0
+    ) AS ranked
+    WHERE rank <= :limit
+    ORDER BY kind, total DESC, value
+""")
+
+
+def facet_counts(db: Session, since: date, limit: int = 20) -> Dict[str, List[dict]]:
+    """
+    Vrátí nejčastější země a osoby od daného dne (včetně).
+    Výsledek: {"countries": [{"value": ..., "count": ...}], "people": [...]}
+    """
+    result = {name: [] for name in FACET_KINDS.values()}
+    for row in db.execute(FACETS_QUERY, {"since": since, "limit": limit}):
+        result[FACET_KINDS[row.kind]].append({"value": row.value, "count": int(row.total)})
+    return result
@@ -1,101 +1,185 @@
 import os
 import time
+from typing import List, Optional
 from dotenv import load_dotenv
-from sqlalchemy.orm import Session
-import google.generativeai as genai
-from .database import SessionLocal
+from sqlalchemy import or_, text
+from sqlalchemy.orm import Session, load_only
+from .batch_writer import BatchWriter
+from .database import WorkerSessionLocal
+from .embeddings import (
+    EMBEDDING_BATCH_SIZE, EMBEDDING_INDEX, INDEX_TYPES, EmbeddingProvider, get_embedding_provider,
+    vector_index_ddl, vector_index_name,
+)
+from .instrumentation import push_metrics, record_stage_error, track_stage
+from .llm_gateway import article_priority
 from .models import Article
+from .run_ledger import run_ledger
 
 load_dotenv()
 
-# Konfigurace
-DELAY_BETWEEN_ARTICLES = float(os.getenv("DELAY_BETWEEN_ARTICLES", "2"))
+# Konfigurace (tempo volání řídí kvóta v llm_gateway, pauza je volitelná)
+DELAY_BETWEEN_ARTICLES = float(os.getenv("DELAY_BETWEEN_ARTICLES", "0"))
+# halfvec / bit index potřebuje aspoň tuto verzi pgvectoru
+MIN_QUANTIZED_VERSION = (0, 7, 0)
 
-# Inicializace Gemini API
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 
+def embedding_text(article: Article) -> str:
+    """Text pro embedding - titulek a sumarizace."""
+    return f"{article.title}\n\n{article.summary_simple}"
 
-def generate_embedding_for_article(article: Article, db: Session) -> bool:
+
+def pending_filter(provider: EmbeddingProvider):
+    """Články se sumarizací bez embeddingu aktivního modelu (i s vektorem jiného modelu)."""
+    return (
+        Article.summary_simple.isnot(None),
+        or_(Article.embedding.is_(None), Article.embedding_model.is_distinct_from(provider.model_id)),
+    )
+
+
+def _version(value) -> tuple:
+    return tuple(int(part) for part in str(value or "0").split(".") if part.isdigit())
+
+
+def ensure_quantization_support(db: Session):
+    """
+    halfvec, binary_quantize a bit_hamming_ops má pgvector od 0.7. Existující
+    volume databáze si drží starou verzi rozšíření i po stažení novějšího
+    obrazu pgvector/pgvector:pg15 - povýšíme ji (ALTER EXTENSION vector UPDATE),
+    pokud to nainstalovaná knihovna umí.
     """
-    Vygeneruje embedding pro daný článek na základě jeho sumarizace.
-    Vrací True pokud byl embedding úspěšně vygenerován.
+    installed, available = db.execute(text(
+        "SELECT e.extversion, a.default_version FROM pg_extension AS e "
+        "JOIN pg_available_extensions AS a ON a.name = e.extname WHERE e.extname = 'vector'"
+    )).one()
+    if _version(installed) >= MIN_QUANTIZED_VERSION:
+        return
+    if _version(available) < MIN_QUANTIZED_VERSION:
+        raise RuntimeError(
+            f"EMBEDDING_INDEX={EMBEDDING_INDEX} potřebuje pgvector >= 0.7, server má jen {available}. "
+            f"Aktualizujte obraz databáze, nebo nastavte EMBEDDING_INDEX=vector."
+        )
+    print(f"⬆️  Povyšuji pgvector {installed} -> {available}")
+    db.execute(text("ALTER EXTENSION vector UPDATE"))
+    db.commit()
+
+
+def ensure_vector_index(db: Session, provider: EmbeddingProvider):
+    """
+    Založí částečný index pro vektory aktivního modelu podle EMBEDDING_INDEX
+    (při změně modelu nebo typu indexu). Index jiného typu pro tentýž model
+    dotazy už nepoužijí, takže se smaže.
+    """
+    if EMBEDDING_INDEX != "vector":
+        ensure_quantization_support(db)
+    db.execute(text(vector_index_ddl(provider.model_id, provider.dimensions)))
+    for index in INDEX_TYPES:
+        if index != EMBEDDING_INDEX:
+            db.execute(text(f"DROP INDEX IF EXISTS {vector_index_name(provider.model_id, index)}"))
+    db.commit()
+
+
+def generate_embeddings_for_batch(articles: List[Article], db: Session, provider: EmbeddingProvider,
+                                  writer: Optional[BatchWriter] = None) -> int:
     """
-    if not article.summary_simple:
-        print(f"Článek {article.id} nemá sumarizaci, přeskakuji")
-        return False
-    
-    # Pokud už má embedding, přeskočíme
-    if article.embedding is not None:
-        print(f"Článek {article.id} už má embedding")
-        return False
-    
-    print(f"Generuji embedding pro článek {article.id}: {article.title}")
-    
+    Vygeneruje embeddingy pro dávku článků jedním voláním poskytovatele
+    a uloží je s identifikátorem modelu. Vrací počet vygenerovaných embeddingů.
+    S writer se uloží hromadným zápisem (i do evidence běhu), jinak hned.
+    """
+    print(f"Generuji embeddingy pro {len(articles)} článků ({provider.model_id})")
+
     try:
-        # Vytvoříme text pro embedding z titulku a sumarizace
-        text_for_embedding = f"{article.title}\n\n{article.summary_simple}"
-        
-        # Vygenerujeme embedding pomocí Gemini
-        result = genai.embed_content(
-            model="models/text-embedding-004",
-            content=text_for_embedding,
-            task_type="retrieval_document"
+        vectors = provider.embed_documents(
+            [embedding_text(article) for article in articles],
+            # Dávka s novým článkem má jeho prioritu
+            priority=min(article_priority(article) for article in articles),
         )
-        
-        # Uložíme embedding do databáze (konverze numpy array na list)
-        embedding_vector = result['embedding']
-        if hasattr(embedding_vector, 'tolist'):
-            embedding_vector = embedding_vector.tolist()
-        article.embedding = embedding_vector
-        db.commit()
-        
-        print(f"  ✓ Embedding vygenerován (dimenze: {len(result['embedding'])})")
-        return True
-        
+        if len(vectors) != len(articles):
+            raise ValueError(f"Poskytovatel vrátil {len(vectors)} vektorů pro {len(articles)} textů")
+
+        for vector in vectors:
+            if len(vector) != provider.dimensions:
+                raise ValueError(f"Vektor má {len(vector)} dimenzí, model {provider.model_id} {provider.dimensions}")
+        for article, vector in zip(articles, vectors):
+            if writer is None:
+                article.embedding = vector
+                article.embedding_model = provider.model_id
+            else:
+                writer.update(article, embedding=vector, embedding_model=provider.model_id)
+        if writer is None:
+            db.commit()
+
+        print(f"  ✓ Embeddingy uloženy (dimenze: {provider.dimensions})")
+        return len(articles)
+
     except KeyboardInterrupt:
         print(f"\n⚠️  Přerušeno uživatelem")
-        db.rollback()
+        if writer is None:
+            db.rollback()
         raise
     except Exception as e:
-        print(f"✗ Chyba při generování embeddingu pro článek {article.id}: {e}")
-        db.rollback()
-        return False
+        print(f"✗ Chyba při generování embeddingů pro články {articles[0].id}-{articles[-1].id}: {e}")
+        record_stage_error("embedding", e)
+        if writer is None:
+            db.rollback()
+        else:
+            # Rollback by vyexpiroval články čekající ve writeru (a jejich hodnoty)
+            for article in articles:
+                writer.fail(article.id, str(e))
+        return 0
 
 
 def process_all_articles():
     """
-    Projde všechny články v databázi a vygeneruje pro ně embeddingy.
+    Projde články bez embeddingu aktivního modelu (EMBEDDING_PROVIDER)
+    a vygeneruje je po dávkách EMBEDDING_BATCH_SIZE. Přerušený běh
+    pokračuje od poslední uložené dávky (run_ledger).
     """
-    db = SessionLocal()
+    provider = get_embedding_provider()
+    db = WorkerSessionLocal()
+    stats = {"processed": 0, "skipped": 0, "errors": 0}
     try:
-        # Načteme všechny články kromě digestu
-        articles = db.query(Article).filter(Article.url != "DIGEST").all()
-        print(f"Nalezeno {len(articles)} článků")
-        
-        processed = 0
-        skipped = 0
-        errors = 0
-        
-        for i, article in enumerate(articles, 1):
-            print(f"\n[{i}/{len(articles)}]")
-            result = generate_embedding_for_article(article, db)
-            if result:
-                processed += 1
-                # Pauza mezi články
-                if i < len(articles):
+        ensure_vector_index(db, provider)
+
+        with run_ledger(db, "embedding", stats) as ledger, BatchWriter(db, "embedding", ledger=ledger) as writer:
+            # Načteme jen články, které embedding potřebují (bez obsahu)
+            articles = ledger.pending(
+                db.query(Article).options(load_only(
+                    Article.id, Article.title, Article.summary_simple, Article.published_date, Article.created_at
+                )).filter(*pending_filter(provider)),
+                Article.id,
+            ).all()
+            stats["skipped"] = db.query(Article).filter(
+                Article.summary_simple.isnot(None), Article.embedding_model == provider.model_id
+            ).count()
+            # Během volání poskytovatele nedržíme otevřenou transakci, dávky zapisuje writer
+            db.commit()
+            print(f"Nalezeno {len(articles)} článků bez embeddingu ({provider.model_id})")
+
+            batches = [articles[i:i + EMBEDDING_BATCH_SIZE] for i in range(0, len(articles), EMBEDDING_BATCH_SIZE)]
+            for i, batch in enumerate(batches, 1):
+                print(f"\n[{i}/{len(batches)}]")
+                with track_stage("embedding", articles=len(batch)) as item:
+                    saved = generate_embeddings_for_batch(batch, db, provider, writer=writer)
+                    if not saved:
+                        item.status = "failed"
+                stats["processed"] += saved
+                stats["errors"] += len(batch) - saved
+                # Pauza mezi dávkami
+                if saved and i < len(batches):
                     time.sleep(DELAY_BETWEEN_ARTICLES)
-            elif article.embedding is not None:
-                skipped += 1
-            else:
-                errors += 1
-        
+
+            writer.flush()
+            stats["processed"] -= writer.failed_writes
+            stats["errors"] += writer.failed_writes
+
         print(f"\n=== Hotovo ===")
-        print(f"Zpracováno: {processed}")
-        print(f"Přeskočeno (už má embedding): {skipped}")
-        print(f"Chyby: {errors}")
-        
+        print(f"Zpracováno: {stats['processed']}")
+        print(f"Přeskočeno (už má embedding): {stats['skipped']}")
+        print(f"Chyby: {stats['errors']}")
+
     finally:
         db.close()
+        push_metrics("generate_embeddings")
 
 
 if __name__ == "__main__":
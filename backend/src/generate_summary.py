@@ -1,106 +1,328 @@
+import asyncio
 import os
 import time
+from functools import lru_cache
+from typing import Dict, List, Optional
 from dotenv import load_dotenv
+from langchain_core.exceptions import OutputParserException
+from pydantic import BaseModel, Field, ValidationError, create_model
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
-from langchain_google_genai import ChatGoogleGenerativeAI
-from .database import SessionLocal
+from .batch_writer import BatchWriter
+from .content_prep import chunk_paragraphs, clean_markdown, select_passages
+from .database import WorkerSessionLocal
+from .instrumentation import push_metrics, record_stage_error, span, track_llm, track_stage
+from .llm_gateway import article_priority, get_gateway
 from .models import Article
+from .providers import GEMINI_MODEL, get_chat_model
+from .run_ledger import run_ledger
+from .tokens import estimate_tokens, truncate_to_tokens
 
 load_dotenv()
 
-# Načtení konfigurace
-GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash-lite")
-DELAY_BETWEEN_ARTICLES = float(os.getenv("DELAY_BETWEEN_ARTICLES", "2"))
+# Načtení konfigurace (tempo volání řídí kvóta v llm_gateway, pauza je volitelná)
+DELAY_BETWEEN_ARTICLES = float(os.getenv("DELAY_BETWEEN_ARTICLES", "0"))
+# Rozpočet na obsah článku v promptu (v tokenech, ne ve znacích)
+SUMMARY_INPUT_TOKENS = int(os.getenv("SUMMARY_INPUT_TOKENS", "900"))
+# Delší články než MAP_REDUCE_TOKENS se shrnou po částech (map) a styly se
+# napíšou z poznámek (reduce); části běží souběžně, max MAP_MAX_CHUNKS částí
+MAP_REDUCE_TOKENS = int(os.getenv("MAP_REDUCE_TOKENS", "4000"))
+MAP_MAX_CHUNKS = int(os.getenv("MAP_MAX_CHUNKS", "6"))
+MAP_CONCURRENCY = int(os.getenv("MAP_CONCURRENCY", "4"))
+
+# Styly sumarizace: sloupec článku a zadání pro model
+STYLES = {
+    "simple": ("summary_simple", "a summary in a few sentences - explain what happened"),
+    "funny": ("summary_funny", "a humorous summary in a few sentences - witty, but factually accurate"),
+    "storytelling": ("summary_storytelling", "a short summary told as a story with a beginning, a twist and an end"),
+    "retold": ("retold_content", "the whole article retold as an engaging story in a few paragraphs"),
+}
+
+# Které styly generovat (např. "simple,funny,storytelling,retold")
+SUMMARY_STYLES = [s.strip() for s in os.getenv("SUMMARY_STYLES", "simple").split(",") if s.strip()]
+# combined = všechny styly jedním structured voláním (obsah článku se pošle jednou),
+# per_style = samostatné volání pro každý styl
+SUMMARY_MODE = os.getenv("SUMMARY_MODE", "combined")
+
+if set(SUMMARY_STYLES) - STYLES.keys():
+    raise ValueError(f"Neznámé styly sumarizace: {', '.join(set(SUMMARY_STYLES) - STYLES.keys())}")
+if SUMMARY_MODE not in ("combined", "per_style"):
+    raise ValueError(f"Neznámý režim sumarizace: {SUMMARY_MODE}")
+
+UNAVAILABLE = "Obsah není dostupný pro sumarizaci."
 
 # Inicializace LLM
-llm = ChatGoogleGenerativeAI(
-    model=GEMINI_MODEL,
-    google_api_key=os.getenv("GOOGLE_API_KEY"),
-    temperature=0.7,
-    max_retries=3
-)
-
-def generate_summaries_for_article(article: Article, db: Session) -> bool:
+llm = get_chat_model(temperature=0.7)
+
+
+def missing_styles(article: Article, styles: Optional[List[str]] = None) -> List[str]:
+    """Styly, pro které článek ještě nemá vyplněný sloupec."""
+    return [style for style in (styles or SUMMARY_STYLES) if not getattr(article, STYLES[style][0])]
+
+
+async def _map_chunk(article: Article, chunk: str, part: int, parts: int, semaphore: asyncio.Semaphore) -> str:
+    prompt = f"""Extract the key facts from part {part} of {parts} of a news article as a few concise sentences in Czech.
+Keep names, numbers and conclusions. Respond only with the facts.
+
+Title: {article.title}
+
+Part {part}:
+{chunk}"""
+    async def invoke():
+        with track_llm("summary.map", GEMINI_MODEL, items=0, article_id=article.id, part=part) as call:
+            response = await llm.ainvoke(prompt)
+            call.record_usage(response)
+        return response
+
+    async with semaphore:
+        response = await get_gateway().acall(
+            invoke, stage="summary", priority=article_priority(article), prompt=prompt, model=GEMINI_MODEL
+        )
+    return response.content.strip()
+
+
+async def _map_notes(article: Article, chunks: List[str]) -> str:
+    semaphore = asyncio.Semaphore(MAP_CONCURRENCY)
+    notes = await asyncio.gather(*(
+        _map_chunk(article, chunk, part, len(chunks), semaphore)
+        for part, chunk in enumerate(chunks, 1)
+    ))
+    return "\n\n".join(f"Část {part}: {note}" for part, note in enumerate(notes, 1) if note)
+
+
+def prepare_content(article: Article) -> str:
+    """
+    Obsah článku pro prompt v rozpočtu SUMMARY_INPUT_TOKENS:
+    - vyčištěný markdown, pokud se vejde celý,
+    - jinak nejdůležitější odstavce (salience, viz content_prep),
+    - u velmi dlouhých článků poznámky ze souběžně shrnutých částí.
+    """
+    with span("summary.prepare", article_id=article.id) as current:
+        content = clean_markdown(article.content)
+        tokens = estimate_tokens(content)
+        if tokens <= SUMMARY_INPUT_TOKENS:
+            strategy = "full"
+        elif tokens <= MAP_REDUCE_TOKENS:
+            strategy = "passages"
+            content = select_passages(article.title, content, SUMMARY_INPUT_TOKENS)
+        else:
+            strategy = "map_reduce"
+            # Části mají rozpočet jako celý článek, takže latence je max. jedno
+            # volání navíc; delší text se nejdřív zúží na nejdůležitější odstavce
+            selected = select_passages(article.title, content, SUMMARY_INPUT_TOKENS * MAP_MAX_CHUNKS)
+            chunks = chunk_paragraphs(selected, SUMMARY_INPUT_TOKENS)
+            print(f"  📚 Dlouhý článek (~{tokens} tokenů), shrnuji {len(chunks)} částí souběžně")
+            content = asyncio.run(_map_notes(article, chunks))
+        if current is not None:
+            current.set_attribute("content.strategy", strategy)
+            current.set_attribute("content.tokens", tokens)
+    return content
+
+
+def _article_prompt(article: Article, content: str, task: str, output: str) -> str:
+    return f"""{task}
+
+If the content is prohibited or you cannot generate a summary, respond with: "{UNAVAILABLE}"
+
+Title: {article.title}
+
+Content:
+{truncate_to_tokens(content, SUMMARY_INPUT_TOKENS)}
+
+{output}"""
+
+
+@lru_cache(maxsize=None)
+def _summaries_schema(styles: tuple) -> type[BaseModel]:
+    """Schéma structured outputu jen s požadovanými styly (prázdné pole = neúspěch)."""
+    fields = {
+        style: (str, Field(default="", description=f"In Czech: {STYLES[style][1]}"))
+        for style in styles
+    }
+    return create_model("ArticleSummaries", **fields)
+
+
+def summarize_style(article: Article, style: str, content: str, first_call: bool = True) -> str:
+    """Jeden styl jedním textovým voláním."""
+    prompt = _article_prompt(
+        article,
+        content,
+        f"Write {STYLES[style][1]} of the following article in Czech.",
+        "Respond only with the text in Czech, without any additional text.",
+    )
+    def invoke():
+        # items počítá články - další volání pro tentýž článek cenu jen přičtou
+        with track_llm("summary", GEMINI_MODEL, items=int(first_call), article_id=article.id, style=style) as call:
+            response = llm.invoke(prompt)
+            call.record_usage(response)
+        return response
+
+    response = get_gateway().call(
+        invoke, stage="summary", priority=article_priority(article), prompt=prompt, model=GEMINI_MODEL
+    )
+    return response.content.strip()
+
+
+def summarize_combined(article: Article, styles: List[str], content: str) -> Dict[str, str]:
+    """Všechny styly jedním structured voláním - obsah článku se posílá jen jednou."""
+    schema = _summaries_schema(tuple(styles))
+    tasks = "\n".join(f"- {style}: {STYLES[style][1]}" for style in styles)
+    prompt = _article_prompt(
+        article,
+        content,
+        f"Summarize the following article in Czech in several styles at once. Fill one field per style:\n{tasks}",
+        "Respond in Czech, put every style into its own field.",
+    )
+    structured = llm.with_structured_output(schema, include_raw=True)
+
+    def invoke():
+        with track_llm("summary", GEMINI_MODEL, article_id=article.id, style=",".join(styles)) as call:
+            response = structured.invoke(prompt)
+            call.parsed(response)
+        return response
+
+    try:
+        result = get_gateway().call(
+            invoke, stage="summary", priority=article_priority(article), prompt=prompt,
+            model=GEMINI_MODEL, params={"schema": sorted(styles)},
+        )["parsed"]
+    except (OutputParserException, ValidationError, ValueError) as e:
+        # Nečitelná structured odpověď - všechny styly se zkusí samostatně
+        print(f"  ⚠️ Structured odpověď pro článek {article.id} nejde přečíst: {e}")
+        record_stage_error("summary", e)
+        return {style: "" for style in styles}
+    return {style: (getattr(result, style) or "").strip() for style in styles}
+
+
+def summarize_article(article: Article, styles: List[str], mode: str = SUMMARY_MODE) -> Dict[str, str]:
     """
-    Vygeneruje pouze jednoduchou sumarizaci pro daný článek.
-    Vrací True pokud byla sumarizace úspěšně vygenerována.
+    Vygeneruje požadované styly. V režimu combined se styly, které přišly
+    prázdné (nebo všechny, když structured odpověď nejde přečíst), zkusí
+    znovu samostatně; styl, který selže i tak, ve výsledku chybí (doplní
+    se při dalším běhu).
+    """
+    content = prepare_content(article)
+    if mode == "per_style" or len(styles) == 1:
+        results = {styles[0]: summarize_style(article, styles[0], content)}
+        retry = styles[1:]
+    else:
+        results = summarize_combined(article, styles, content)
+        retry = [style for style in styles if not results.get(style)]
+        if retry:
+            print(f"  ⚠️ Prázdné styly {', '.join(retry)}, zkouším je samostatně")
+
+    for style in retry:
+        try:
+            results[style] = summarize_style(article, style, content, first_call=False)
+        except Exception as e:
+            print(f"  ✗ Styl {style} pro článek {article.id} selhal: {e}")
+            record_stage_error("summary", e)
+            results[style] = ""
+    return {style: text for style, text in results.items() if text}
+
+
+def generate_summaries_for_article(article: Article, db: Session, styles: Optional[List[str]] = None,
+                                   writer: Optional[BatchWriter] = None) -> bool:
+    """
+    Vygeneruje chybějící sumarizace článku ve stylech SUMMARY_STYLES.
+    Vrací True pokud se podařilo vygenerovat aspoň jeden styl.
+    S writer se výsledek uloží v další dávce (i do evidence běhu),
+    jinak hned.
     """
     if not article.content:
         print(f"Článek {article.id} nemá obsah, přeskakuji")
         return False
     
-    # Pokud už má sumarizaci, přeskočíme
-    if article.summary_simple:
+    # Styly, které už článek má, přeskočíme
+    pending = missing_styles(article, styles)
+    if not pending:
         print(f"Článek {article.id} už má sumarizaci")
         return False
     
-    print(f"Generuji sumarizaci pro článek {article.id}: {article.title}")
+    print(f"Generuji sumarizaci ({', '.join(pending)}) pro článek {article.id}: {article.title}")
     
     try:
-        # Jednoduchá sumarizace
-        prompt_simple = f"""Summarize the following article in a few sentences in Czech - explain what happened.
-
-If the content is prohibited or you cannot generate a summary, respond with: "Obsah není dostupný pro sumarizaci."
-
-Title: {article.title}
-
-Content:
-{article.content[:3000]}
-
-Respond only with the summary in Czech, without any additional text."""
-        
-        response = llm.invoke(prompt_simple)
-        article.summary_simple = response.content
-        db.commit()
-        print(f"  ✓ Sumarizace vygenerována")
+        results = summarize_article(article, pending)
+        values = {STYLES[style][0]: text for style, text in results.items()}
+        if writer is None:
+            for column, text in values.items():
+                setattr(article, column, text)
+            db.commit()
+        elif values:
+            writer.update(article, **values)
+        else:
+            writer.fail(article.id, f"Žádný styl se nevygeneroval ({', '.join(pending)})")
+        if not results:
+            return False
+        print(f"  ✓ Sumarizace vygenerována ({', '.join(results)})")
         
         print(f"✓ Sumarizace pro článek {article.id} uložena")
         return True
         
     except KeyboardInterrupt:
         print(f"\n⚠️  Přerušeno uživatelem")
-        db.rollback()
+        if writer is None:
+            db.rollback()
         raise
     except Exception as e:
         print(f"✗ Chyba při generování sumarizace pro článek {article.id}: {e}")
-        db.rollback()
+        record_stage_error("summary", e)
+        if writer is None:
+            db.rollback()
+        else:
+            # Rollback by vyexpiroval články čekající ve writeru (a jejich hodnoty)
+            writer.fail(article.id, str(e))
         return False
 
 
 def process_all_articles():
     """
-    Projde všechny články v databázi a vygeneruje pro ně sumarizace.
+    Projde články bez některé ze sumarizací a vygeneruje je. Přerušený
+    běh pokračuje od posledního uloženého článku (run_ledger).
     """
-    db = SessionLocal()
+    db = WorkerSessionLocal()
+    stats = {"processed": 0, "skipped": 0, "errors": 0}
     try:
-        # Načteme všechny články
-        articles = db.query(Article).all()
-        print(f"Nalezeno {len(articles)} článků")
-        
-        processed = 0
-        skipped = 0
-        errors = 0
-        
-        for i, article in enumerate(articles, 1):
-            print(f"\n[{i}/{len(articles)}]")
-            result = generate_summaries_for_article(article, db)
-            if result:
-                processed += 1
-                # Pauza mezi články
-                if i < len(articles):
-                    time.sleep(DELAY_BETWEEN_ARTICLES)
-            elif article.summary_simple:
-                skipped += 1
-            else:
-                errors += 1
-        
+        with run_ledger(db, "summary", stats) as ledger, BatchWriter(db, "summary", ledger=ledger) as writer:
+            # Načteme jen články s obsahem, kterým některý styl chybí
+            columns = [getattr(Article, STYLES[style][0]) for style in SUMMARY_STYLES]
+            query = db.query(Article).filter(
+                Article.content.isnot(None),
+                or_(*(or_(column.is_(None), column == "") for column in columns)),
+            )
+            articles = ledger.pending(query, Article.id).all()
+            # Během volání LLM nedržíme otevřenou transakci, dávky zapisuje writer
+            db.commit()
+            print(f"Nalezeno {len(articles)} článků bez sumarizace")
+
+            for i, article in enumerate(articles, 1):
+                print(f"\n[{i}/{len(articles)}]")
+                with track_stage("summary", article_id=article.id) as item:
+                    result = generate_summaries_for_article(article, db, writer=writer)
+                    if not result:
+                        item.status = "skipped" if not missing_styles(article) or not article.content else "failed"
+                if result:
+                    stats["processed"] += 1
+                    # Pauza mezi články
+                    if i < len(articles):
+                        time.sleep(DELAY_BETWEEN_ARTICLES)
+                elif not missing_styles(article):
+                    stats["skipped"] += 1
+                else:
+                    stats["errors"] += 1
+
+            writer.flush()
+            stats["processed"] -= writer.failed_writes
+            stats["errors"] += writer.failed_writes
+
         print(f"\n=== Hotovo ===")
-        print(f"Zpracováno: {processed}")
-        print(f"Přeskočeno (už má sumarizaci): {skipped}")
-        print(f"Chyby: {errors}")
-        
+        print(f"Zpracováno: {stats['processed']}")
+        print(f"Přeskočeno (už má sumarizaci): {stats['skipped']}")
+        print(f"Chyby: {stats['errors']}")
+
     finally:
         db.close()
+        push_metrics("generate_summary")
 
 
 if __name__ == "__main__":
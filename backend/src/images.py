@@ -0,0 +1,191 @@
+"""
+Obrázky článků - ukládání pod hashem obsahu a zmenšené varianty.
+
+Při uložení obrázku (store_image) vznikne:
+    {hash}.webp              - plná velikost (to je image_filename článku)
+    {hash}-{šířka}.webp      - zmenšeniny v šířkách IMAGE_WIDTHS
+    {hash}-{šířka}.avif      - totéž v AVIF, pokud ho Pillow umí
+
+Jméno souboru se mění s obsahem, takže API může posílat
+Cache-Control: immutable a prohlížeč se na obrázek už nikdy neptá.
+
+Spuštění (převede existující obrázky na nové názvy a dogeneruje varianty):
+    python -m src.images
+"""
+
+import hashlib
+import io
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Absolutní cesta - nezávisí na pracovním adresáři procesu
+IMAGES_DIR = Path(
+    os.getenv("IMAGES_DIR") or Path(__file__).resolve().parent.parent / "static" / "images"
+).resolve()
+
+IMAGE_WIDTHS = tuple(sorted(
+    int(w) for w in os.getenv("IMAGE_WIDTHS", "320,640,1280").split(",") if w.strip()
+))
+WEBP_QUALITY = int(os.getenv("IMAGE_WEBP_QUALITY", "80"))
+AVIF_QUALITY = int(os.getenv("IMAGE_AVIF_QUALITY", "55"))
+
+# Formáty v pořadí preference při vyjednávání podle hlavičky Accept
+FORMAT_MEDIA_TYPES = {"avif": "image/avif", "webp": "image/webp"}
+
+# Povolená jména souborů - nic jiného se z disku neservíruje
+FILENAME_RE = re.compile(r"^[A-Za-z0-9_-]{1,100}\.(webp|avif|png|jpe?g)$")
+# Jména pod hashem obsahu (ta se nikdy nepřepisují)
+HASHED_RE = re.compile(r"^[0-9a-f]{20}(-\d+)?\.(webp|avif)$")
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:20]
+
+
+def is_hashed(filename: str) -> bool:
+    return bool(HASHED_RE.match(filename))
+
+
+def _avif_supported() -> bool:
+    from PIL import features
+
+    try:
+        return bool(features.check("avif"))
+    except ValueError:
+        # Starší Pillow AVIF vůbec nezná
+        return False
+
+
+def _write_atomic(path: Path, data: bytes):
+    """Zapíše soubor přes dočasný soubor, ať server nikdy nepošle půlku obrázku."""
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def _encode(image, fmt: str) -> bytes:
+    buffer = io.BytesIO()
+    if fmt == "avif":
+        image.save(buffer, format="AVIF", quality=AVIF_QUALITY)
+    else:
+        image.save(buffer, format="WEBP", quality=WEBP_QUALITY, method=6)
+    return buffer.getvalue()
+
+
+def store_image(data: bytes, stem: Optional[str] = None) -> str:
+    """
+    Uloží obrázek (libovolný formát, který umí Pillow) a vygeneruje varianty.
+    Vrátí jméno souboru v plné velikosti pro Article.image_filename.
+    Už existující soubory se znovu nekódují. Parametr stem slouží jen
+    k dogenerování variant k obrázku, který už pod hashem uložený je.
+    """
+    from PIL import Image, ImageOps
+
+    IMAGES_DIR.mkdir(parents=True, exist_ok=True)
+    stem = stem or content_hash(data)
+    filename = f"{stem}.webp"
+
+    with Image.open(io.BytesIO(data)) as source:
+        image = ImageOps.exif_transpose(source)
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+    if not (IMAGES_DIR / filename).exists():
+        _write_atomic(IMAGES_DIR / filename, _encode(image, "webp"))
+
+    formats = ["webp", "avif"] if _avif_supported() else ["webp"]
+    for width in IMAGE_WIDTHS:
+        # Menší obrázky nezvětšujeme - servíruje se pak plná velikost
+        if width >= image.width:
+            continue
+        height = round(image.height * width / image.width)
+        resized = None
+        for fmt in formats:
+            path = IMAGES_DIR / f"{stem}-{width}.{fmt}"
+            if path.exists():
+                continue
+            if resized is None:
+                resized = image.resize((width, height), Image.LANCZOS)
+            _write_atomic(path, _encode(resized, fmt))
+
+    return filename
+
+
+def resolve_image(filename: str) -> Optional[Path]:
+    """
+    Bezpečně převede jméno souboru z URL na cestu v IMAGES_DIR.
+    Vrátí None pro neplatná jména, cesty mimo adresář a neexistující soubory.
+    """
+    if not FILENAME_RE.match(filename):
+        return None
+    path = (IMAGES_DIR / filename).resolve()
+    if not path.is_relative_to(IMAGES_DIR) or not path.is_file():
+        return None
+    return path
+
+
+def variant_candidates(filename: str, width: Optional[int], accept: str) -> List[str]:
+    """
+    Jména souborů, které připadají v úvahu pro požadavek, od nejlepšího.
+    Vybere nejmenší šířku >= požadované a formát podle hlavičky Accept;
+    na konci je vždy původní soubor.
+    """
+    stem, _, _ = filename.rpartition(".")
+    candidates = []
+    if width and is_hashed(filename):
+        widths = [w for w in IMAGE_WIDTHS if w >= width]
+        formats = [fmt for fmt in FORMAT_MEDIA_TYPES if FORMAT_MEDIA_TYPES[fmt] in accept]
+        # WebP umí všechny současné prohlížeče, i když ho v Accept neuvedou
+        if "webp" not in formats:
+            formats.append("webp")
+        if widths:
+            candidates = [f"{stem}-{widths[0]}.{fmt}" for fmt in formats]
+    candidates.append(filename)
+    return candidates
+
+
+def migrate_existing_images() -> Dict[str, int]:
+    """
+    Převede obrázky článků se starými jmény na jména pod hashem obsahu
+    a u všech dogeneruje chybějící varianty.
+    """
+    from .database import WorkerSessionLocal
+    from .models import Article
+
+    stats = {"migrated": 0, "missing": 0, "errors": 0}
+    db = WorkerSessionLocal()
+    try:
+        articles = db.query(Article).filter(Article.image_filename.isnot(None)).all()
+        for article in articles:
+            path = resolve_image(article.image_filename)
+            if path is None:
+                print(f"   ⚠️ Článek {article.id}: obrázek {article.image_filename} nenalezen")
+                stats["missing"] += 1
+                continue
+            # U obrázku pod hashem jen doplníme varianty (hash WebP souboru
+            # by se lišil od hashe původního obrázku)
+            stem = path.stem if is_hashed(path.name) else None
+            try:
+                new_filename = store_image(path.read_bytes(), stem=stem)
+            except Exception as e:
+                print(f"   ❌ Článek {article.id}: {e}")
+                stats["errors"] += 1
+                continue
+            if new_filename != article.image_filename:
+                article.image_filename = new_filename
+                db.commit()
+            stats["migrated"] += 1
+    finally:
+        db.close()
+    return stats
+
+
+if __name__ == "__main__":
+    print("🖼️ Převádím obrázky článků na varianty pod hashem obsahu...")
+    result = migrate_existing_images()
+    print(f"✅ Hotovo: {result['migrated']} obrázků, chybí {result['missing']}, chyby {result['errors']}")
@@ -0,0 +1,418 @@
+"""
+Sdílené metriky (Prometheus) a tracing (OpenTelemetry) pro API i batch skripty.
+
+Pokud běží API ve více gunicorn workerech, nastav PROMETHEUS_MULTIPROCESS_DIR
+na prázdný adresář - endpoint /metrics pak sečte hodnoty ze všech workerů.
+
+Batch skripty (crawler, sumarizace, embeddingy, agent) běží krátce, takže
+metriky na konci odešlou do Pushgateway (PROMETHEUS_PUSHGATEWAY=host:9091).
+
+Volání LLM se navíc sčítají v procesu (USAGE) - tokeny, cena a cena
+na položku (článek, odkaz) podle kroku; batch skripty souhrn vypíší na konci.
+
+Tracing je volitelný: spany se exportují jen při nastaveném
+OTEL_EXPORTER_OTLP_ENDPOINT (např. lokální collector http://localhost:4318)
+nebo OTEL_TRACES_CONSOLE=1 (výpis na stdout). Bez OpenTelemetry SDK
+jsou span() a track_*() jen měření do Prometheu.
+"""
+
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Dict, Iterator, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# --- Databázový pool ---
+POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Doba čekání na spojení z poolu",
+    ["role"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Počet právě vypůjčených spojení",
+    ["role"],
+    multiprocess_mode="livesum",
+)
+POOL_SATURATION = Gauge(
+    "db_pool_saturation_ratio",
+    "Vytížení poolu (vypůjčená spojení / pool_size + max_overflow)",
+    ["role"],
+    multiprocess_mode="livemax",
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Doba provedení SQL dotazu",
+    ["role"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 30),
+)
+
+# --- Kroky pipeline (crawler, content, summary, embedding, digest) ---
+STAGE_ITEMS = Counter(
+    "pipeline_items_total",
+    "Zpracované položky podle kroku a výsledku (ok / skipped / failed)",
+    ["stage", "status"],
+)
+STAGE_DURATION = Histogram(
+    "pipeline_item_duration_seconds",
+    "Doba zpracování jedné položky v kroku pipeline",
+    ["stage"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+STAGE_ERRORS = Counter(
+    "pipeline_errors_total",
+    "Chyby v krocích pipeline podle typu výjimky",
+    ["stage", "error"],
+)
+FETCH_BYTES = Counter(
+    "fetch_bytes_total",
+    "Stažené bajty (HTML stránek a článků)",
+    ["stage"],
+)
+
+# --- LLM a embeddingy ---
+LLM_LATENCY = Histogram(
+    "llm_request_duration_seconds",
+    "Doba volání LLM / embedding API",
+    ["operation", "model"],
+    buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120),
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total",
+    "Spotřebované tokeny (direction = input / output)",
+    ["operation", "model", "direction"],
+)
+LLM_ERRORS = Counter(
+    "llm_errors_total",
+    "Neúspěšná volání LLM / embedding API",
+    ["operation", "model", "error"],
+)
+LLM_ITEMS = Counter(
+    "llm_items_total",
+    "Položky (články, odkazy) zpracované voláními LLM - jmenovatel pro cenu na článek",
+    ["operation", "model"],
+)
+LLM_COST = Counter(
+    "llm_cost_usd_total",
+    "Odhadovaná cena volání LLM v USD (podle LLM_PRICE_*)",
+    ["operation", "model"],
+)
+LLM_QUEUE_WAIT = Histogram(
+    "llm_queue_wait_seconds",
+    "Čekání ve frontě LLM gateway na volnou kvótu",
+    ["gateway", "priority"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+LLM_RATE_LIMITED = Counter(
+    "llm_rate_limited_total",
+    "Odpovědi 429 / RESOURCE_EXHAUSTED od providera (gateway je zopakuje)",
+    ["gateway"],
+)
+LLM_COALESCED = Counter(
+    "llm_coalesced_total",
+    "Požadavky sloučené se stejným právě běžícím požadavkem",
+    ["gateway"],
+)
+
+# Ceník v USD za milion tokenů (výchozí hodnoty odpovídají gemini-2.0-flash-lite)
+LLM_PRICE_INPUT_PER_MTOK = float(os.getenv("LLM_PRICE_INPUT_PER_MTOK", "0.075"))
+LLM_PRICE_OUTPUT_PER_MTOK = float(os.getenv("LLM_PRICE_OUTPUT_PER_MTOK", "0.30"))
+
+
+def token_cost(input_tokens: int, output_tokens: int) -> float:
+    return (input_tokens * LLM_PRICE_INPUT_PER_MTOK + output_tokens * LLM_PRICE_OUTPUT_PER_MTOK) / 1_000_000
+
+
+def metrics_payload() -> tuple[bytes, str]:
+    """Vrátí obsah pro endpoint /metrics a jeho content type."""
+    if os.getenv("PROMETHEUS_MULTIPROCESS_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+# --- Tracing ---
+
+@lru_cache(maxsize=1)
+def get_tracer():
+    """
+    Vrátí OpenTelemetry tracer (nebo None bez nainstalovaného API).
+    Provider s exportérem se nastaví až při prvním použití, tedy
+    v každém gunicorn workeru zvlášť (ne v master procesu).
+    """
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        return None
+
+    otlp_endpoint = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+    console = os.getenv("OTEL_TRACES_CONSOLE") == "1"
+    if otlp_endpoint or console:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import (
+            BatchSpanProcessor,
+            ConsoleSpanExporter,
+            SimpleSpanProcessor,
+        )
+
+        provider = TracerProvider(resource=Resource.create({
+            "service.name": os.getenv("OTEL_SERVICE_NAME", "ainews"),
+        }))
+        if otlp_endpoint:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+            provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+        if console:
+            provider.add_span_processor(SimpleSpanProcessor(ConsoleSpanExporter()))
+        trace.set_tracer_provider(provider)
+
+    return trace.get_tracer("ainews")
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Any]]:
+    """Span kolem bloku kódu (fetch, extract, llm, db...). Bez OpenTelemetry nic nedělá."""
+    tracer = get_tracer()
+    if tracer is None:
+        yield None
+        return
+    attributes = {key: value for key, value in attributes.items() if value is not None}
+    with tracer.start_as_current_span(name, attributes=attributes) as current:
+        yield current
+
+
+class StageItem:
+    """Zpracovávaná položka; v bloku track_stage lze změnit status (skipped, failed)."""
+
+    def __init__(self, current_span):
+        self.status = "ok"
+        self.span = current_span
+
+    def set(self, **attributes: Any):
+        if self.span is not None:
+            for key, value in attributes.items():
+                if value is not None:
+                    self.span.set_attribute(key, value)
+
+
+@contextmanager
+def track_stage(stage: str, **attributes: Any) -> Iterator[StageItem]:
+    """
+    Změří zpracování jedné položky v kroku pipeline: doba, výsledek,
+    chyby (výjimka se započítá a pošle dál) a span `stage.<stage>`.
+    """
+    start = time.perf_counter()
+    with span(f"stage.{stage}", **attributes) as current:
+        item = StageItem(current)
+        try:
+            yield item
+        except Exception as e:
+            item.status = "failed"
+            STAGE_ERRORS.labels(stage=stage, error=type(e).__name__).inc()
+            raise
+        finally:
+            STAGE_DURATION.labels(stage=stage).observe(time.perf_counter() - start)
+            STAGE_ITEMS.labels(stage=stage, status=item.status).inc()
+            item.set(status=item.status)
+
+
+def record_stage_error(stage: str, error: BaseException):
+    """Započítá chybu, kterou volající sám ošetřil (a nepošle dál)."""
+    STAGE_ERRORS.labels(stage=stage, error=type(error).__name__).inc()
+
+
+def record_fetch(stage: str, size: int):
+    FETCH_BYTES.labels(stage=stage).inc(size)
+
+
+class UsageLedger:
+    """Součty volání LLM v tomto procesu podle operace (pro souhrn na konci běhu)."""
+
+    FIELDS = ("calls", "items", "input_tokens", "output_tokens")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows: Dict[str, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(self.FIELDS, 0))
+
+    def add(self, operation: str, **counts: int):
+        with self._lock:
+            row = self._rows[operation]
+            for key, value in counts.items():
+                row[key] += value
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        """Tokeny, cena a průměr na volání i na položku podle operace."""
+        with self._lock:
+            rows = {operation: dict(row) for operation, row in self._rows.items()}
+        for row in rows.values():
+            row["cost_usd"] = token_cost(row["input_tokens"], row["output_tokens"])
+            for unit in ("calls", "items"):
+                count = row[unit] or 1
+                row[f"input_tokens_per_{unit[:-1]}"] = round(row["input_tokens"] / count, 1)
+                row[f"output_tokens_per_{unit[:-1]}"] = round(row["output_tokens"] / count, 1)
+            row["cost_usd_per_item"] = row["cost_usd"] / (row["items"] or 1)
+        return rows
+
+    def reset(self):
+        with self._lock:
+            self._rows.clear()
+
+
+USAGE = UsageLedger()
+
+
+def llm_usage_report() -> Dict[str, Dict[str, float]]:
+    return USAGE.report()
+
+
+def print_llm_usage():
+    """Vypíše souhrn tokenů a ceny za běh (nic, pokud se LLM nevolalo)."""
+    report = llm_usage_report()
+    if not report:
+        return
+    print("\n💰 Spotřeba LLM (odhad ceny podle LLM_PRICE_*):")
+    for operation, row in sorted(report.items()):
+        print(
+            f"   {operation}: {row['calls']} volání, {row['items']} položek, "
+            f"vstup {row['input_tokens']} / výstup {row['output_tokens']} tokenů, "
+            f"{row['input_tokens_per_item']:.0f}+{row['output_tokens_per_item']:.0f} tokenů "
+            f"a ${row['cost_usd_per_item']:.6f} na položku"
+        )
+
+
+class LLMCall:
+    """Probíhající volání LLM; po odpovědi se přes record_usage() započítají tokeny."""
+
+    def __init__(self, operation: str, model: str, current_span):
+        self.operation = operation
+        self.model = model
+        self.span = current_span
+
+    def record_usage(self, response: Any):
+        """
+        Započítá tokeny z odpovědi LangChainu (AIMessage.usage_metadata)
+        nebo přímo ze slovníku {"input_tokens": ..., "output_tokens": ...}.
+        """
+        usage = response if isinstance(response, dict) else getattr(response, "usage_metadata", None)
+        if not usage:
+            return
+        tokens = {direction: usage.get(f"{direction}_tokens") or 0 for direction in ("input", "output")}
+        for direction, count in tokens.items():
+            if count:
+                LLM_TOKENS.labels(operation=self.operation, model=self.model, direction=direction).inc(count)
+                if self.span is not None:
+                    self.span.set_attribute(f"gen_ai.usage.{direction}_tokens", count)
+        LLM_COST.labels(operation=self.operation, model=self.model).inc(token_cost(tokens["input"], tokens["output"]))
+        USAGE.add(self.operation, input_tokens=tokens["input"], output_tokens=tokens["output"])
+
+    def parsed(self, result: dict) -> Any:
+        """
+        Výsledek with_structured_output(..., include_raw=True): započítá tokeny
+        ze syrové odpovědi a vrátí rozparsovaný objekt (chybu parsování vyhodí).
+        """
+        self.record_usage(result["raw"])
+        if result.get("parsing_error") is not None:
+            raise result["parsing_error"]
+        if result.get("parsed") is None:
+            raise ValueError("Model nevrátil strukturovanou odpověď")
+        return result["parsed"]
+
+
+@contextmanager
+def track_llm(operation: str, model: str, items: int = 1, **attributes: Any) -> Iterator[LLMCall]:
+    """
+    Změří volání LLM / embedding API (latence, chyby, span `llm.<operation>`).
+    items = kolik položek (článků, odkazů) volání zpracovává - z toho se
+    počítá cena na článek.
+    """
+    start = time.perf_counter()
+    with span(f"llm.{operation}", **{"gen_ai.request.model": model}, items=items, **attributes) as current:
+        try:
+            yield LLMCall(operation, model, current)
+        except Exception as e:
+            LLM_ERRORS.labels(operation=operation, model=model, error=type(e).__name__).inc()
+            USAGE.add(operation, calls=1)
+            raise
+        else:
+            LLM_ITEMS.labels(operation=operation, model=model).inc(items)
+            USAGE.add(operation, calls=1, items=items)
+        finally:
+            LLM_LATENCY.labels(operation=operation, model=model).observe(time.perf_counter() - start)
+
+
+# --- Napojení knihoven ---
+
+def instrument_engine(db_engine, role: str):
+    """Měření SQL dotazů enginu (histogram + spany přes OpenTelemetry, pokud je k dispozici)."""
+    from sqlalchemy import event
+
+    @event.listens_for(db_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(db_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_start"].pop()
+        DB_QUERY_DURATION.labels(role=role).observe(time.perf_counter() - started)
+
+    @event.listens_for(db_engine, "handle_error")
+    def _handle_error(context):
+        # Při chybě after_cursor_execute neproběhne - začátek dotazu zahodíme
+        conn = context.connection
+        if conn is not None and conn.info.get("query_start"):
+            conn.info["query_start"].pop()
+
+    try:
+        from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
+    except ImportError:
+        return
+    SQLAlchemyInstrumentor().instrument(engine=db_engine, enable_commenter=False)
+
+
+def instrument_app(app):
+    """Spany pro HTTP requesty FastAPI (jen s nainstalovaným OpenTelemetry)."""
+    try:
+        from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+    except ImportError:
+        return
+    FastAPIInstrumentor.instrument_app(app, excluded_urls="metrics")
+
+
+def push_metrics(job: str):
+    """
+    Na konci batch skriptu vypíše spotřebu LLM, odešle metriky do
+    Pushgateway a dopíše rozpracované spany (pokud je tracing zapnutý).
+    """
+    print_llm_usage()
+
+    gateway = os.getenv("PROMETHEUS_PUSHGATEWAY")
+    if gateway:
+        from prometheus_client import push_to_gateway
+
+        try:
+            push_to_gateway(gateway, job=job, registry=REGISTRY)
+        except OSError as e:
+            print(f"⚠️  Nepodařilo se odeslat metriky do Pushgateway: {e}")
+
+    if get_tracer() is not None:
+        from opentelemetry import trace
+
+        provider = trace.get_tracer_provider()
+        if hasattr(provider, "force_flush"):
+            provider.force_flush()
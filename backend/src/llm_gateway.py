@@ -0,0 +1,545 @@
+"""
+Sdílená brána pro volání LLM a embedding API.
+
+Crawler, sumarizace, embeddingy, agent i API (stream přehledu) čerpají
+ze stejné kvóty Gemini (požadavky a tokeny za minutu). Místo pevných
+pauz a vlastních opakování v každém klientovi jde každé volání přes
+LLMGateway:
+
+- Kvóta: spotřeba se zapisuje do tabulky llm_quota_windows (pevná okna
+  LLM_QUOTA_WINDOW_S), takže ji sdílí všechny procesy. Bez databáze
+  (LLM_QUOTA_BACKEND=local) se počítá klouzavé okno v paměti procesu.
+- Priority: DIGEST > FRESH (nové články) > BACKFILL (starší články).
+  Nižší priorita smí vyčerpat jen část okna (LLM_*_SHARE), takže zbytek
+  zůstane pro přehled a nové články i z jiných procesů.
+- Férová fronta: v rámci procesu se čeká v haldě podle priority a pak
+  podle "virtuálního času" kroku (součet jeho tokenů) - krok, který
+  posílá velké prompty, nezablokuje ostatní.
+- Slučování: stejný požadavek, který už běží, se nepošle podruhé;
+  počká se na výsledek prvního.
+- 429 / RESOURCE_EXHAUSTED: gateway počká (exponenciálně, s rozptylem)
+  a zkusí to znovu přes frontu.
+
+Použití:
+    gateway = get_gateway("llm")
+    response = gateway.call(lambda: llm.invoke(prompt), stage="summary",
+                            priority=Priority.FRESH, prompt=prompt, model=GEMINI_MODEL)
+"""
+
+import asyncio
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from enum import IntEnum
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Set, Tuple, TypeVar
+
+from dotenv import load_dotenv
+
+from .instrumentation import LLM_COALESCED, LLM_QUEUE_WAIT, LLM_RATE_LIMITED
+from .tokens import estimate_tokens
+
+load_dotenv()
+
+T = TypeVar("T")
+
+LLM_QUOTA_BACKEND = os.getenv("LLM_QUOTA_BACKEND", "postgres")
+LLM_QUOTA_WINDOW_S = float(os.getenv("LLM_QUOTA_WINDOW_S", "60"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_GATEWAY_RETRIES = int(os.getenv("LLM_GATEWAY_RETRIES", "5"))
+# Odhad výstupu do rezervace (skutečný počet se po odpovědi dorovná)
+LLM_EXPECTED_OUTPUT_TOKENS = int(os.getenv("LLM_EXPECTED_OUTPUT_TOKENS", "400"))
+# Článek je "nový", pokud vyšel (nebo byl vložen) před méně než tolika hodinami
+LLM_FRESH_HOURS = float(os.getenv("LLM_FRESH_HOURS", "24"))
+
+
+class Priority(IntEnum):
+    DIGEST = 0
+    FRESH = 1
+    BACKFILL = 2
+
+
+# Jakou část okna smí priorita vyčerpat
+PRIORITY_SHARES = {
+    Priority.DIGEST: 1.0,
+    Priority.FRESH: float(os.getenv("LLM_FRESH_SHARE", "0.9")),
+    Priority.BACKFILL: float(os.getenv("LLM_BACKFILL_SHARE", "0.6")),
+}
+
+
+def article_priority(article) -> Priority:
+    """Nové články před doháněním starých."""
+    timestamp = article.published_date or article.created_at
+    if timestamp is None or timestamp >= datetime.now() - timedelta(hours=LLM_FRESH_HOURS):
+        return Priority.FRESH
+    return Priority.BACKFILL
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """
+    Odmítnutí kvótou (google.api_core ResourceExhausted, HTTP 429) - podle
+    typu nebo stavového kódu, i když ho klient zabalil do vlastní výjimky.
+    Text chyby se neporovnává ("429" může být id článku nebo počet tokenů).
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if type(error).__name__ in ("ResourceExhausted", "TooManyRequests"):
+            return True
+        if any(getattr(error, attr, None) == 429 for attr in ("code", "status_code")):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+def _usage_tokens(result: Any) -> Optional[int]:
+    """Skutečný počet tokenů z odpovědi LangChainu (i structured s include_raw)."""
+    if isinstance(result, dict) and "raw" in result:
+        result = result["raw"]
+    usage = getattr(result, "usage_metadata", None)
+    if not usage:
+        return None
+    return (usage.get("input_tokens") or 0) + (usage.get("output_tokens") or 0)
+
+
+# --- Kvóty ---
+
+def _share_limit(limit: int, share: float) -> int:
+    """Část limitu pro prioritu (0 = bez limitu zůstává 0, jinak aspoň 1)."""
+    return max(int(limit * share), 1) if limit else 0
+
+
+class NoQuota:
+    """Bez limitu (LLM_RPM i LLM_TPM = 0)."""
+
+    def try_acquire(self, tokens: int, share: float) -> float:
+        return 0
+
+    def adjust(self, tokens: int):
+        pass
+
+
+class LocalQuota:
+    """Klouzavé okno v paměti - jen pro jeden proces (testy, benchmarky, běh bez DB)."""
+
+    def __init__(self, rpm: int, tpm: int, window_s: float = LLM_QUOTA_WINDOW_S):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.window_s = window_s
+        self._events: deque = deque()  # (čas, požadavky, tokeny)
+        self._lock = threading.Lock()
+
+    def _expire(self, now: float):
+        while self._events and self._events[0][0] <= now - self.window_s:
+            self._events.popleft()
+
+    def try_acquire(self, tokens: int, share: float) -> float:
+        """Zarezervuje požadavek; vrátí 0, nebo kolik sekund počkat."""
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            requests = sum(e[1] for e in self._events)
+            used = sum(e[2] for e in self._events)
+            over_rpm = self.rpm and requests + 1 > _share_limit(self.rpm, share)
+            over_tpm = self.tpm and used > 0 and used + tokens > _share_limit(self.tpm, share)
+            if over_rpm or over_tpm:
+                return self._events[0][0] + self.window_s - now if self._events else self.window_s
+            self._events.append((now, 1, tokens))
+            return 0
+
+    def adjust(self, tokens: int):
+        with self._lock:
+            self._events.append((time.monotonic(), 0, tokens))
+
+
+class PostgresQuota:
+    """
+    Pevná okna v tabulce llm_quota_windows. Rezervace je jeden atomický
+    upsert - podmínka ve WHERE zajistí, že souběžné procesy limit nepřekročí.
+    """
+
+    ACQUIRE_SQL = """
+        INSERT INTO llm_quota_windows AS q (name, window_start, requests, tokens)
+        VALUES (:name, to_timestamp(floor(extract(epoch FROM clock_timestamp()) / :window) * :window), 1, :tokens)
+        ON CONFLICT (name, window_start) DO UPDATE
+            SET requests = q.requests + 1, tokens = q.tokens + EXCLUDED.tokens
+            WHERE (:rpm = 0 OR q.requests + 1 <= :rpm)
+              AND (:tpm = 0 OR q.tokens + EXCLUDED.tokens <= :tpm)
+        RETURNING window_start
+    """
+
+    def __init__(self, name: str, rpm: int, tpm: int, window_s: float = LLM_QUOTA_WINDOW_S):
+        self.name = name
+        self.rpm = rpm
+        self.tpm = tpm
+        self.window_s = window_s
+        self._window_start = None
+
+    def _engine(self):
+        # Worker engine - dotazy na kvótu nesmí ubírat spojení API poolu
+        from .database import worker_engine
+
+        return worker_engine
+
+    def try_acquire(self, tokens: int, share: float) -> float:
+        from sqlalchemy import text
+
+        params = {
+            "name": self.name,
+            "window": self.window_s,
+            "tokens": tokens,
+            "rpm": _share_limit(self.rpm, share),
+            "tpm": _share_limit(self.tpm, share),
+        }
+        with self._engine().begin() as conn:
+            row = conn.execute(text(self.ACQUIRE_SQL), params).first()
+            if row is not None and row.window_start != self._window_start:
+                # Nové okno - staré záznamy už nejsou potřeba
+                conn.execute(
+                    text("DELETE FROM llm_quota_windows WHERE name = :name AND window_start < now() - interval '1 day'"),
+                    {"name": self.name},
+                )
+        if row is None:
+            return self.window_s - time.time() % self.window_s
+        self._window_start = row.window_start
+        return 0
+
+    def adjust(self, tokens: int):
+        if not tokens or self._window_start is None:
+            return
+        from sqlalchemy import text
+
+        with self._engine().begin() as conn:
+            conn.execute(
+                text("UPDATE llm_quota_windows SET tokens = tokens + :tokens WHERE name = :name AND window_start = :start"),
+                {"tokens": tokens, "name": self.name, "start": self._window_start},
+            )
+
+
+# --- Gateway ---
+
+@dataclass(order=True)
+class _Ticket:
+    priority: int
+    virtual_time: float
+    seq: int
+    stage: str = field(compare=False)
+    tokens: int = field(compare=False)
+
+
+class Reservation:
+    """Přidělený slot; po odpovědi se rezervované tokeny dorovnají na skutečné."""
+
+    def __init__(self, gateway: "LLMGateway", tokens: int):
+        self.gateway = gateway
+        self.tokens = tokens
+
+    def reconcile(self, result: Any):
+        actual = _usage_tokens(result)
+        if actual is not None and actual != self.tokens:
+            self.gateway.quota.adjust(actual - self.tokens)
+            self.tokens = actual
+
+
+class LLMGateway:
+    def __init__(self, name: str, quota, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 max_retries: int = LLM_GATEWAY_RETRIES):
+        self.name = name
+        self.quota = quota
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self._cond = threading.Condition()
+        self._queue: List[_Ticket] = []
+        self._seq = itertools.count()
+        self._stage_clock: Dict[str, float] = {}
+        self._clock = 0.0
+        self._active = 0
+        # Požadavek, který právě čte kvótu (mimo zámek); ostatní čekají
+        self._checking: Optional[_Ticket] = None
+        # (smyčka, Event) asynchronních čekatelů - budí je _notify
+        self._async_waiters: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+        self._inflight: Dict[str, Future] = {}
+
+    # Fronta a kvóta
+
+    def _enqueue(self, stage: str, priority: Priority, tokens: int) -> _Ticket:
+        # Férovost v rámci priority: virtuální čas kroku roste s jeho tokeny,
+        # nečinný krok začíná od aktuálního času fronty (nemá "naspořeno")
+        start = max(self._stage_clock.get(stage, 0.0), self._clock)
+        finish = start + max(tokens, 1)
+        self._stage_clock[stage] = finish
+        ticket = _Ticket(int(priority), finish, next(self._seq), stage, tokens)
+        heapq.heappush(self._queue, ticket)
+        return ticket
+
+    def _claim(self, ticket: _Ticket) -> bool:
+        """Pod zámkem: požadavek je na řadě a nikdo jiný zrovna nečte kvótu."""
+        if (self._checking is None and self._queue and self._queue[0] is ticket
+                and self._active < self.max_concurrency):
+            self._checking = ticket
+            return True
+        return False
+
+    def _admit(self, ticket: _Ticket):
+        with self._cond:
+            # Mezitím mohl na začátek fronty přijít požadavek s vyšší prioritou
+            self._queue.remove(ticket)
+            heapq.heapify(self._queue)
+            self._checking = None
+            self._active += 1
+            self._clock = ticket.virtual_time
+            self._notify()
+
+    def _unclaim(self, ticket: _Ticket):
+        with self._cond:
+            if self._checking is ticket:
+                self._checking = None
+            self._notify()
+
+    def _abandon(self, ticket: _Ticket):
+        """Čekající odešel (výjimka, zrušený task) - uvolní místo ve frontě."""
+        with self._cond:
+            if self._checking is ticket:
+                self._checking = None
+            if ticket in self._queue:
+                self._queue.remove(ticket)
+                heapq.heapify(self._queue)
+            self._notify()
+
+    def _notify(self):
+        """Pod zámkem: probudí čekající vlákna i asynchronní čekatele."""
+        self._cond.notify_all()
+        for loop, event in list(self._async_waiters):
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # Smyčka čekatele už skončila
+                self._async_waiters.discard((loop, event))
+
+    def _observe_wait(self, priority: Priority, started: float):
+        LLM_QUEUE_WAIT.labels(gateway=self.name, priority=Priority(priority).name.lower()).observe(
+            time.perf_counter() - started
+        )
+
+    def acquire(self, stage: str, priority: Priority, tokens: int) -> Reservation:
+        """Blokuje, dokud požadavek není na řadě a nevejde se do kvóty."""
+        started = time.perf_counter()
+        share = PRIORITY_SHARES[Priority(priority)]
+        with self._cond:
+            ticket = self._enqueue(stage, priority, tokens)
+        try:
+            while True:
+                with self._cond:
+                    while not self._claim(ticket):
+                        self._cond.wait(timeout=0.5)
+                # Kvóta (u PostgresQuota dotaz do DB) se čte bez zámku gateway
+                try:
+                    wait = self.quota.try_acquire(tokens, share)
+                except BaseException:
+                    self._unclaim(ticket)
+                    raise
+                if wait <= 0:
+                    self._admit(ticket)
+                    break
+                self._unclaim(ticket)
+                with self._cond:
+                    self._cond.wait(timeout=min(max(wait, 0.01), 1.0))
+        except BaseException:
+            self._abandon(ticket)
+            raise
+        self._observe_wait(priority, started)
+        return Reservation(self, tokens)
+
+    async def aacquire(self, stage: str, priority: Priority, tokens: int) -> Reservation:
+        """
+        Asynchronní acquire. Čeká na asyncio.Event, takže zrušený task
+        (např. odpojený klient streamu) odejde z fronty a slot si nevezme.
+        """
+        started = time.perf_counter()
+        share = PRIORITY_SHARES[Priority(priority)]
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        event = waiter[1]
+        with self._cond:
+            ticket = self._enqueue(stage, priority, tokens)
+            self._async_waiters.add(waiter)
+        try:
+            while True:
+                event.clear()
+                with self._cond:
+                    claimed = self._claim(ticket)
+                timeout = 0.5
+                if claimed:
+                    try:
+                        wait = await asyncio.to_thread(self.quota.try_acquire, tokens, share)
+                    except BaseException:
+                        self._unclaim(ticket)
+                        raise
+                    if wait <= 0:
+                        self._admit(ticket)
+                        break
+                    self._unclaim(ticket)
+                    event.clear()
+                    timeout = min(max(wait, 0.01), 1.0)
+                try:
+                    await asyncio.wait_for(event.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            self._abandon(ticket)
+            raise
+        finally:
+            with self._cond:
+                self._async_waiters.discard(waiter)
+        self._observe_wait(priority, started)
+        return Reservation(self, tokens)
+
+    def release(self):
+        with self._cond:
+            self._active -= 1
+            self._notify()
+
+    @contextmanager
+    def slot(self, stage: str, priority: Priority, prompt: str = "", tokens: Optional[int] = None) -> Iterator[Reservation]:
+        """Slot pro jedno volání (bez opakování) - např. pro streamování."""
+        reservation = self.acquire(stage, priority, self._reserve(prompt, tokens))
+        try:
+            yield reservation
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def aslot(self, stage: str, priority: Priority, prompt: str = "", tokens: Optional[int] = None):
+        reservation = await self.aacquire(stage, priority, self._reserve(prompt, tokens))
+        try:
+            yield reservation
+        finally:
+            self.release()
+
+    @staticmethod
+    def _reserve(prompt: str, tokens: Optional[int]) -> int:
+        return tokens if tokens is not None else estimate_tokens(prompt) + LLM_EXPECTED_OUTPUT_TOKENS
+
+    def _backoff(self, attempt: int) -> float:
+        LLM_RATE_LIMITED.labels(gateway=self.name).inc()
+        return min(2 ** attempt, 60) * (0.5 + random.random())
+
+    # Slučování stejných požadavků
+
+    def _coalesce(self, stage: str, prompt: str, coalesce: bool, model: str = "",
+                  params: Optional[Dict[str, Any]] = None):
+        """
+        Vrátí (future, vlastník). Vlastník volání provede, ostatní čekají na jeho výsledek.
+        Sloučí se jen volání se stejným modelem a parametry (schéma, task_type ...).
+        """
+        if not coalesce or not prompt:
+            return None, True
+        options = json.dumps(params or {}, sort_keys=True, default=str)
+        key = hashlib.sha256(f"{stage}\0{model}\0{options}\0{prompt}".encode("utf-8")).hexdigest()
+        with self._cond:
+            future = self._inflight.get(key)
+            if future is not None:
+                LLM_COALESCED.labels(gateway=self.name).inc()
+                return future, False
+            future = Future()
+            future.key = key
+            self._inflight[key] = future
+            return future, True
+
+    def _settle(self, future: Optional[Future], result: Any = None, error: BaseException = None):
+        if future is None:
+            return
+        with self._cond:
+            self._inflight.pop(future.key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    # Volání
+
+    def call(self, fn: Callable[[], T], *, stage: str, priority: Priority, prompt: str = "",
+             tokens: Optional[int] = None, coalesce: bool = True, model: str = "",
+             params: Optional[Dict[str, Any]] = None) -> T:
+        """
+        Zavolá fn() ve slotu gateway; při 429 počká a zkusí to znovu.
+        model a params patří do klíče slučování - stejný prompt s jiným
+        modelem nebo parametry volání je jiný požadavek.
+        """
+        future, owner = self._coalesce(stage, prompt, coalesce, model, params)
+        if not owner:
+            return future.result()
+        try:
+            for attempt in range(self.max_retries + 1):
+                with self.slot(stage, priority, prompt, tokens) as reservation:
+                    try:
+                        result = fn()
+                    except Exception as e:
+                        if not is_rate_limited(e) or attempt == self.max_retries:
+                            raise
+                        delay = self._backoff(attempt)
+                    else:
+                        reservation.reconcile(result)
+                        self._settle(future, result)
+                        return result
+                time.sleep(delay)
+        except BaseException as e:
+            self._settle(future, error=e)
+            raise
+
+    async def acall(self, fn: Callable[[], Awaitable[T]], *, stage: str, priority: Priority, prompt: str = "",
+                    tokens: Optional[int] = None, coalesce: bool = True, model: str = "",
+                    params: Optional[Dict[str, Any]] = None) -> T:
+        """Asynchronní varianta call()."""
+        future, owner = self._coalesce(stage, prompt, coalesce, model, params)
+        if not owner:
+            return await asyncio.wrap_future(future)
+        try:
+            for attempt in range(self.max_retries + 1):
+                async with self.aslot(stage, priority, prompt, tokens) as reservation:
+                    try:
+                        result = await fn()
+                    except Exception as e:
+                        if not is_rate_limited(e) or attempt == self.max_retries:
+                            raise
+                        delay = self._backoff(attempt)
+                    else:
+                        reservation.reconcile(result)
+                        self._settle(future, result)
+                        return result
+                await asyncio.sleep(delay)
+        except BaseException as e:
+            self._settle(future, error=e)
+            raise
+
+
+def _env_limit(name: str, default: str) -> int:
+    return int(os.getenv(name, default) or 0)
+
+
+@lru_cache(maxsize=None)
+def get_gateway(name: str = "llm") -> LLMGateway:
+    """
+    Sdílená gateway procesu pro kvótu `name` (llm / embedding).
+    Limity: {NAME}_RPM a {NAME}_TPM, 0 = bez limitu.
+    """
+    defaults = {"llm": ("30", "1000000"), "embedding": ("1500", "0")}
+    rpm_default, tpm_default = defaults.get(name, ("0", "0"))
+    rpm = _env_limit(f"{name.upper()}_RPM", rpm_default)
+    tpm = _env_limit(f"{name.upper()}_TPM", tpm_default)
+    if not rpm and not tpm:
+        quota = NoQuota()
+    elif LLM_QUOTA_BACKEND == "local":
+        quota = LocalQuota(rpm, tpm)
+    else:
+        quota = PostgresQuota(name, rpm, tpm)
+    return LLMGateway(name, quota)
@@ -1,26 +1,84 @@
-from fastapi import FastAPI, Depends, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session
-from sqlalchemy import text
-from typing import List
-from pathlib import Path
-import google.generativeai as genai
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, ORJSONResponse, Response, StreamingResponse
+from brotli_asgi import BrotliMiddleware
+from sqlalchemy.orm import Session, load_only
+from sqlalchemy import Integer, any_, bindparam, text, literal_column
+from sqlalchemy.dialects.postgresql import ARRAY
+from typing import Dict, List, Optional
+from datetime import date, timedelta
+import base64
+import json
 import os
+import re
+import orjson
 
-from . import models, schemas
-from .database import engine, get_db, Base
+from . import images, models, schemas
+from .database import SessionLocal, engine, get_db
+from .embeddings import candidate_count, get_embedding_provider, nearest_sql, set_search_breadth
+from .facets import facet_counts
+from .instrumentation import instrument_app, metrics_payload
 
-# Konfigurace Gemini pro embeddingy
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+# Odpovědi menší než tato velikost (v bajtech) se nekomprimují
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1000"))
+
+# Verze řádku - Postgres mění xmin při každém UPDATE, takže slouží jako
+# levná verze pro ETag bez dalšího sloupce nebo triggeru
+ROW_VERSION = literal_column("articles.xmin::text")
+
+# Pole článku, která si klient může vyžádat přes ?fields=
+ARTICLE_FIELDS = {
+    name: getattr(models.Article, name)
+    for name in (
+        "title",
+        "url",
+        "categories",
+        "content",
+        "published_date",
+        "summary_simple",
+        "summary_funny",
+        "summary_storytelling",
+        "retold_content",
+        "image_filename",
+    )
+}
+
+FIELDS_QUERY = Query(
+    None,
+    description="Čárkou oddělený seznam polí, např. `title,summary_simple`. "
+                "Načtou se jen tyto sloupce (id je vždy součástí odpovědi).",
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start a ukončení workeru.
+    Schéma spravuje Alembic (`alembic upgrade head` před startem gunicornu),
+    takže tady žádné DDL ani reflexe neprobíhá a worker se nepřipojuje k DB,
+    dokud nepřijde první request.
+    """
+    yield
+    # Uzavřeme spojení v poolu, ať po workeru nezůstanou viset na serveru
+    engine.dispose()
 
-# Tento příkaz řekne Alembicu o našich modelech.
-Base.metadata.create_all(bind=engine)
 
 app = FastAPI(
     title="Article Admin API",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
+)
+
+# --- Komprese odpovědí (brotli, pro starší klienty gzip) ---
+app.add_middleware(
+    BrotliMiddleware,
+    minimum_size=COMPRESSION_MIN_SIZE,
+    gzip_fallback=True,
+    # SSE stream se nesmí bufferovat kvůli kompresi
+    excluded_handlers=[r"^/digest/stream$"],
 )
 
 # --- Nastavení CORS ---
@@ -35,12 +93,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Spany HTTP requestů (OpenTelemetry, pokud je nainstalované)
+instrument_app(app)
+
 
 @app.get("/")
 def read_root():
     return {"status": "ok", "message": "Vítej v Article Admin API!"}
 
 
+@app.get("/metrics", include_in_schema=False)
+def read_metrics():
+    """
+    Metriky pro Prometheus (pool spojení, SQL dotazy, ...).
+    """
+    payload, content_type = metrics_payload()
+    return Response(content=payload, media_type=content_type)
+
+
 # --- API Endpointy pro Články ---
 
 @app.post("/articles/", response_model=schemas.Article, tags=["Articles"])
@@ -61,46 +131,423 @@ def create_article(
     return db_article
 
 
-@app.get("/digest/", response_model=schemas.ArticleDetail, tags=["Articles"])
-def read_digest(db: Session = Depends(get_db)):
+def _etag_matches(request: Request, etag: str) -> bool:
+    """Zjistí, zda klient v If-None-Match posílá aktuální ETag."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [tag.strip() for tag in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def _parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """
+    Převede parametr fields na seznam názvů sloupců (bez duplicit, v pořadí).
+    Vrátí None, pokud klient pole neomezuje.
+    """
+    if not fields:
+        return None
+    names = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [name for name in names if name not in ARTICLE_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Neznámá pole: {', '.join(unknown)}")
+    return names
+
+
+def _project_row(row, names: List[str]) -> dict:
+    """Sestaví odpověď jen z vyžádaných sloupců."""
+    return {"id": row.id, **{name: getattr(row, name) for name in names}}
+
+
+def _article_etag(article_id: int, version: str, names: Optional[List[str]] = None) -> str:
+    if names:
+        # Bez čárek - If-None-Match je čárkami oddělený seznam ETagů
+        return f'W/"{article_id}-{version}-{"+".join(names)}"'
+    return f'W/"{article_id}-{version}"'
+
+
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+
+def _detail_response(request: Request, article: models.Article, version: str) -> Response:
+    """
+    Serializuje detail článku přes orjson a přidá ETag odvozený z verze řádku.
+    Pokud klient má aktuální verzi, vrátí 304 bez těla.
+    """
+    etag = _article_etag(article.id, version)
+    if _etag_matches(request, etag):
+        return _not_modified(etag)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    payload = schemas.ArticleDetail.model_validate(article).model_dump()
+    return ORJSONResponse(content=payload, headers=headers)
+
+
+def _latest_digests(db: Session, profile: str):
+    """Dotaz na přehledy profilu od nejnovější verze."""
+    return db.query(models.Digest).join(
+        models.UserProfile, models.UserProfile.id == models.Digest.profile_id
+    ).filter(models.UserProfile.name == profile).order_by(models.Digest.version.desc())
+
+
+def _digest_payload(digest: models.Digest, with_content: bool = True) -> dict:
+    payload = {
+        "id": digest.id,
+        "version": digest.version,
+        "title": digest.title,
+        "published_date": digest.created_at,
+    }
+    if with_content:
+        payload["content"] = digest.content
+        payload["article_ids"] = json.loads(digest.article_ids)
+    return payload
+
+
+@app.get("/digest/", response_model=schemas.DigestDetail, tags=["Digest"])
+def read_digest(request: Request, profile: str = "default", db: Session = Depends(get_db)):
     """
-    Vrátí aktuální přehled zpráv (digest).
+    Vrátí aktuální přehled zpráv (digest) pro profil.
     """
-    digest = db.query(models.Article).filter(models.Article.url == "DIGEST").first()
+    digest = _latest_digests(db, profile).first()
     if digest is None:
         raise HTTPException(status_code=404, detail="Přehled zpráv nenalezen")
-    return digest
+
+    # Verze přehledu se nepřepisují, id tedy jednoznačně určuje obsah
+    etag = f'W/"digest-{digest.id}"'
+    if _etag_matches(request, etag):
+        return _not_modified(etag)
+    return ORJSONResponse(
+        content=_digest_payload(digest),
+        headers={"ETag": etag, "Cache-Control": "no-cache"},
+    )
+
+
+@app.get("/digest/history", response_model=List[schemas.DigestSummary], tags=["Digest"])
+def read_digest_history(profile: str = "default", limit: int = 20, db: Session = Depends(get_db)):
+    """
+    Vrátí předchozí verze přehledu pro profil (bez textu).
+    """
+    digests = _latest_digests(db, profile).limit(limit).all()
+    return ORJSONResponse(content=[_digest_payload(d, with_content=False) for d in digests])
+
+
+@app.get("/digest/stream", tags=["Digest"])
+async def stream_digest(profile: str = "default"):
+    """
+    Vygeneruje nový přehled a streamuje ho jako Server-Sent Events.
+    Používá jen už uložená hodnocení článků, takže první text přijde hned,
+    jak ho LLM začne generovat. Události:
+    `data: {"text": ...}` pro každou část textu a `event: done` s id a verzí
+    uloženého přehledu.
+    """
+    # Agent tahá LangChain/numpy - importujeme ho až tady, ne při startu workeru
+    from .news_digest_agent import NewsDigestAgent
+
+    agent = await run_in_threadpool(NewsDigestAgent, SessionLocal())
+    try:
+        user_profile = await run_in_threadpool(agent.get_profile, profile)
+        if user_profile is None:
+            raise HTTPException(status_code=404, detail="Profil nenalezen")
+        selected, articles_map = await run_in_threadpool(agent.prepare_selection, user_profile, False)
+        key = agent.selection_key(selected)
+        cached = await run_in_threadpool(agent.db.get, models.DigestGeneration, key)
+    except BaseException:
+        agent.close()
+        raise
+
+    def sse(data: dict, event: Optional[str] = None) -> str:
+        prefix = f"event: {event}\n" if event else ""
+        return f"{prefix}data: {orjson.dumps(data).decode()}\n\n"
+
+    async def events():
+        try:
+            if not selected:
+                yield sse({"detail": "Žádné relevantní články"}, event="error")
+                return
+
+            if cached is not None:
+                generation = cached
+                yield sse({"text": generation.content})
+            else:
+                parts = []
+                async for text_part in agent.astream_digest(selected, articles_map):
+                    parts.append(text_part)
+                    yield sse({"text": text_part})
+                generation = await run_in_threadpool(agent.store_generation, selected, "".join(parts))
+
+            digest = await run_in_threadpool(agent.save_digest, user_profile, generation)
+            yield sse({"id": digest.id, "version": digest.version}, event="done")
+        finally:
+            agent.close()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.get("/articles/", response_model=List[schemas.Article], tags=["Articles"])
-def read_articles(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_articles(
+    skip: int = 0,
+    limit: int = 100,
+    fields: Optional[str] = FIELDS_QUERY,
+    country: Optional[str] = Query(None, description="Jen články týkající se dané země"),
+    person: Optional[str] = Query(None, description="Jen články zmiňující danou osobu"),
+    db: Session = Depends(get_db)
+):
+    """
+    Vrátí seznam článků.
+    S parametrem fields vrátí jen vyžádaná pole (např. titulek a souhrn pro karty).
+    Parametry country a person filtrují podle kategorizace (přesná shoda hodnoty).
+    """
+    names = _parse_fields(fields)
+    query = db.query(models.Article)
+
+    # @> na JSONB používá GIN index ix_articles_categories
+    if country:
+        query = query.filter(models.Article.categories.contains({"countries": [country]}))
+    if person:
+        query = query.filter(models.Article.categories.contains({"people": [person]}))
+
+    if names is None:
+        # Seznam potřebuje jen pole schemas.Article, obsah ani embedding nenačítáme
+        query = query.options(load_only(
+            models.Article.id,
+            models.Article.title,
+            models.Article.url,
+            models.Article.categories,
+        ))
+        return query.order_by(models.Article.id).offset(skip).limit(limit).all()
+
+    columns = [models.Article.id, *(ARTICLE_FIELDS[name] for name in names)]
+    rows = query.with_entities(*columns).order_by(models.Article.id).offset(skip).limit(limit).all()
+    return ORJSONResponse(content=[_project_row(row, names) for row in rows])
+
+
+def _search_tsquery(q: str) -> Optional[str]:
+    """
+    Převede dotaz uživatele na tsquery: všechna slova musí být v článku,
+    každé jako prefix. Čeština nemá v Postgresu stemmer, takže "ukrajin"
+    najde "Ukrajina" i "Ukrajině". Do dotazu jdou jen písmena a číslice.
+    """
+    words = re.findall(r"\w+", q.lower())[:10]
+    if not words:
+        return None
+    return " & ".join(f"{word}:*" for word in words)
+
+
+def _encode_cursor(rank: float, article_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{rank!r}:{article_id}".encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[float, int]:
+    try:
+        rank, article_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+        return float(rank), int(article_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Neplatný kurzor")
+
+
+@app.get("/articles/search", response_model=schemas.ArticleSearchResponse, tags=["Articles"])
+def search_articles(
+    q: str = Query(..., min_length=2, description="Hledaný text (titulek, souhrn, obsah)"),
+    limit: int = Query(20, ge=1, le=50),
+    cursor: Optional[str] = Query(None, description="next_cursor z předchozí stránky"),
+    db: Session = Depends(get_db)
+):
     """
-    Vrátí seznam článků (bez digestu).
+    Fulltextové hledání v článcích (bez ohledu na diakritiku).
+    Výsledky jsou seřazené podle relevance (shoda v titulku > souhrnu > obsahu)
+    a obsahují úryvek se zvýrazněnými shodami (<mark>).
+    Další stránku vrátí parametr cursor = next_cursor (keyset, ne offset).
     """
-    articles = db.query(models.Article).filter(models.Article.url != "DIGEST").offset(skip).limit(limit).all()
-    return articles
+    query = _search_tsquery(q)
+    if query is None:
+        return ORJSONResponse(content={"results": [], "next_cursor": None})
+
+    params = {"query": query, "limit": limit}
+    after = ""
+    if cursor:
+        params["after_rank"], params["after_id"] = _decode_cursor(cursor)
+        after = "WHERE (hit.rank, hit.id) < (CAST(:after_rank AS real), :after_id)"
+
+    # Úryvek (ts_headline) je drahý, proto se počítá až pro jednu stránku.
+    # Normalizace 1 tlumí výhodu dlouhých článků.
+    sql = text(f"""
+        WITH q AS (SELECT to_tsquery('cs_unaccent', :query) AS query)
+        SELECT page.id, page.title, page.url, page.published_date, page.rank,
+               ts_headline(
+                   'cs_unaccent',
+                   coalesce(page.summary_simple, left(page.content, 5000), page.title),
+                   q.query,
+                   'StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=30, MinWords=10'
+               ) AS headline
+        FROM (
+            SELECT hit.*
+            FROM (
+                SELECT a.id, a.title, a.url, a.published_date, a.summary_simple, a.content,
+                       ts_rank_cd(a.search_vector, q.query, 1) AS rank
+                FROM articles AS a, q
+                WHERE a.search_vector @@ q.query
+            ) AS hit
+            {after}
+            ORDER BY hit.rank DESC, hit.id DESC
+            LIMIT :limit
+        ) AS page, q
+        ORDER BY page.rank DESC, page.id DESC
+    """)
+
+    results = [
+        {
+            "id": row.id,
+            "title": row.title,
+            "url": row.url,
+            "published_date": row.published_date,
+            "rank": row.rank,
+            "headline": row.headline,
+        }
+        for row in db.execute(sql, params)
+    ]
+    next_cursor = None
+    if len(results) == limit:
+        next_cursor = _encode_cursor(results[-1]["rank"], results[-1]["id"])
+    return ORJSONResponse(content={"results": results, "next_cursor": next_cursor})
 
 
 @app.get("/articles/{article_id}", response_model=schemas.ArticleDetail, tags=["Articles"])
-def read_article(article_id: int, db: Session = Depends(get_db)):
+def read_article(
+    article_id: int,
+    request: Request,
+    fields: Optional[str] = FIELDS_QUERY,
+    db: Session = Depends(get_db)
+):
     """
     Vrátí detail článku včetně obsahu.
+    S parametrem fields načte z DB a vrátí jen vyžádané sloupce.
+    Podporuje podmíněné dotazy (If-None-Match -> 304).
     """
-    article = db.query(models.Article).filter(models.Article.id == article_id).first()
-    if article is None:
+    names = _parse_fields(fields)
+
+    # Nejdřív levně ověříme verzi řádku, ať při 304 nenačítáme celý obsah
+    version = db.query(ROW_VERSION).filter(models.Article.id == article_id).scalar()
+    if version is None:
+        raise HTTPException(status_code=404, detail="Článek nenalezen")
+    etag = _article_etag(article_id, version, names)
+    if _etag_matches(request, etag):
+        return _not_modified(etag)
+
+    if names is None:
+        row = db.query(models.Article, ROW_VERSION).filter(models.Article.id == article_id).first()
+        if row is None:
+            raise HTTPException(status_code=404, detail="Článek nenalezen")
+        return _detail_response(request, *row)
+
+    columns = [models.Article.id, ROW_VERSION, *(ARTICLE_FIELDS[name] for name in names)]
+    row = db.query(*columns).filter(models.Article.id == article_id).first()
+    if row is None:
         raise HTTPException(status_code=404, detail="Článek nenalezen")
-    return article
+    return ORJSONResponse(
+        content=_project_row(row, names),
+        headers={"ETag": _article_etag(article_id, row[1], names), "Cache-Control": "no-cache"},
+    )
+
+
+def _fetch_related(db: Session, article_ids: List[int], limit: int) -> Dict[int, List[schemas.Article]]:
+    """
+    Najde podobné články pro více zdrojových článků jedním dotazem.
+    Vrací mapu id zdrojového článku -> seznam podobných (seřazených podle podobnosti).
+    Články bez embeddingu aktivního modelu v mapě nejsou.
+    """
+    # LATERAL join = pro každý zdrojový článek samostatný ANN dotaz přes index,
+    # ale jen jeden round trip do DB. Porovnávají se jen vektory aktivního
+    # modelu; kandidáty z (kvantovaného) indexu přesně seřadí plné vektory.
+    provider = get_embedding_provider()
+    nearest = nearest_sql(provider.dimensions, "src.embedding", "a.id, a.title, a.url, a.categories", "a.id != src.id")
+    query = text(f"""
+        SELECT src.id AS source_id, rel.id, rel.title, rel.url, rel.categories
+        FROM articles AS src
+        CROSS JOIN LATERAL ({nearest}
+        ) AS rel
+        WHERE src.id = ANY(:ids)
+        AND src.embedding_model = :model
+        ORDER BY src.id, rel.distance
+    """)
+
+    related: Dict[int, List[schemas.Article]] = {}
+    candidates = candidate_count(limit)
+    set_search_breadth(db, candidates)
+    params = {"ids": list(article_ids), "limit": limit, "candidates": candidates, "model": provider.model_id}
+    for row in db.execute(query, params):
+        related.setdefault(row.source_id, []).append(schemas.Article(
+            id=row.id,
+            title=row.title,
+            url=row.url,
+            categories=row.categories
+        ))
+    return related
+
+
+@app.post("/articles/batch", response_model=schemas.ArticleBatchResponse, tags=["Articles"])
+def read_articles_batch(batch: schemas.ArticleBatchRequest, db: Session = Depends(get_db)):
+    """
+    Vrátí více článků najednou (v pořadí podle požadavku).
+    Volitelně omezí pole (fields) a přidá ke každému článku podobné články
+    (related = počet), takže stránka s kartami potřebuje jediný request.
+    """
+    names = _parse_fields(",".join(batch.fields)) if batch.fields else list(ARTICLE_FIELDS)
+    ids = list(dict.fromkeys(batch.ids))
+
+    columns = [models.Article.id, *(ARTICLE_FIELDS[name] for name in names)]
+    rows = db.query(*columns).filter(
+        models.Article.id == any_(bindparam("ids", ids, type_=ARRAY(Integer)))
+    ).all()
+    by_id = {row.id: _project_row(row, names) for row in rows}
+
+    if batch.related:
+        related = _fetch_related(db, list(by_id), batch.related)
+        for article_id, item in by_id.items():
+            item["related"] = [r.model_dump() for r in related.get(article_id, [])]
+
+    return ORJSONResponse(content={
+        "articles": [by_id[article_id] for article_id in ids if article_id in by_id],
+        "missing": [article_id for article_id in ids if article_id not in by_id],
+    })
 
 
 @app.get("/images/{filename}", tags=["Images"])
-def get_image(filename: str):
+def get_image(
+    filename: str,
+    request: Request,
+    w: Optional[int] = Query(None, ge=1, le=4096, description="Požadovaná šířka v px (vybere se nejbližší větší varianta)"),
+):
     """
     Vrátí obrázek článku.
+    S parametrem w vrátí zmenšenou variantu a podle hlavičky Accept
+    zvolí AVIF nebo WebP. Obrázky pod hashem obsahu se cachují natrvalo.
     """
-    image_path = Path("backend/static/images") / filename
-    if not image_path.exists():
+    accept = request.headers.get("accept", "")
+    for candidate in images.variant_candidates(filename, w, accept):
+        image_path = images.resolve_image(candidate)
+        if image_path is not None:
+            break
+    else:
         raise HTTPException(status_code=404, detail="Obrázek nenalezen")
-    return FileResponse(image_path)
+
+    headers = {"Vary": "Accept"} if w else {}
+    if images.is_hashed(candidate):
+        # Obsah souboru se pod tímto jménem nikdy nezmění
+        etag = f'"{candidate}"'
+        headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    else:
+        stat = image_path.stat()
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        headers["Cache-Control"] = "public, max-age=3600"
+    headers["ETag"] = etag
+
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(image_path, headers=headers)
 
 
 @app.get("/articles/{article_id}/related", response_model=List[schemas.Article], tags=["Articles"])
@@ -108,49 +555,26 @@ def get_related_articles(article_id: int, limit: int = 5, db: Session = Depends(
     """
     Vrátí podobné články pomocí RAG (vektorové podobnosti).
     """
-    # Načteme článek
-    article = db.query(models.Article).filter(models.Article.id == article_id).first()
-    if article is None:
+    # Ověříme, že článek existuje (embedding ani obsah nenačítáme)
+    exists = db.query(models.Article.id).filter(models.Article.id == article_id).first()
+    if exists is None:
         raise HTTPException(status_code=404, detail="Článek nenalezen")
-    
-    # Pokud článek nemá embedding, nemůžeme najít podobné
-    if article.embedding is None:
-        return []
-    
-    # Konvertujeme embedding na list (pokud je to numpy array)
-    embedding_list = article.embedding
-    if hasattr(embedding_list, 'tolist'):
-        embedding_list = embedding_list.tolist()
-    
-    # Najdeme podobné články pomocí cosine similarity
-    # Používáme pgvector operátor <=> pro cosine distance
-    query = text("""
-        SELECT id, title, url, categories
-        FROM articles
-        WHERE id != :article_id 
-        AND embedding IS NOT NULL
-        AND url != 'DIGEST'
-        ORDER BY embedding <=> CAST(:embedding AS vector)
-        LIMIT :limit
-    """)
-    
-    result = db.execute(
-        query,
-        {
-            "article_id": article_id,
-            "embedding": embedding_list,
-            "limit": limit
-        }
-    )
-    
-    # Převedeme výsledky na Article objekty
-    related = []
-    for row in result:
-        related.append(schemas.Article(
-            id=row.id,
-            title=row.title,
-            url=row.url,
-            categories=row.categories
-        ))
-    
-    return related
\ No newline at end of file
+
+    # Článek bez embeddingu v mapě prostě nebude -> prázdný seznam
+    return _fetch_related(db, [article_id], limit).get(article_id, [])
+
+
+@app.get("/facets", response_model=schemas.Facets, tags=["Articles"])
+def read_facets(
+    days: int = Query(7, ge=1, le=365, description="Časové okno ve dnech (včetně dneška)"),
+    limit: int = Query(20, ge=1, le=200, description="Maximální počet hodnot pro každý druh"),
+    db: Session = Depends(get_db)
+):
+    """
+    Vrátí počty článků podle zemí a osob za posledních N dní,
+    např. pro filtr "Ukrajina (42)". Hodnoty odpovídají parametrům
+    country= a person= v GET /articles/.
+    """
+    since = date.today() - timedelta(days=days - 1)
+    counts = facet_counts(db, since, limit)
+    return ORJSONResponse(content={"since": since.isoformat(), **counts})
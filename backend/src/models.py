@@ -1,16 +1,25 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy import DDL, Column, Computed, Date, Integer, String, Text, DateTime, Boolean, ForeignKey, Index, UniqueConstraint, event, func
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from sqlalchemy.orm import deferred
 from pgvector.sqlalchemy import Vector
 from .database import Base  # Importujeme Base z našeho database.py
 
 class Article(Base):
     __tablename__ = "articles"  # Název tabulky v databázi
+    # GIN index pro filtry categories @> '{"countries": [...]}' a pro fulltext
+    __table_args__ = (
+        Index("ix_articles_categories", "categories", postgresql_using="gin",
+              postgresql_ops={"categories": "jsonb_path_ops"}),
+        Index("ix_articles_search_vector", "search_vector", postgresql_using="gin"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(500), index=True)
     url = Column(String(1000), unique=True, index=True)
-    categories = Column(Text, nullable=True)  # JSON string s kategorizací (země, osoby)
+    categories = Column(JSONB, nullable=True)  # Kategorizace (co se stalo, dopad, země, osoby)
     content = Column(Text, nullable=True)  # Obsah článku jako markdown
-    published_date = Column(DateTime, nullable=True)  # Datum vydání článku
+    published_date = Column(DateTime, nullable=True, index=True)  # Datum vydání článku
+    created_at = Column(DateTime, nullable=True, index=True, server_default=func.now())  # Čas vložení do DB
     
     # Sumarizace
     summary_simple = Column(Text, nullable=True)  # Jednoduchá sumarizace
@@ -19,5 +28,201 @@ class Article(Base):
     retold_content = Column(Text, nullable=True)  # Převyprávěný obsah jako příběh
     image_filename = Column(String(255), nullable=True)  # Název vygenerovaného obrázku
     
-    # Vektorová reprezentace pro RAG (Gemini embedding-001 má 768 dimenzí)
-    embedding = Column(Vector(768), nullable=True)
\ No newline at end of file
+    # Fulltext (titulek > souhrn > obsah), počítá ho Postgres při každém zápisu.
+    # Deferred - při běžném načtení článku ho nepotřebujeme.
+    search_vector = deferred(Column(TSVECTOR, Computed(
+        "setweight(to_tsvector('cs_unaccent'::regconfig, coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('cs_unaccent'::regconfig, coalesce(summary_simple, '')), 'B') || "
+        "setweight(to_tsvector('cs_unaccent'::regconfig, coalesce(content, '')), 'C')",
+        persisted=True,
+    )))
+
+    # Vektorová reprezentace pro RAG. Dimenze závisí na modelu (Gemini 768,
+    # lokální MiniLM 384), proto bez pevné dimenze; porovnávají se jen vektory
+    # stejného embedding_model (index pro každý model, viz embeddings.py).
+    # Index drží podle EMBEDDING_INDEX plné, halfvec nebo binární kopie;
+    # plné vektory tady slouží k přesnému seřazení kandidátů z indexu.
+    embedding = Column(Vector(), nullable=True)
+    embedding_model = Column(String(100), nullable=True)  # Např. gemini:text-embedding-004
+
+
+class ArticleScore(Base):
+    """
+    Profilově nezávislé vlastnosti článku (zpravodajské hodnoty, téma, země, osoba).
+    Počítají se jednou na článek; řazení pro jednotlivé profily už běží lokálně.
+    """
+    __tablename__ = "article_scores"
+
+    article_id = Column(Integer, ForeignKey("articles.id", ondelete="CASCADE"), primary_key=True)
+    features_version = Column(String(64), primary_key=True)  # Hash promptu a zpravodajských hodnot
+
+    news_value_score = Column(Integer, nullable=True)  # Skóre 1-10
+    news_values = Column(Text, nullable=True)  # JSON seznam zpravodajských hodnot
+    reasoning = Column(Text, nullable=True)
+    country = Column(String(100), nullable=True)
+    person = Column(String(200), nullable=True)
+    topic = Column(String(100), nullable=True)
+    scored_at = Column(DateTime, nullable=True, server_default=func.now())
+
+
+class DigestGeneration(Base):
+    """Vygenerovaný text přehledu, cachovaný podle vybrané sady článků."""
+    __tablename__ = "digest_generations"
+
+    selection_key = Column(String(64), primary_key=True)  # Hash promptu a seřazených id článků
+    article_ids = Column(Text, nullable=False)  # JSON seznam id článků v pořadí
+    content = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=True, server_default=func.now())
+
+
+class UserProfile(Base):
+    """Profil odběratele přehledu."""
+    __tablename__ = "user_profiles"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(100), unique=True, nullable=False)
+    description = Column(Text, nullable=True)  # Popis zájmů volným textem
+    preferences = Column(Text, nullable=True)  # JSON váhy témat, zemí a osob
+    is_active = Column(Boolean, nullable=False, server_default="true")
+
+
+class Digest(Base):
+    """Jedna verze přehledu zpráv pro profil (historie se nepřepisuje)."""
+    __tablename__ = "digests"
+    __table_args__ = (UniqueConstraint("profile_id", "version", name="uq_digests_profile_version"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    profile_id = Column(Integer, ForeignKey("user_profiles.id", ondelete="CASCADE"), nullable=False)
+    version = Column(Integer, nullable=False)  # Pořadové číslo přehledu v rámci profilu
+    title = Column(String(500), nullable=True)
+    content = Column(Text, nullable=False)
+    article_ids = Column(Text, nullable=False)  # JSON seznam id vybraných článků
+    selection_key = Column(String(64), ForeignKey("digest_generations.selection_key"), nullable=True)
+    created_at = Column(DateTime, nullable=True, server_default=func.now())
+
+
+class ArticleFacet(Base):
+    """
+    Předpočítané počty článků podle země / osoby a dne.
+    Tabulku udržuje trigger na articles, dotaz na facety tak nečte články.
+    """
+    __tablename__ = "article_facets"
+
+    day = Column(Date, primary_key=True)  # Den vydání (nebo vložení) článku
+    kind = Column(String(16), primary_key=True)  # "country" / "person"
+    value = Column(String(200), primary_key=True)
+    count = Column(Integer, nullable=False, server_default="0")
+
+
+class LLMQuotaWindow(Base):
+    """
+    Spotřeba kvóty LLM v pevném časovém okně - sdílená všemi procesy
+    (crawler, sumarizace, embeddingy, agent, API), viz llm_gateway.
+    """
+    __tablename__ = "llm_quota_windows"
+
+    name = Column(String(50), primary_key=True)  # Kvóta (llm / embedding)
+    window_start = Column(DateTime(timezone=True), primary_key=True)
+    requests = Column(Integer, nullable=False, server_default="0")
+    tokens = Column(Integer, nullable=False, server_default="0")
+
+
+class BatchRun(Base):
+    """Běh dávkového skriptu s kurzorem pro navázání po pádu, viz run_ledger."""
+    __tablename__ = "batch_runs"
+
+    id = Column(Integer, primary_key=True)
+    job = Column(String(50), nullable=False, index=True)  # content / summary / embedding
+    status = Column(String(20), nullable=False)  # running / interrupted / failed / completed
+    cursor = Column(Integer, nullable=False, server_default="0")  # Id posledního zpracovaného článku
+    stats = Column(JSONB, nullable=True)
+    started_at = Column(DateTime, nullable=True, server_default=func.now())
+    updated_at = Column(DateTime, nullable=True, server_default=func.now())
+    finished_at = Column(DateTime, nullable=True)
+
+
+class BatchRunItem(Base):
+    """
+    Výsledek položky dávkového skriptu. Selhané položky čekají do
+    next_attempt_at, po vyčerpání pokusů jsou dead (dead letter).
+    """
+    __tablename__ = "batch_run_items"
+
+    job = Column(String(50), primary_key=True)
+    item_id = Column(Integer, primary_key=True)  # Id článku
+    run_id = Column(Integer, ForeignKey("batch_runs.id", ondelete="SET NULL"), nullable=True)
+    status = Column(String(20), nullable=False)  # done / failed / dead
+    attempts = Column(Integer, nullable=False, server_default="0")  # Neúspěchy v řadě
+    last_error = Column(Text, nullable=True)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), nullable=True, server_default=func.now())
+
+
+# Trigger, který při změně článku přičte/odečte jeho země a osoby.
+# Stejné DDL je v migraci; tady ho potřebuje create_all (benchmarky).
+# Funkce do article_facets zapisuje až za běhu, takže nezáleží na tom,
+# která z tabulek vznikne dřív.
+FACET_TRIGGER_DDL = """
+CREATE OR REPLACE FUNCTION article_facets_apply(p_cats jsonb, p_day date, p_delta integer)
+RETURNS void AS $$
+BEGIN
+    IF p_cats IS NULL OR p_day IS NULL THEN
+        RETURN;
+    END IF;
+    INSERT INTO article_facets (day, kind, value, count)
+    SELECT DISTINCT p_day, k.kind, left(v.value, 200), p_delta
+    FROM (VALUES ('country', 'countries'), ('person', 'people')) AS k(kind, key),
+         jsonb_array_elements_text(
+             CASE WHEN jsonb_typeof(p_cats -> k.key) = 'array' THEN p_cats -> k.key ELSE '[]'::jsonb END
+         ) AS v(value)
+    WHERE v.value <> ''
+    ON CONFLICT (day, kind, value) DO UPDATE SET count = article_facets.count + EXCLUDED.count;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION articles_facets_trigger()
+RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM article_facets_apply(OLD.categories, COALESCE(OLD.published_date, OLD.created_at)::date, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM article_facets_apply(NEW.categories, COALESCE(NEW.published_date, NEW.created_at)::date, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER articles_facets_insert_delete
+AFTER INSERT OR DELETE ON articles
+FOR EACH ROW EXECUTE FUNCTION articles_facets_trigger();
+
+CREATE TRIGGER articles_facets_update
+AFTER UPDATE OF categories, published_date, created_at ON articles
+FOR EACH ROW
+WHEN (OLD.categories IS DISTINCT FROM NEW.categories
+      OR COALESCE(OLD.published_date, OLD.created_at)::date
+         IS DISTINCT FROM COALESCE(NEW.published_date, NEW.created_at)::date)
+EXECUTE FUNCTION articles_facets_trigger();
+"""
+
+# Textová konfigurace pro search_vector musí existovat před vytvořením articles
+# (v migraci se zakládá zvlášť)
+SEARCH_CONFIG_DDL = """
+CREATE EXTENSION IF NOT EXISTS unaccent SCHEMA public;
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_ts_config
+        WHERE cfgname = 'cs_unaccent' AND cfgnamespace = current_schema()::regnamespace
+    ) THEN
+        CREATE TEXT SEARCH CONFIGURATION cs_unaccent (COPY = simple);
+        ALTER TEXT SEARCH CONFIGURATION cs_unaccent
+            ALTER MAPPING FOR hword, hword_part, word WITH unaccent, simple;
+    END IF;
+END;
+$$;
+"""
+
+event.listen(Article.__table__, "before_create", DDL(SEARCH_CONFIG_DDL))
+event.listen(Article.__table__, "after_create", DDL(FACET_TRIGGER_DDL))
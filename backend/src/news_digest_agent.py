@@ -1,32 +1,79 @@
 """
 Agent pro generování personalizovaného přehledu zpráv.
 
-Agent prochází databázi článků, analyzuje jejich důležitost podle profilu uživatele
-a zpravodajských hodnot, a vytváří stručný přehled nejdůležitějších událostí.
+Agent prochází databázi článků, jednou pro každý článek určí jeho zpravodajské
+hodnoty, téma, zemi a osobu (nezávisle na profilu) a pak pro každý profil
+uživatele lokálně seřadí články a vytvoří stručný přehled nejdůležitějších událostí.
+Text přehledu se cachuje podle vybrané sady článků, takže profily se stejným
+výběrem sdílí jedno generování.
 """
 
 import os
 import json
-from typing import List, Dict, Tuple
-from datetime import datetime
+import asyncio
+import hashlib
+import math
+from typing import List, Dict, Optional, Tuple
+from datetime import datetime, timedelta
 from dotenv import load_dotenv
+from sqlalchemy import and_, func, or_
 from sqlalchemy.orm import Session
-from langchain_google_genai import ChatGoogleGenerativeAI
 from pydantic import BaseModel, Field
 
-from .database import SessionLocal, engine
-from .models import Article, Base
+from .database import WorkerSessionLocal
+from .embeddings import get_embedding_provider
+from .instrumentation import push_metrics, span, track_llm, track_stage
+from .llm_gateway import Priority, get_gateway
+from .models import Article, ArticleScore, Digest, DigestGeneration, UserProfile
+from .providers import GEMINI_MODEL, get_chat_model
+from .story_clustering import StoryCluster, cluster_articles
+from .tokens import compact_json, estimate_tokens
 
 # Načteme .env
 load_dotenv()
 
-# Profil uživatele
+# Časové okno (v hodinách), ze kterého se berou články do přehledu
+DIGEST_WINDOW_HOURS = int(os.getenv("DIGEST_WINDOW_HOURS", "24"))
+
+# Výběr kandidátů - max. počet článků pro LLM, poločas čerstvosti a váhy zdrojů
+DIGEST_MAX_CANDIDATES = int(os.getenv("DIGEST_MAX_CANDIDATES", "60"))
+RECENCY_HALF_LIFE_HOURS = float(os.getenv("RECENCY_HALF_LIFE_HOURS", "8"))
+# Formát: "novinky.cz=1.0,ceskenoviny.cz=1.2"
+SOURCE_WEIGHTS = {
+    domain.strip(): float(weight)
+    for domain, weight in (
+        item.split("=") for item in os.getenv("SOURCE_WEIGHTS", "").split(",") if "=" in item
+    )
+}
+
+# Hodnocení článků - souběžnost, velikost dávky (v tokenech) a počet opakování
+SCORING_CONCURRENCY = int(os.getenv("SCORING_CONCURRENCY", "4"))
+SCORING_BATCH_TOKENS = int(os.getenv("SCORING_BATCH_TOKENS", "4000"))
+SCORING_MAX_BATCH_SIZE = int(os.getenv("SCORING_MAX_BATCH_SIZE", "40"))
+SCORING_MAX_RETRIES = int(os.getenv("SCORING_MAX_RETRIES", "2"))
+
+# Výchozí profil uživatele (použije se, pokud v DB žádný aktivní profil není)
 USER_PROFILE = """
 Uživatel je čech, žije v Praze.
 Zajímá ho politika, technologie, ekonomie a veřejné dění.
 Rád by měl přehled o tom, co hýbe společností.
 """
 
+# Váhy témat, zemí a osob výchozího profilu (násobí skóre zpravodajské hodnoty)
+USER_PREFERENCES = {
+    "topics": {"politika": 1.2, "technologie": 1.2, "ekonomika": 1.2, "bezpečnost": 1.0, "kultura": 0.8},
+    "countries": {"Česko": 1.2},
+    "people": {},
+    "default_weight": 0.8,
+}
+
+# Převod skóre pro profil na kategorii relevance
+RELEVANCE_THRESHOLDS = [
+    (8, "Nezbytné"),
+    (6, "Velmi zajímavé"),
+    (4, "Málo zajímavé"),
+]
+
 # Zpravodajské hodnoty (podle https://cs.wikipedia.org/wiki/Zpravodajsk%C3%A9_hodnoty)
 NEWS_VALUES = """
 Zpravodajské hodnoty:
@@ -40,11 +87,65 @@ Zpravodajské hodnoty:
 8. Relevance - důležitost pro společnost
 """
 
+# Prompt pro profilově nezávislé hodnocení článků
+SCORING_PROMPT = """You are an expert in news analysis. Your task is to evaluate articles according to news values.
+
+{news_values}
+
+For each article determine:
+1. News value score: 1-10 (overall importance score)
+2. Which news values are present
+3. Main country (e.g., Česko, Rusko, USA, Německo)
+4. Main person (if any, otherwise empty string)
+5. Main topic (politika, ekonomika, technologie, kultura, bezpečnost)
+6. Brief reasoning in Czech
+
+Return one evaluation for every article, with article_id equal to the article's id.
+
+Articles to evaluate:
+{articles}"""
+
+# Prompt pro text přehledu. Neobsahuje profil - ten se promítá do výběru a pořadí
+# článků, takže stejný výběr dává stejný text a dá se sdílet mezi profily.
+DIGEST_PROMPT = """Jsi zkušený novinář. Tvým úkolem je napsat stručný přehled nejdůležitějších zpráv pro čtenáře z Česka.
 
-class ArticleRelevance(BaseModel):
-    """Model pro hodnocení relevance článku."""
+KRITICKÁ PRAVIDLA SPOJOVÁNÍ:
+Priority pro spojování zpráv do jedné věty:
+1. NEJVYŠŠÍ: Týkají se stejné osoby (person)
+2. VYSOKÁ: Týkají se stejné země (kromě "Česko" - české zprávy nespojuj)
+3. STŘEDNÍ: Mají podobný nebo opačný dopad
+4. NÍZKÁ: Jsou ze stejného tématu (topic)
+
+STRUKTURA:
+- Délka: 6-8 vět (max 600 znaků)
+- Začni hodnotícím komentářem, pak vyjmenuj zprávy jako argumenty
+- Příklad: "Rusko pokračuje v represi - perzekuce intelektuálů se stupňuje a Červený kříž spolupracuje s Kremlem."
+- Zprávy jsou seřazené podle důležitosti pro čtenáře, drž toto pořadí
+- Každá položka je už jeden sloučený příběh; "sources" = kolik článků o něm vyšlo (víc zdrojů = větší váha)
+
+STYL:
+- Kratší fráze: "stalo se" místo "došlo k", "v" místo "v oblasti"
+- Plynulý text, ne seznam
+- Tón: rychlý, výstižný, čtivý
+
+Články k zpracování (seřazené podle důležitosti):
+{articles}
+
+Napiš přehled v češtině:"""
+
+
+def _prompt_version(*parts: str) -> str:
+    return hashlib.sha256("".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+# Verze hodnocení - při změně promptu nebo zpravodajských hodnot se články hodnotí znovu
+FEATURES_VERSION = _prompt_version(SCORING_PROMPT, NEWS_VALUES)
+DIGEST_PROMPT_VERSION = _prompt_version(DIGEST_PROMPT)
+
+
+class ArticleFeatures(BaseModel):
+    """Profilově nezávislé hodnocení článku."""
     article_id: int = Field(description="ID článku")
-    relevance: str = Field(description="Kategorie: Nezajímavé, Málo zajímavé, Velmi zajímavé, Nezbytné")
     news_value_score: int = Field(description="Číselné skóre zpravodajské hodnoty 1-10")
     news_values: List[str] = Field(description="Seznam přítomných zpravodajských hodnot")
     reasoning: str = Field(description="Stručné zdůvodnění hodnocení")
@@ -53,22 +154,27 @@ class ArticleRelevance(BaseModel):
     topic: str = Field(description="Hlavní téma (politika, ekonomika, technologie, kultura, bezpečnost)")
 
 
-class ArticleRelevanceList(BaseModel):
+class ArticleFeaturesList(BaseModel):
     """Seznam hodnocení článků."""
-    articles: List[ArticleRelevance]
+    articles: List[ArticleFeatures]
+
+
+class ArticleRelevance(ArticleFeatures):
+    """Relevance článku pro konkrétní profil (počítá se lokálně z ArticleFeatures)."""
+    relevance: str = Field(description="Kategorie: Nezajímavé, Málo zajímavé, Velmi zajímavé, Nezbytné")
+    profile_score: float = Field(description="Skóre zpravodajské hodnoty vážené preferencemi profilu")
 
 
 class NewsDigestAgent:
     """Agent pro generování personalizovaného přehledu zpráv."""
     
-    def __init__(self):
-        """Inicializace agenta."""
-        self.llm = ChatGoogleGenerativeAI(
-            model=os.getenv("GEMINI_MODEL", "gemini-2.0-flash-lite"),
-            google_api_key=os.getenv("GOOGLE_API_KEY"),
-            temperature=0.3
-        )
-        self.db: Session = SessionLocal()
+    def __init__(self, db: Optional[Session] = None):
+        """Inicializace agenta (volitelně s existující DB session)."""
+        self.llm = get_chat_model(temperature=0.3)
+        self.scorer = self.llm.with_structured_output(ArticleFeaturesList, include_raw=True)
+        self.db: Session = db or WorkerSessionLocal()
+        # Příběhy z posledního výběru kandidátů (id reprezentanta -> příběh)
+        self.clusters: Dict[int, StoryCluster] = {}
         self.log("Agent inicializován")
     
     def log(self, message: str, verbose: bool = False):
@@ -83,107 +189,303 @@ class NewsDigestAgent:
         """Uzavření databázového spojení."""
         self.db.close()
     
-    def fetch_articles_with_summaries(self) -> List[Article]:
-        """Načte všechny články se souhrny z databáze."""
-        articles = self.db.query(Article).filter(
-            Article.summary_simple.isnot(None)
+    def candidate_window_filter(self, since: datetime):
+        """
+        Podmínka časového okna. Zapsaná jako OR dvou rozsahů místo COALESCE,
+        aby Postgres mohl použít indexy na published_date i created_at.
+        """
+        return or_(
+            Article.published_date >= since,
+            and_(Article.published_date.is_(None), Article.created_at >= since)
+        )
+
+    def prescore(self, row, now: datetime) -> float:
+        """
+        Levné lokální předběžné skóre článku (bez LLM):
+        čerstvost (exponenciální pokles) * váha zdroje.
+        """
+        timestamp = row.published_date or row.created_at or now
+        age_hours = max((now - timestamp).total_seconds() / 3600, 0)
+        recency = 0.5 ** (age_hours / RECENCY_HALF_LIFE_HOURS)
+        source_weight = next(
+            (weight for domain, weight in SOURCE_WEIGHTS.items() if domain in row.url),
+            1.0
+        )
+        return recency * source_weight
+
+    def select_candidates(self) -> List[Article]:
+        """
+        Vybere kandidáty pro přehled: články se souhrnem z časového okna
+        DIGEST_WINDOW_HOURS, seskupené do příběhů podle
+        embeddingů. Příběhy se seřadí podle předběžného skóre reprezentanta
+        a velikosti příběhu; do LLM jde jen reprezentant každého z prvních
+        DIGEST_MAX_CANDIDATES příběhů.
+        """
+        now = datetime.now()
+        since = now - timedelta(hours=DIGEST_WINDOW_HOURS)
+
+        # Nejdřív jen lehké sloupce + embedding - obsah ani souhrny nenačítáme
+        rows = self.db.query(
+            Article.id, Article.url, Article.published_date, Article.created_at,
+            Article.embedding, Article.embedding_model
+        ).filter(
+            Article.summary_simple.isnot(None),
+            self.candidate_window_filter(since)
         ).all()
-        self.log(f"📰 Načteno {len(articles)} článků")
+
+        embedding_model = get_embedding_provider().model_id
+        scores = {row.id: self.prescore(row, now) for row in rows}
+        rows = sorted(rows, key=lambda row: scores[row.id], reverse=True)
+        clusters = cluster_articles(
+            [row.id for row in rows],
+            # Vektory jiného modelu nejsou srovnatelné - článek je pak samostatný příběh
+            [row.embedding if row.embedding_model == embedding_model else None for row in rows],
+            [row.published_date or row.created_at or now for row in rows],
+        )
+        clusters.sort(
+            key=lambda c: scores[c.representative_id] * (1 + math.log(c.size)),
+            reverse=True
+        )
+        self.clusters = {c.representative_id: c for c in clusters[:DIGEST_MAX_CANDIDATES]}
+        top_ids = list(self.clusters)
+
+        articles = self.db.query(Article).filter(Article.id.in_(top_ids)).all() if top_ids else []
+        order = {article_id: i for i, article_id in enumerate(top_ids)}
+        articles.sort(key=lambda a: order[a.id])
+
+        self.log(
+            f"📰 Kandidátů v okně {DIGEST_WINDOW_HOURS} h: {len(rows)} článků v {len(clusters)} příbězích, "
+            f"do hodnocení jde {len(articles)}"
+        )
         return articles
 
-    
-    def categorize_articles(self, articles: List[Article]) -> List[ArticleRelevance]:
+    def load_cached_features(self, articles: List[Article]) -> Dict[int, ArticleFeatures]:
+        """Načte už spočítaná hodnocení článků pro aktuální verzi hodnocení."""
+        if not articles:
+            return {}
+        scores = self.db.query(ArticleScore).filter(
+            ArticleScore.features_version == FEATURES_VERSION,
+            ArticleScore.article_id.in_([a.id for a in articles])
+        ).all()
+        cached = {
+            score.article_id: ArticleFeatures(
+                article_id=score.article_id,
+                news_value_score=score.news_value_score or 1,
+                news_values=json.loads(score.news_values or "[]"),
+                reasoning=score.reasoning or "",
+                country=score.country or "",
+                person=score.person or "",
+                topic=score.topic or ""
+            )
+            for score in scores
+        }
+        self.log(f"💾 Z cache načteno {len(cached)} hodnocení (verze {FEATURES_VERSION})")
+        return cached
+
+    def save_features(self, features: List[ArticleFeatures]):
+        """Uloží nová hodnocení, aby se při dalším běhu nemusela počítat znovu."""
+        for item in features:
+            self.db.merge(ArticleScore(
+                article_id=item.article_id,
+                features_version=FEATURES_VERSION,
+                news_value_score=item.news_value_score,
+                news_values=json.dumps(item.news_values, ensure_ascii=False),
+                reasoning=item.reasoning,
+                country=item.country,
+                person=item.person,
+                topic=item.topic
+            ))
+        self.db.commit()
+
+    def score_features(self, articles: List[Article]) -> List[ArticleFeatures]:
         """
-        Kategorizuje články podle profilu uživatele a zpravodajských hodnot.
-        
+        Vrátí hodnocení všech článků - z cache, chybějící dopočítá přes LLM.
+        Výsledek je ve stejném pořadí jako vstupní články.
+        """
+        cached = self.load_cached_features(articles)
+        unscored = [a for a in articles if a.id not in cached]
+        fresh: Dict[int, ArticleFeatures] = {}
+        if unscored:
+            known_ids = {a.id for a in unscored}
+            fresh = {
+                item.article_id: item
+                for item in self.categorize_articles(unscored)
+                if item.article_id in known_ids
+            }
+            self.save_features(list(fresh.values()))
+        return [
+            cached.get(a.id) or fresh[a.id]
+            for a in articles
+            if a.id in cached or a.id in fresh
+        ]
+
+    def _build_batches(self, articles_data: List[Dict], token_budget: int) -> List[List[Dict]]:
+        """
+        Rozdělí články do dávek podle odhadu tokenů místo pevného počtu.
+        Krátké souhrny se tak vejdou do jedné dávky víc, dlouhé míň.
+        """
+        batches = []
+        current: List[Dict] = []
+        current_tokens = 0
+        for item in articles_data:
+            item_tokens = estimate_tokens(compact_json(item))
+            if current and (current_tokens + item_tokens > token_budget or len(current) >= SCORING_MAX_BATCH_SIZE):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(item)
+            current_tokens += item_tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    async def _score_batch(self, batch: List[Dict], semaphore: asyncio.Semaphore) -> List[ArticleFeatures]:
+        """Ohodnotí jednu dávku článků (structured output, bez ručního parsování)."""
+        prompt = SCORING_PROMPT.format(
+            news_values=NEWS_VALUES,
+            articles=compact_json(batch)
+        )
+
+        async def score():
+            with track_llm("digest.scoring", GEMINI_MODEL, items=len(batch)) as call:
+                response = await self.scorer.ainvoke(prompt)
+                call.parsed(response)
+            return response
+
+        async with semaphore:
+            result = await get_gateway().acall(
+                score, stage="digest", priority=Priority.DIGEST, prompt=prompt,
+                model=GEMINI_MODEL, params={"schema": ArticleFeaturesList.__name__},
+            )
+        return result["parsed"].articles
+
+    async def acategorize_articles(self, articles: List[Article]) -> List[ArticleFeatures]:
+        """
+        Kategorizuje články podle zpravodajských hodnot (nezávisle na profilu).
+        Dávky běží souběžně (max SCORING_CONCURRENCY najednou); články,
+        které v odpovědi chybí nebo jejichž dávka selhala, se zkusí znovu
+        v menších dávkách.
+
         Args:
             articles: Seznam článků k hodnocení
-            
+
         Returns:
-            Seznam hodnocení relevance článků
+            Seznam hodnocení článků
         """
         self.log(f"🔍 Kategorizuji {len(articles)} článků...")
-        
+
         # Připravíme data pro LLM - pouze souhrny
-        articles_data = []
-        for article in articles:
-            articles_data.append({
+        pending = [
+            {
                 "id": article.id,
                 "title": article.title,
                 "summary": article.summary_simple,
                 "published_date": article.published_date.isoformat() if article.published_date else None
-            })
-        
-        # Zpracování po dávkách (kvůli limitu kontextu)
-        batch_size = 20
-        all_relevances = []
-        
-        for i in range(0, len(articles_data), batch_size):
-            batch = articles_data[i:i + batch_size]
-            
-            prompt = f"""You are an expert in news analysis. Your task is to evaluate the relevance of articles according to user profile and news values.
+            }
+            for article in articles
+        ]
 
-{USER_PROFILE}
+        semaphore = asyncio.Semaphore(SCORING_CONCURRENCY)
+        results: Dict[int, ArticleFeatures] = {}
+        token_budget = SCORING_BATCH_TOKENS
 
-{NEWS_VALUES}
+        for attempt in range(SCORING_MAX_RETRIES + 1):
+            batches = self._build_batches(pending, token_budget)
+            outcomes = await asyncio.gather(
+                *(self._score_batch(batch, semaphore) for batch in batches),
+                return_exceptions=True
+            )
 
-For each article determine:
-1. Relevance category: Nezajímavé, Málo zajímavé, Velmi zajímavé, Nezbytné
-2. News value score: 1-10 (overall importance score)
-3. Which news values are present
-4. Main country (e.g., Česko, Rusko, USA, Německo)
-5. Main person (if any, otherwise empty string)
-6. Main topic (politika, ekonomika, technologie, kultura, bezpečnost)
-7. Brief reasoning in Czech
-
-Respond in JSON array format with objects:
-{{
-  "article_id": <id>,
-  "relevance": "<kategorie>",
-  "news_value_score": <1-10>,
-  "news_values": ["hodnota1", "hodnota2"],
-  "country": "<země>",
-  "person": "<osoba nebo prázdný řetězec>",
-  "topic": "<téma>",
-  "reasoning": "<zdůvodnění v češtině>"
-}}
+            failed = []
+            for batch, outcome in zip(batches, outcomes):
+                if isinstance(outcome, Exception):
+                    self.log(f"❌ Chyba při hodnocení dávky ({len(batch)} článků): {outcome}")
+                    failed.extend(batch)
+                    continue
+                batch_ids = {item["id"] for item in batch}
+                for rel in outcome:
+                    if rel.article_id in batch_ids:
+                        results.setdefault(rel.article_id, rel)
+                failed.extend(item for item in batch if item["id"] not in results)
 
-Articles to evaluate:
-{json.dumps(batch, ensure_ascii=False, indent=2)}
+            if not failed:
+                break
+            if attempt < SCORING_MAX_RETRIES:
+                self.log(f"🔁 Opakuji hodnocení {len(failed)} článků (pokus {attempt + 2})")
+            pending = failed
+            # Menší dávky izolují problematické články
+            token_budget = max(token_budget // 2, 1)
 
-Respond only with JSON array, no additional text."""
-            
-            response = self.llm.invoke(prompt)
-            
-            # Parsování JSON odpovědi
-            try:
-                response_text = response.content.strip()
-                # Odstranění markdown code blocku pokud existuje
-                if response_text.startswith("```"):
-                    response_text = response_text.split("```")[1]
-                    if response_text.startswith("json"):
-                        response_text = response_text[4:]
-                    response_text = response_text.strip()
-                
-                batch_results = json.loads(response_text)
-                for item in batch_results:
-                    all_relevances.append(ArticleRelevance(
-                        article_id=item["article_id"],
-                        relevance=item["relevance"],
-                        news_value_score=item.get("news_value_score", 5),
-                        news_values=item["news_values"],
-                        country=item.get("country", ""),
-                        person=item.get("person", ""),
-                        topic=item.get("topic", ""),
-                        reasoning=item["reasoning"]
-                    ))
-            except Exception as e:
-                self.log(f"❌ Chyba při parsování: {e}")
-                continue
-        
-        self.log(f"✅ Kategorizováno {len(all_relevances)} článků")
-        return all_relevances
+        self.log(f"✅ Kategorizováno {len(results)} článků")
+        return list(results.values())
+
+    def categorize_articles(self, articles: List[Article]) -> List[ArticleFeatures]:
+        """Synchronní obal nad acategorize_articles."""
+        return asyncio.run(self.acategorize_articles(articles))
     
+    def load_profiles(self) -> List[UserProfile]:
+        """Načte aktivní profily; bez profilů v DB založí výchozí z USER_PROFILE."""
+        profiles = self.db.query(UserProfile).filter(UserProfile.is_active.is_(True)).order_by(UserProfile.id).all()
+        if not profiles:
+            profiles = [self.get_profile("default")]
+        return profiles
+
+    def get_profile(self, name: str) -> Optional[UserProfile]:
+        """Vrátí profil podle jména; výchozí profil v případě potřeby založí."""
+        profile = self.db.query(UserProfile).filter(UserProfile.name == name).first()
+        if profile is None and name == "default":
+            profile = UserProfile(
+                name="default",
+                description=USER_PROFILE,
+                preferences=json.dumps(USER_PREFERENCES, ensure_ascii=False)
+            )
+            self.db.add(profile)
+            self.db.commit()
+        return profile
+
+    def prepare_selection(self, profile: UserProfile, score_missing: bool = True) -> Tuple[List[ArticleRelevance], Dict]:
+        """
+        Výběr článků pro jeden profil (kandidáti -> hodnocení -> lokální řazení).
+        S score_missing=False se použijí jen už uložená hodnocení, takže se
+        nečeká na LLM (streamovací endpoint).
+        """
+        articles = self.select_candidates()
+        if score_missing:
+            features = self.score_features(articles)
+        else:
+            cached = self.load_cached_features(articles)
+            features = [cached[a.id] for a in articles if a.id in cached]
+        relevances = self.rank_for_profile(features, profile)
+        return self.select_articles_for_digest(relevances, articles)
+
+    def rank_for_profile(self, features: List[ArticleFeatures], profile: UserProfile) -> List[ArticleRelevance]:
+        """
+        Lokálně (bez LLM) spočítá relevanci článků pro profil:
+        skóre zpravodajské hodnoty * váha tématu * váha země * váha osoby.
+        """
+        preferences = json.loads(profile.preferences or "{}")
+        default_weight = preferences.get("default_weight", 1.0)
+        topics = preferences.get("topics", {})
+        countries = preferences.get("countries", {})
+        people = preferences.get("people", {})
+
+        relevances = []
+        for item in features:
+            weight = topics.get(item.topic, default_weight)
+            weight *= countries.get(item.country, 1.0)
+            weight *= people.get(item.person, 1.0)
+            profile_score = item.news_value_score * weight
+            relevance = next(
+                (label for threshold, label in RELEVANCE_THRESHOLDS if profile_score >= threshold),
+                "Nezajímavé"
+            )
+            relevances.append(ArticleRelevance(
+                **item.model_dump(),
+                relevance=relevance,
+                profile_score=profile_score
+            ))
+        relevances.sort(key=lambda x: x.profile_score, reverse=True)
+        return relevances
+
     def select_articles_for_digest(self, relevances: List[ArticleRelevance], articles: List[Article]) -> Tuple[List[ArticleRelevance], Dict]:
         """
         Vybere a seřadí články pro finální přehled.
@@ -195,14 +497,6 @@ Respond only with JSON array, no additional text."""
         Returns:
             Tuple (seřazené relevance, mapa článků podle ID)
         """
-        # Prioritizace: Nezbytné > Velmi zajímavé > Málo zajímavé
-        priority_map = {
-            "Nezbytné": 4,
-            "Velmi zajímavé": 3,
-            "Málo zajímavé": 2,
-            "Nezajímavé": 1
-        }
-        
         # Vybereme top články (minimálně Velmi zajímavé)
         selected_relevances = [
             rel for rel in relevances 
@@ -214,8 +508,8 @@ Respond only with JSON array, no additional text."""
             more = [rel for rel in relevances if rel.relevance == "Málo zajímavé"][:10]
             selected_relevances.extend(more)
         
-        # Seřadíme podle news_value_score
-        selected_relevances.sort(key=lambda x: x.news_value_score, reverse=True)
+        # Seřadíme podle skóre pro profil
+        selected_relevances.sort(key=lambda x: x.profile_score, reverse=True)
         
         # Vytvoříme mapu článků
         articles_map = {a.id: a for a in articles}
@@ -226,24 +520,13 @@ Respond only with JSON array, no additional text."""
             article = articles_map.get(rel.article_id)
             if article:
                 title_short = article.title[:60] + "..." if len(article.title) > 60 else article.title
-                self.log(f"  [{rel.news_value_score}/10] {rel.relevance[:4]}. | {rel.country:8} | {title_short}")
+                self.log(f"  [{rel.profile_score:4.1f}] {rel.relevance[:4]}. | {rel.country:8} | {title_short}")
         
         self.log(f"\n✅ Vybráno {len(selected_relevances)} článků\n")
         return selected_relevances, articles_map
     
-    def generate_digest(self, selected_relevances: List[ArticleRelevance], articles_map: Dict) -> str:
-        """
-        Vygeneruje finální přehled zpráv z vybraných článků.
-        
-        Args:
-            selected_relevances: Seřazené hodnocení článků
-            articles_map: Mapa článků podle ID
-            
-        Returns:
-            Textový přehled zpráv
-        """
-        self.log(f"✍️  Generuji přehled...")
-        
+    def build_digest_prompt(self, selected_relevances: List[ArticleRelevance], articles_map: Dict) -> str:
+        """Sestaví prompt pro text přehledu z vybraných článků."""
         # Připravíme data pro LLM s metadaty pro lepší spojování
         articles_content = []
         for rel in selected_relevances:
@@ -255,108 +538,157 @@ Respond only with JSON array, no additional text."""
                     "country": rel.country,
                     "person": rel.person,
                     "topic": rel.topic,
-                    "score": rel.news_value_score
+                    "sources": self.clusters[rel.article_id].size if rel.article_id in self.clusters else 1
                 })
-        
-        # Prompt pro generování přehledu
-        prompt = f"""Jsi zkušený novinář. Tvým úkolem je napsat stručný přehled nejdůležitějších zpráv.
 
-{USER_PROFILE}
-
-KRITICKÁ PRAVIDLA SPOJOVÁNÍ:
-Priority pro spojování zpráv do jedné věty:
-1. NEJVYŠŠÍ: Týkají se stejné osoby (person)
-2. VYSOKÁ: Týkají se stejné země (kromě "Česko" - české zprávy nespojuj)
-3. STŘEDNÍ: Mají podobný nebo opačný dopad
-4. NÍZKÁ: Jsou ze stejného tématu (topic)
+        return DIGEST_PROMPT.format(articles=compact_json(articles_content))
 
-STRUKTURA:
-- Délka: 6-8 vět (max 600 znaků)
-- Začni hodnotícím komentářem, pak vyjmenuj zprávy jako argumenty
-- Příklad: "Rusko pokračuje v represi - perzekuce intelektuálů se stupňuje a Červený kříž spolupracuje s Kremlem."
-- Řaď zprávy podle score (nejvyšší první)
+    def generate_digest(self, selected_relevances: List[ArticleRelevance], articles_map: Dict) -> str:
+        """
+        Vygeneruje finální přehled zpráv z vybraných článků.
+        
+        Args:
+            selected_relevances: Seřazené hodnocení článků
+            articles_map: Mapa článků podle ID
+            
+        Returns:
+            Textový přehled zpráv
+        """
+        self.log(f"✍️  Generuji přehled...")
 
-STYL:
-- Kratší fráze: "stalo se" místo "došlo k", "v" místo "v oblasti"
-- Plynulý text, ne seznam
-- Tón: rychlý, výstižný, čtivý
+        prompt = self.build_digest_prompt(selected_relevances, articles_map)
 
-Články k zpracování (seřazené podle důležitosti):
-{json.dumps(articles_content, ensure_ascii=False, indent=2)}
+        def generate():
+            with track_llm("digest.generate", GEMINI_MODEL, items=len(selected_relevances)) as call:
+                response = self.llm.invoke(prompt)
+                call.record_usage(response)
+            return response
 
-Napiš přehled v češtině:"""
-        
-        response = self.llm.invoke(prompt)
+        response = get_gateway().call(
+            generate, stage="digest", priority=Priority.DIGEST, prompt=prompt, model=GEMINI_MODEL
+        )
         digest_text = response.content
         
         self.log(f"✅ Přehled vygenerován ({len(digest_text)} znaků)")
         return digest_text
 
-    
-    def save_digest(self, digest_text: str):
+    async def astream_digest(self, selected_relevances: List[ArticleRelevance], articles_map: Dict):
+        """Streamuje text přehledu po částech, jak je LLM generuje."""
+        prompt = self.build_digest_prompt(selected_relevances, articles_map)
+        # Stream se po prvním chunku opakovat nedá - jen slot bez opakování
+        async with get_gateway().aslot("digest", Priority.DIGEST, prompt) as reservation:
+            with track_llm("digest.stream", GEMINI_MODEL, items=len(selected_relevances)) as call:
+                # Součet chunků sečte i usage_metadata
+                aggregated = None
+                async for chunk in self.llm.astream(prompt):
+                    aggregated = chunk if aggregated is None else aggregated + chunk
+                    if chunk.content:
+                        yield chunk.content
+                if aggregated is not None:
+                    call.record_usage(aggregated)
+                    await asyncio.to_thread(reservation.reconcile, aggregated)
+
+    def selection_key(self, selected_relevances: List[ArticleRelevance]) -> str:
+        """Klíč cache textu přehledu - verze promptu + id článků v pořadí."""
+        ids = ",".join(str(rel.article_id) for rel in selected_relevances)
+        return hashlib.sha256(f"{DIGEST_PROMPT_VERSION}:{ids}".encode("utf-8")).hexdigest()
+
+    def store_generation(self, selected_relevances: List[ArticleRelevance], digest_text: str) -> DigestGeneration:
+        """Uloží vygenerovaný text do cache podle výběru článků."""
+        generation = DigestGeneration(
+            selection_key=self.selection_key(selected_relevances),
+            article_ids=json.dumps([rel.article_id for rel in selected_relevances]),
+            content=digest_text
+        )
+        generation = self.db.merge(generation)
+        self.db.commit()
+        return generation
+
+    def get_or_generate_digest(self, selected_relevances: List[ArticleRelevance], articles_map: Dict) -> Tuple[DigestGeneration, bool]:
+        """
+        Vrátí text přehledu pro daný výběr článků a příznak, zda se generoval.
+        Pokud už ho vytvořil jiný profil (nebo předchozí běh) se stejným
+        výběrem, LLM se nevolá.
+        """
+        key = self.selection_key(selected_relevances)
+        generation = self.db.get(DigestGeneration, key)
+        if generation:
+            self.log(f"♻️  Přehled pro tento výběr už existuje ({key[:12]})")
+            return generation, False
+
+        digest_text = self.generate_digest(selected_relevances, articles_map)
+        return self.store_generation(selected_relevances, digest_text), True
+
+    def save_digest(self, profile: UserProfile, generation: DigestGeneration) -> Digest:
         """
-        Uloží přehled do databáze (přepíše předchozí).
+        Uloží přehled jako novou verzi v historii profilu.
         
         Args:
-            digest_text: Text přehledu k uložení
+            profile: Profil, pro který přehled vznikl
+            generation: Vygenerovaný text a výběr článků
         """
-        # Vytvoříme nebo aktualizujeme záznam
-        # Použijeme speciální článek s ID=0 nebo URL="DIGEST"
-        digest_article = self.db.query(Article).filter(Article.url == "DIGEST").first()
-        
-        if digest_article:
-            # Aktualizujeme existující
-            digest_article.title = f"Přehled zpráv - {datetime.now().strftime('%Y-%m-%d %H:%M')}"
-            digest_article.content = digest_text
-            digest_article.summary_simple = digest_text
-            digest_article.published_date = datetime.now()
-        else:
-            # Vytvoříme nový
-            digest_article = Article(
-                url="DIGEST",
-                title=f"Přehled zpráv - {datetime.now().strftime('%Y-%m-%d %H:%M')}",
-                content=digest_text,
-                summary_simple=digest_text,
-                published_date=datetime.now()
-            )
-            self.db.add(digest_article)
-        
+        # Zámek na profil - souběžné uložení (batch + stream) nedostane stejnou verzi
+        self.db.query(UserProfile.id).filter(UserProfile.id == profile.id).with_for_update().one()
+        last_version = self.db.query(func.max(Digest.version)).filter(Digest.profile_id == profile.id).scalar()
+        digest = Digest(
+            profile_id=profile.id,
+            version=(last_version or 0) + 1,
+            title=f"Přehled zpráv - {datetime.now().strftime('%Y-%m-%d %H:%M')}",
+            content=generation.content,
+            article_ids=generation.article_ids,
+            selection_key=generation.selection_key
+        )
+        self.db.add(digest)
         self.db.commit()
-        self.log(f"💾 Uloženo do DB")
+        self.log(f"💾 Uloženo do DB (profil {profile.name}, verze {digest.version})")
+        return digest
     
     def run(self):
         """Hlavní loop agenta - spustí celý proces generování přehledu."""
         try:
             self.log("🚀 START: Generování přehledu zpráv")
             
-            # 1. Načteme články se souhrny
-            articles = self.fetch_articles_with_summaries()
+            # 1. Vybereme kandidáty (časové okno + předběžné skóre)
+            with span("digest.select_candidates"):
+                articles = self.select_candidates()
             
             if not articles:
                 self.log("⚠️  Žádné články k zpracování")
                 return
             
-            # 2. Kategorizujeme články
-            relevances = self.categorize_articles(articles)
-            
-            # 3. Vybereme a seřadíme články pro přehled
-            selected_relevances, articles_map = self.select_articles_for_digest(relevances, articles)
-            
-            if not selected_relevances:
-                self.log("⚠️  Žádné relevantní články")
-                return
-            
-            # 4. Vygenerujeme přehled
-            digest = self.generate_digest(selected_relevances, articles_map)
-            
-            # 5. Uložíme do databáze
-            self.save_digest(digest)
-            
-            self.log(f"\n{'='*60}")
-            self.log(f"📰 VÝSLEDNÝ PŘEHLED:")
-            self.log(f"{'='*60}")
-            self.log(digest)
-            self.log(f"{'='*60}\n")
+            # 2. Profilově nezávislé hodnocení - jen pro články, které ho ještě nemají
+            with span("digest.score_features", articles=len(articles)):
+                features = self.score_features(articles)
+
+            # 3. Pro každý profil lokálně seřadíme články a vytvoříme přehled
+            profiles = self.load_profiles()
+            generated = 0
+            for profile in profiles:
+                self.log(f"\n👤 Profil: {profile.name}")
+                with track_stage("digest", profile=profile.name) as item:
+                    relevances = self.rank_for_profile(features, profile)
+                    selected_relevances, articles_map = self.select_articles_for_digest(relevances, articles)
+
+                    if not selected_relevances:
+                        self.log("⚠️  Žádné relevantní články")
+                        item.status = "skipped"
+                        continue
+
+                    # 4. Text přehledu (sdílený mezi profily se stejným výběrem)
+                    generation, created = self.get_or_generate_digest(selected_relevances, articles_map)
+                    generated += int(created)
+                    item.set(generated=created)
+
+                    # 5. Uložíme do databáze jako novou verzi
+                    self.save_digest(profile, generation)
+
+                self.log(f"\n{'='*60}")
+                self.log(f"📰 VÝSLEDNÝ PŘEHLED ({profile.name}):")
+                self.log(f"{'='*60}")
+                self.log(generation.content)
+                self.log(f"{'='*60}\n")
+
+            self.log(f"📊 Profilů: {len(profiles)}, vygenerováno textů: {generated}")
             self.log("✅ HOTOVO")
             
         except Exception as e:
@@ -364,6 +696,7 @@ Napiš přehled v češtině:"""
             raise
         finally:
             self.close()
+            push_metrics("news_digest_agent")
 
 
 def main():
@@ -0,0 +1,38 @@
+"""
+Líná inicializace AI providerů (Gemini).
+
+Importy `google.generativeai` a `langchain_google_genai` jsou drahé,
+proto se provádí až při prvním skutečném použití, ne při importu modulu.
+"""
+
+import os
+from functools import lru_cache
+from dotenv import load_dotenv
+
+load_dotenv()
+
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash-lite")
+# Opakování v klientovi jen pro výpadky spojení - na 429 čeká llm_gateway
+LLM_CLIENT_MAX_RETRIES = int(os.getenv("LLM_CLIENT_MAX_RETRIES", "1"))
+
+
+@lru_cache(maxsize=1)
+def get_genai():
+    """Vrátí nakonfigurovaný modul google.generativeai (pro embeddingy)."""
+    import google.generativeai as genai
+
+    genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+    return genai
+
+
+@lru_cache(maxsize=None)
+def get_chat_model(temperature: float = 0, max_retries: int = LLM_CLIENT_MAX_RETRIES):
+    """Vrátí sdílenou instanci ChatGoogleGenerativeAI pro dané nastavení."""
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    return ChatGoogleGenerativeAI(
+        model=GEMINI_MODEL,
+        google_api_key=os.getenv("GOOGLE_API_KEY"),
+        temperature=temperature,
+        max_retries=max_retries
+    )
@@ -0,0 +1,211 @@
+"""
+Evidence dávkových běhů (content crawler, sumarizace, embeddingy).
+
+Každý běh má záznam v batch_runs s kurzorem = id posledního zpracovaného
+článku a výsledek každé položky je v batch_run_items. Kurzor i výsledek
+se zapisují ve stejné transakci jako data článku, takže:
+
+- běh ukončený pádem nebo Ctrl+C pokračuje při dalším spuštění od
+  posledního commitnutého kurzoru (nezačíná znovu od prvního článku),
+- selhaná položka se zkusí znovu až po exponenciálně rostoucí pauze
+  (RUN_RETRY_BASE_S, 2x, 4x ... max RUN_RETRY_MAX_S) a po RUN_MAX_ATTEMPTS
+  neúspěších skončí ve stavu dead (dead letter) - další běhy ji
+  přeskakují, dokud ji někdo ručně nevrátí do fronty.
+
+Použití:
+    with run_ledger(db, "summary") as ledger:
+        for article in ledger.pending(query, Article.id):
+            ...
+            ledger.record(article.id)            # nebo error=str(e); hromadně přes BatchWriter
+            db.commit()
+
+Dead letter a běhy:
+    python -m src.run_ledger summary            # přehled
+    python -m src.run_ledger summary --requeue  # vrátí dead položky do fronty
+
+Jeden job má běžet vždy jen v jednom procesu (jako dosud z cronu).
+"""
+
+import argparse
+import os
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import and_, exists, func, or_, text
+from sqlalchemy.orm import Query, Session
+
+from .models import BatchRun, BatchRunItem
+
+load_dotenv()
+
+RUN_RETRY_BASE_S = int(os.getenv("RUN_RETRY_BASE_S", "300"))
+RUN_RETRY_MAX_S = int(os.getenv("RUN_RETRY_MAX_S", "86400"))
+RUN_MAX_ATTEMPTS = int(os.getenv("RUN_MAX_ATTEMPTS", "5"))
+# Dokončené běhy starší než tohle se mažou (výsledky položek zůstávají)
+RUN_HISTORY_DAYS = int(os.getenv("RUN_HISTORY_DAYS", "30"))
+
+# Neúspěch: další pokus za base * 2^(pokusy - 1), po max. pokusech dead.
+# Položky se zapisují hromadně (unnest), jedním příkazem pro úspěchy a jedním pro chyby.
+RECORD_FAILURE_SQL = """
+    INSERT INTO batch_run_items AS i (job, item_id, run_id, status, attempts, last_error, next_attempt_at, updated_at)
+    SELECT :job, u.item_id, :run_id, CASE WHEN :max_attempts <= 1 THEN 'dead' ELSE 'failed' END, 1, u.error,
+           now() + make_interval(secs => :base), now()
+    FROM unnest(CAST(:ids AS integer[]), CAST(:errors AS text[])) AS u(item_id, error)
+    ON CONFLICT (job, item_id) DO UPDATE SET
+        run_id = EXCLUDED.run_id,
+        status = CASE WHEN i.attempts + 1 >= :max_attempts THEN 'dead' ELSE 'failed' END,
+        attempts = i.attempts + 1,
+        last_error = EXCLUDED.last_error,
+        next_attempt_at = now() + make_interval(secs => least(:max_delay, :base * power(2, i.attempts))),
+        updated_at = now()
+"""
+
+RECORD_SUCCESS_SQL = """
+    INSERT INTO batch_run_items AS i (job, item_id, run_id, status, attempts, updated_at)
+    SELECT :job, u.item_id, :run_id, 'done', 0, now()
+    FROM unnest(CAST(:ids AS integer[])) AS u(item_id)
+    ON CONFLICT (job, item_id) DO UPDATE SET
+        run_id = EXCLUDED.run_id, status = 'done', attempts = 0,
+        last_error = NULL, next_attempt_at = NULL, updated_at = now()
+"""
+
+
+class RunLedger:
+    def __init__(self, db: Session, job: str):
+        self.db = db
+        self.job = job
+        self.run: Optional[BatchRun] = None
+
+    def start(self) -> "RunLedger":
+        """Naváže na nedokončený běh (pád, přerušení), jinak založí nový."""
+        self.db.query(BatchRun).filter(
+            BatchRun.job == self.job,
+            BatchRun.status == "completed",
+            BatchRun.finished_at < datetime.now() - timedelta(days=RUN_HISTORY_DAYS),
+        ).delete(synchronize_session=False)
+
+        self.run = self.db.query(BatchRun).filter(
+            BatchRun.job == self.job, BatchRun.status != "completed"
+        ).order_by(BatchRun.id.desc()).first()
+        if self.run is not None:
+            print(f"↩️  Navazuji na běh {self.run.id} ({self.run.status}) od článku {self.run.cursor}")
+            self.run.status = "running"
+        else:
+            self.run = BatchRun(job=self.job, status="running", cursor=0)
+            self.db.add(self.run)
+        self.db.commit()
+        return self
+
+    @property
+    def cursor(self) -> int:
+        return self.run.cursor
+
+    def pending(self, query: Query, id_column) -> Query:
+        """
+        Omezí dotaz na položky za kurzorem, které nejsou dead ani nečekají
+        na další pokus, seřazené podle id (kurzor tak odpovídá pořadí).
+        """
+        blocked = exists().where(
+            BatchRunItem.job == self.job,
+            BatchRunItem.item_id == id_column,
+            or_(
+                BatchRunItem.status == "dead",
+                and_(BatchRunItem.status == "failed", BatchRunItem.next_attempt_at > func.now()),
+            ),
+        )
+        return query.filter(id_column > self.cursor, ~blocked).order_by(id_column)
+
+    def record(self, item_id: int, error: Optional[str] = None):
+        """
+        Zapíše výsledek položky a posune kurzor. Necommituje - volající
+        commitne spolu s daty položky, aby se výsledek a data nerozešly.
+        """
+        self.record_many([(item_id, error)])
+
+    def record_many(self, outcomes: Iterable[Tuple[int, Optional[str]]]):
+        """Jako record pro více položek najednou (id, chyba nebo None)."""
+        # Poslední výsledek vyhrává - upsert nesmí jeden řádek změnit dvakrát
+        latest: Dict[int, Optional[str]] = dict(outcomes)
+        if not latest:
+            return
+        params = {"job": self.job, "run_id": self.run.id}
+        done = [item_id for item_id, error in latest.items() if error is None]
+        failed = {item_id: error for item_id, error in latest.items() if error is not None}
+        if done:
+            self.db.execute(text(RECORD_SUCCESS_SQL), {**params, "ids": done})
+        if failed:
+            self.db.execute(text(RECORD_FAILURE_SQL), {
+                **params,
+                "ids": list(failed),
+                "errors": [error[:2000] for error in failed.values()],
+                "base": RUN_RETRY_BASE_S,
+                "max_delay": RUN_RETRY_MAX_S,
+                "max_attempts": RUN_MAX_ATTEMPTS,
+            })
+        self.run.cursor = max(self.run.cursor, *latest)
+        self.run.updated_at = datetime.now()
+
+    def finish(self, status: str, stats: Optional[dict] = None):
+        self.run.status = status
+        self.run.stats = stats
+        self.run.updated_at = datetime.now()
+        if status == "completed":
+            self.run.finished_at = datetime.now()
+        self.db.commit()
+
+
+@contextmanager
+def run_ledger(db: Session, job: str, stats: Optional[dict] = None) -> Iterator[RunLedger]:
+    """
+    Běh dávky s evidencí. Po doběhnutí je běh completed (další spuštění
+    začne od začátku), po výjimce nebo Ctrl+C zůstane rozpracovaný
+    a další spuštění na něj naváže. stats = slovník, který se uloží k běhu.
+    """
+    ledger = RunLedger(db, job).start()
+    try:
+        yield ledger
+    except BaseException as e:
+        db.rollback()
+        try:
+            ledger.finish("interrupted" if isinstance(e, KeyboardInterrupt) else "failed", stats)
+        except Exception:
+            # Bez spojení s DB zůstane běh "running" - další spuštění na něj naváže stejně
+            db.rollback()
+        raise
+    else:
+        ledger.finish("completed", stats)
+
+
+def main():
+    from .database import WorkerSessionLocal
+
+    parser = argparse.ArgumentParser(description="Běhy dávkových skriptů a dead letter")
+    parser.add_argument("job", help="content / summary / embedding")
+    parser.add_argument("--requeue", action="store_true", help="Vrátí dead položky do fronty")
+    args = parser.parse_args()
+
+    db = WorkerSessionLocal()
+    try:
+        for run in db.query(BatchRun).filter(BatchRun.job == args.job).order_by(BatchRun.id.desc()).limit(5):
+            print(f"Běh {run.id}: {run.status}, kurzor {run.cursor}, začátek {run.started_at}, {run.stats or {}}")
+
+        dead = db.query(BatchRunItem).filter(BatchRunItem.job == args.job, BatchRunItem.status == "dead")
+        print(f"\n💀 Dead letter ({dead.count()}):")
+        for item in dead.order_by(BatchRunItem.item_id).limit(50):
+            print(f"  {item.item_id}: {item.attempts} pokusů, {item.last_error}")
+
+        if args.requeue:
+            count = dead.update(
+                {"status": "failed", "attempts": 0, "next_attempt_at": None}, synchronize_session=False
+            )
+            # Položky pod kurzorem rozpracovaného běhu vezme až další nový běh
+            db.commit()
+            print(f"\n✓ Vráceno do fronty: {count}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,12 @@
-from pydantic import BaseModel
-from typing import Optional
-from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+from datetime import date, datetime
 
 # Základní schéma s poli, která jsou společná
 class ArticleBase(BaseModel):
     title: str
     url: str
-    categories: Optional[str] = None
+    categories: Optional[Dict[str, Any]] = None
 
 # Schéma pro Vytvoření článku (co přijímáme od klienta)
 class ArticleCreate(ArticleBase):
@@ -33,4 +33,52 @@ class ArticleDetail(ArticleBase):
     image_filename: Optional[str] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# Schéma pro hromadné načtení článků (POST /articles/batch)
+class ArticleBatchRequest(BaseModel):
+    ids: List[int] = Field(min_length=1, max_length=100)
+    fields: Optional[List[str]] = None  # Stejná pole jako ?fields= u detailu
+    related: int = Field(default=0, ge=0, le=20)  # Počet podobných článků ke každému
+
+# Odpověď hromadného načtení - články v pořadí požadavku
+class ArticleBatchResponse(BaseModel):
+    articles: List[dict]
+    missing: List[int]
+
+# Schéma pro položku historie přehledů
+class DigestSummary(BaseModel):
+    id: int
+    version: int
+    title: Optional[str] = None
+    published_date: Optional[datetime] = None
+
+# Schéma pro celý přehled zpráv
+class DigestDetail(DigestSummary):
+    content: str
+    article_ids: List[int] = []
+
+# Počet článků pro jednu hodnotu facetu (např. "Ukrajina": 42)
+class FacetCount(BaseModel):
+    value: str
+    count: int
+
+# Facety za časové okno
+class Facets(BaseModel):
+    since: date
+    countries: List[FacetCount]
+    people: List[FacetCount]
+
+# Jeden výsledek fulltextového hledání
+class ArticleSearchHit(BaseModel):
+    id: int
+    title: str
+    url: str
+    published_date: Optional[datetime] = None
+    rank: float
+    headline: Optional[str] = None  # Úryvek se shodami v <mark>
+
+# Stránka výsledků hledání (next_cursor = None -> poslední stránka)
+class ArticleSearchResponse(BaseModel):
+    results: List[ArticleSearchHit]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,81 @@
+"""
+Shlukování článků do příběhů podle podobnosti embeddingů.
+
+Stejnou událost často přinese novinky.cz, aktualne.cz i ceskenoviny.cz.
+Místo abychom každý článek hodnotili a posílali do přehledu zvlášť,
+seskupíme je a dál pracujeme jen s jedním reprezentantem příběhu.
+"""
+
+import os
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional
+
+import numpy as np
+
+# Minimální kosinová podobnost, aby dva články patřily do stejného příběhu
+CLUSTER_SIMILARITY = float(os.getenv("CLUSTER_SIMILARITY", "0.85"))
+# Maximální časový odstup článků v jednom příběhu (v hodinách)
+CLUSTER_MAX_GAP_HOURS = float(os.getenv("CLUSTER_MAX_GAP_HOURS", "36"))
+
+
+@dataclass
+class StoryCluster:
+    """Jeden příběh - reprezentativní článek a všechny články, které ho přinesly."""
+    representative_id: int
+    member_ids: List[int] = field(default_factory=list)
+
+    @property
+    def size(self) -> int:
+        return len(self.member_ids)
+
+
+def cluster_articles(
+    article_ids: List[int],
+    embeddings: List[Optional[np.ndarray]],
+    timestamps: List[datetime],
+    similarity: float = CLUSTER_SIMILARITY,
+    max_gap_hours: float = CLUSTER_MAX_GAP_HOURS,
+) -> List[StoryCluster]:
+    """
+    Greedy (leader) shlukování. Vstup má být seřazený podle důležitosti -
+    první nepřiřazený článek se stává reprezentantem a přiberou se k němu
+    všechny dosud nepřiřazené články s podobností >= similarity, které
+    vyšly nejvýš max_gap_hours od něj. Články bez embeddingu tvoří
+    samostatné příběhy.
+    """
+    n = len(article_ids)
+    has_vector = np.array([e is not None for e in embeddings], dtype=bool)
+    dims = next((len(e) for e in embeddings if e is not None), 0)
+
+    # Normalizované vektory -> kosinová podobnost je prosté skalární součiny
+    matrix = np.zeros((n, dims), dtype=np.float32)
+    for i, embedding in enumerate(embeddings):
+        if embedding is not None:
+            matrix[i] = embedding
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix = np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+    hours = np.array([t.timestamp() / 3600 for t in timestamps], dtype=np.float64)
+    assigned = np.zeros(n, dtype=bool)
+    clusters = []
+
+    for i in range(n):
+        if assigned[i]:
+            continue
+        members = np.zeros(n, dtype=bool)
+        members[i] = True
+        if has_vector[i]:
+            members |= (
+                ~assigned
+                & has_vector
+                & (matrix @ matrix[i] >= similarity)
+                & (np.abs(hours - hours[i]) <= max_gap_hours)
+            )
+        assigned |= members
+        clusters.append(StoryCluster(
+            representative_id=article_ids[i],
+            member_ids=[article_ids[j] for j in np.flatnonzero(members)],
+        ))
+
+    return clusters
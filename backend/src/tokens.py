@@ -0,0 +1,42 @@
+"""
+Odhad tokenů a rozpočty promptů.
+
+Gemini tokenizer není k dispozici lokálně (count_tokens je síťové volání),
+proto počty odhadujeme z počtu znaků. Poměr CHARS_PER_TOKEN se dá
+zkalibrovat podle skutečných čísel z usage_metadata - souhrn tokenů
+na konci batch skriptů (instrumentation.llm_usage_report) je ukazuje.
+"""
+
+import json
+import math
+import os
+from typing import Any
+
+# Čeština s diakritikou vychází hůř než angličtina (~4 znaky na token)
+CHARS_PER_TOKEN = float(os.getenv("CHARS_PER_TOKEN", "3.5"))
+
+
+def estimate_tokens(text: str) -> int:
+    """Odhad počtu tokenů textu."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Zkrátí text na odhadovaný rozpočet tokenů. Řeže na konci odstavce,
+    věty nebo aspoň slova, pokud to nestojí víc než pětinu rozpočtu.
+    """
+    max_chars = int(max_tokens * CHARS_PER_TOKEN)
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    for separator in ("\n\n", ". ", "\n", " "):
+        position = cut.rfind(separator)
+        if position >= max_chars * 0.8:
+            return cut[:position + len(separator)].rstrip()
+    return cut
+
+
+def compact_json(data: Any) -> str:
+    """JSON pro prompt - bez odsazení a mezer (odsazení stojí tokeny a modelu nepomáhá)."""
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
@@ -2,8 +2,13 @@ import type { PageServerLoad } from './$types';
 
 export const load: PageServerLoad = async ({ params, fetch }) => {
 	try {
-		const response = await fetch(`http://backend:8000/articles/${params.id}`);
-		
+		// Článek i související články načteme jedním requestem
+		const response = await fetch('http://backend:8000/articles/batch', {
+			method: 'POST',
+			headers: { 'Content-Type': 'application/json' },
+			body: JSON.stringify({ ids: [Number(params.id)], related: 5 })
+		});
+
 		if (!response.ok) {
 			return {
 				article: null,
@@ -11,23 +16,21 @@ export const load: PageServerLoad = async ({ params, fetch }) => {
 				error: 'Článek nenalezen'
 			};
 		}
-		
-		const article = await response.json();
-		
-		// Načteme související články
-		let relatedArticles = [];
-		try {
-			const relatedResponse = await fetch(`http://backend:8000/articles/${params.id}/related?limit=5`);
-			if (relatedResponse.ok) {
-				relatedArticles = await relatedResponse.json();
-			}
-		} catch (e) {
-			console.error('Chyba při načítání souvisejících článků:', e);
+
+		const { articles } = await response.json();
+		const article = articles[0];
+
+		if (!article) {
+			return {
+				article: null,
+				relatedArticles: [],
+				error: 'Článek nenalezen'
+			};
 		}
-		
+
 		return {
 			article,
-			relatedArticles,
+			relatedArticles: article.related || [],
 			error: null
 		};
 	} catch (error) {